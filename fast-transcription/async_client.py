@@ -0,0 +1,314 @@
+"""
+Asyncio-native Azure Speech-to-Text client sharing one pooled connection set.
+
+AzureSpeechClient is the canonical client. This one goes through the same
+TranscriptionRequest steps, so caching, transcoding and request events
+match it, and only sending differs. Hedging, chunked and packed uploads,
+locale probes and bulk helpers are only in AzureSpeechClient.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, List, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from cache import TranscriptionCache
+from concurrency import THROTTLE_STATUS_CODES
+from config import AzureSpeechConfig, SpeechEndpoint
+from endpoints import EndpointPool
+from instrumentation import Hook, Instrumentation, RequestTrace
+from retry import RetryPolicy, parse_retry_after
+from sources import AudioSource
+from speech_client import TranscriptionRequest, build_definition, build_headers, encode_request
+from transcode import Transcoder
+
+
+class AsyncAzureSpeechClient:
+    """
+    Async client for Azure Speech-to-Text API.
+
+    All requests share one bounded HTTP connection pool, and a per-host
+    semaphore caps how many requests are in flight against each endpoint.
+    With several endpoints in the config, every attempt goes to the one
+    the client's EndpointPool picks. Disk and CPU work (hashing, transcoding,
+    reading the audio) runs in worker threads, so it never stalls the event
+    loop. Use it as an async context manager so the pool is closed on exit:
+
+        async with AsyncAzureSpeechClient() as client:
+            results = await asyncio.gather(*(client.transcribe(p) for p in paths))
+    """
+
+    def __init__(
+        self,
+        config: Optional[AzureSpeechConfig] = None,
+        max_connections: int = 100,
+        max_concurrency_per_host: int = 32,
+        timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[TranscriptionCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        transcoder: Optional[Transcoder] = None
+    ):
+        """
+        Initialize the async Azure Speech-to-Text client.
+
+        Args:
+            config (AzureSpeechConfig, optional): Configuration object.
+                If not provided, a default config will be created.
+            max_connections: Size of the shared connection pool
+            max_concurrency_per_host: Maximum requests in flight per host;
+                further requests wait for a slot before uploading
+            timeout: Per-request timeout in seconds, or None for no timeout
+            retry_policy (RetryPolicy, optional): Backoff policy for throttled
+                (429) and failed (5xx) requests. Defaults to RetryPolicy().
+            cache (TranscriptionCache, optional): Cache consulted before
+                uploading; responses are stored in it after a successful request
+            instrumentation (Instrumentation, optional): Hook registry that
+                receives a timing event for every request
+            transcoder (Transcoder, optional): Convert lossless audio files to
+                16 kHz mono, and optionally FLAC or Opus, before uploading them
+        """
+        self.config = config or AzureSpeechConfig()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.instrumentation = instrumentation or Instrumentation()
+        self.transcoder = transcoder
+        self.endpoints = EndpointPool(self.config.endpoints, instrumentation=self.instrumentation)
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._timeout = httpx.Timeout(timeout)
+        self._http: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "AsyncAzureSpeechClient":
+        self._get_http()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def add_hook(self, hook: Hook) -> None:
+        """
+        Register a callable that receives a timing event for every request.
+
+        Args:
+            hook: Callable taking the event dict, such as a JsonLinesExporter
+                or PrometheusExporter
+        """
+        self.instrumentation.add_hook(hook)
+
+    def _get_http(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+        return self._http
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        """Get the concurrency limiter for the host of a URL."""
+        host = urlsplit(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_concurrency_per_host)
+        return self._host_slots[host]
+
+    async def _send(
+        self,
+        url_of: Callable[[SpeechEndpoint], str],
+        send: Callable[[SpeechEndpoint], Awaitable[httpx.Response]],
+        trace: Optional[RequestTrace] = None
+    ) -> httpx.Response:
+        """
+        Send a request, retrying throttled and transient failures.
+
+        Every attempt goes to the endpoint the pool picks. The per-host
+        slot is held only while a request is in flight, not while waiting
+        to retry.
+
+        Args:
+            url_of: Callable giving the request URL on an endpoint, used to
+                pick the per-host limiter
+            send: Callable that performs one attempt on an endpoint; called
+                again for every retry
+            trace: Trace that records attempts, response status and backoff time
+
+        Returns:
+            The successful response
+
+        Raises:
+            httpx.HTTPError: If the request fails and is not retried
+        """
+        attempt = 0
+        while True:
+            if trace is not None:
+                trace.attempts += 1
+            state = self.endpoints.acquire()
+            started = asyncio.get_running_loop().time()
+            try:
+                async with self._host_slot(url_of(state.endpoint)):
+                    response = await send(state.endpoint)
+            except httpx.TransportError:
+                self.endpoints.release(state, None)
+                delay = self.retry_policy.retry_delay(attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                self.endpoints.cancel(state)
+                raise
+            else:
+                retry_after = None if response.is_success else parse_retry_after(response.headers)
+                self.endpoints.release(
+                    state,
+                    response.status_code,
+                    asyncio.get_running_loop().time() - started,
+                    retry_after=retry_after
+                )
+                if trace is not None:
+                    trace.record_response(response.status_code, response.headers)
+                    if response.status_code in THROTTLE_STATUS_CODES:
+                        trace.record_throttle(parse_retry_after(response.headers))
+                if response.is_success:
+                    return response
+                delay = self.retry_policy.retry_delay(attempt, response.status_code, response.headers)
+                if delay is None:
+                    response.raise_for_status()
+
+            # The failed endpoint is ejected; another one can take the retry straight away
+            if len(self.endpoints.states) > 1 and self.endpoints.available():
+                delay = 0.0
+            await asyncio.sleep(delay)
+            if trace is not None:
+                trace.add("retry_wait", delay)
+            attempt += 1
+
+    async def transcribe(
+        self,
+        audio_file: Union[str, Path, BinaryIO, AudioSource],
+        locales: List[str] = ["en-US"],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Transcribe audio to text.
+
+        The body is streamed in fixed-size blocks and retries re-upload the
+        audio from its first byte, and the cache and transcoder are used as
+        in AzureSpeechClient.transcribe. Blocks are read in a worker thread.
+
+        Args:
+            audio_file: Path to audio file, file-like object or AudioSource
+            locales: List of language locales for transcription
+            **kwargs: Additional parameters to pass to the API
+
+        Returns:
+            Dict containing the transcription response
+
+        Raises:
+            ValueError: If audio_file is invalid
+            httpx.HTTPError: If the API request fails
+        """
+        trace = RequestTrace("transcribe")
+        # Opening a video file probes it with ffprobe
+        request = await asyncio.to_thread(
+            TranscriptionRequest,
+            audio_file,
+            build_definition(locales, **kwargs),
+            trace,
+            self.cache,
+            self.transcoder,
+            self.instrumentation
+        )
+
+        async def send(endpoint: SpeechEndpoint) -> httpx.Response:
+            trace.endpoint = endpoint.name
+            with trace.phase("encode"):
+                encoder = await asyncio.to_thread(encode_request, request.upload, request.definition)
+            request_headers = {**build_headers(endpoint), "Content-Type": encoder.content_type}
+            if encoder.len is not None:
+                request_headers["Content-Length"] = str(encoder.len)
+
+            async def body() -> AsyncIterator[bytes]:
+                blocks = iter(encoder)
+                while True:
+                    block = await asyncio.to_thread(next, blocks, None)
+                    if block is None:
+                        return
+                    yield block
+
+            http = self._get_http()
+            sent_at = time.perf_counter()
+            try:
+                response = await http.send(
+                    http.build_request("POST", endpoint.transcribe_url, headers=request_headers, content=body()),
+                    stream=True
+                )
+                headers_at = time.perf_counter()
+                try:
+                    await response.aread()
+                finally:
+                    await response.aclose()
+            finally:
+                trace.bytes_sent += encoder.bytes_read
+
+            upload_done_at = encoder.completed_at or sent_at
+            trace.add("upload", upload_done_at - sent_at)
+            trace.add("server", headers_at - upload_done_at)
+            trace.add("download", time.perf_counter() - headers_at)
+
+            if response.is_success:
+                request.uploaded(encoder)
+            return response
+
+        try:
+            # Identical audio with an identical definition is served from the cache
+            cached = await asyncio.to_thread(request.lookup)
+            if cached is not None:
+                return cached
+            await asyncio.to_thread(request.prepare)
+
+            response = await self._send(lambda endpoint: endpoint.transcribe_url, send, trace)
+            with trace.phase("decode"):
+                result = response.json()
+
+            await asyncio.to_thread(request.store, result)
+            return result
+
+        except Exception as e:
+            request.fail(e)
+            raise
+
+        finally:
+            await asyncio.to_thread(request.close)
+
+    async def get_supported_locales(self) -> Dict[str, Any]:
+        """
+        Get the list of supported locales for transcription.
+
+        Returns:
+            Dict containing the supported locales information
+        """
+        trace = RequestTrace("locales")
+
+        async def get(endpoint: SpeechEndpoint) -> httpx.Response:
+            trace.endpoint = endpoint.name
+            return await self._get_http().get(endpoint.locales_url, headers=build_headers(endpoint))
+
+        try:
+            response = await self._send(lambda endpoint: endpoint.locales_url, get, trace)
+            with trace.phase("decode"):
+                return response.json()
+        except Exception as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if self.instrumentation.enabled:
+                self.instrumentation.emit(trace.to_event())
@@ -0,0 +1,263 @@
+"""
+Audio decoding helpers for the Azure Speech-to-Text client.
+
+WAV files are memory-mapped and read directly; every other supported
+format is decoded to 16-bit PCM through a local ffmpeg binary.
+"""
+
+import io
+import shutil
+import subprocess
+import wave
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from utils import MappedWav
+
+
+# Sample rate used when decoding compressed formats through ffmpeg
+DEFAULT_SAMPLE_RATE = 16000
+
+# Samples processed at a time by frame_energy_db
+ENERGY_BLOCK_SAMPLES = 1 << 20
+
+# Length of the low-pass filter applied before downsampling
+RESAMPLE_TAPS = 63
+
+# Output frames produced at a time by PCMAudio.resample
+RESAMPLE_BLOCK_FRAMES = 1 << 18
+
+
+class PCMAudio:
+    """Decoded 16-bit PCM audio held as a (frames, channels) array."""
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        """
+        Initialize the PCM buffer.
+
+        Args:
+            samples: int16 array shaped (frames, channels)
+            sample_rate: Sample rate in Hz
+        """
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @property
+    def channels(self) -> int:
+        """Number of interleaved channels."""
+        return self.samples.shape[1]
+
+    @property
+    def frames(self) -> int:
+        """Number of sample frames."""
+        return self.samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return self.frames / float(self.sample_rate)
+
+    def mono(self) -> np.ndarray:
+        """
+        Get a mono mixdown of the samples.
+
+        Single-channel audio is returned as a view of its int16 samples;
+        multi-channel audio is averaged to float32.
+
+        Returns:
+            np.ndarray: One value per frame, in int16 units
+        """
+        if self.channels == 1:
+            return self.samples[:, 0]
+        return self.samples.mean(axis=1, dtype=np.float32)
+
+    def slice(self, start_frame: int, end_frame: int) -> "PCMAudio":
+        """
+        Get a view of a frame range without copying the samples.
+
+        Args:
+            start_frame: First frame of the range
+            end_frame: Frame after the last frame of the range
+
+        Returns:
+            PCMAudio: Audio covering the requested frames
+        """
+        return PCMAudio(self.samples[start_frame:end_frame], self.sample_rate)
+
+    def resample(self, sample_rate: int, mono: bool = False) -> "PCMAudio":
+        """
+        Convert the samples to another sample rate, optionally mixing down to mono.
+
+        Downsampling first applies a windowed-sinc low-pass filter at the
+        new Nyquist frequency, so content above it does not alias into the
+        speech band. Samples are then linearly interpolated. The work is
+        done in blocks, so long recordings never need a float copy of the
+        whole input.
+
+        Args:
+            sample_rate: Target sample rate in Hz
+            mono: Whether to average the channels into one
+
+        Returns:
+            PCMAudio: Converted audio (this object if nothing changes)
+        """
+        channels = 1 if mono else self.channels
+        if (sample_rate == self.sample_rate and channels == self.channels) or self.frames == 0:
+            return self
+
+        ratio = sample_rate / self.sample_rate
+        total = int(round(self.frames * ratio))
+        kernel = None
+        margin = 1
+        if ratio < 1:
+            offsets = np.arange(RESAMPLE_TAPS) - (RESAMPLE_TAPS - 1) / 2
+            kernel = (ratio * np.sinc(ratio * offsets) * np.hamming(RESAMPLE_TAPS)).astype(np.float32)
+            kernel /= kernel.sum()
+            # Input beyond the block edges keeps the filter exact across blocks
+            margin = RESAMPLE_TAPS
+
+        resampled = np.empty((total, channels), dtype=np.int16)
+        for start in range(0, total, RESAMPLE_BLOCK_FRAMES):
+            end = min(total, start + RESAMPLE_BLOCK_FRAMES)
+            positions = np.arange(start, end, dtype=np.float64) / ratio
+            first = max(0, int(positions[0]) - margin)
+            last = min(self.frames, int(positions[-1]) + 1 + margin)
+            block = self.samples[first:last]
+            if channels == 1 and self.channels > 1:
+                block = block.mean(axis=1, dtype=np.float32).reshape(-1, 1)
+            else:
+                block = block.astype(np.float32)
+
+            index = np.arange(last - first, dtype=np.float64)
+            for channel in range(channels):
+                values = block[:, channel]
+                if kernel is not None:
+                    values = np.convolve(values, kernel, mode="same")
+                values = np.interp(positions - first, index, values)
+                resampled[start:end, channel] = np.clip(np.round(values), -32768, 32767)
+        return PCMAudio(resampled, sample_rate)
+
+    def to_wav_bytes(self) -> bytes:
+        """
+        Encode the samples as a 16-bit PCM WAV file.
+
+        Returns:
+            bytes: Complete WAV file contents
+        """
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as f:
+            f.setnchannels(self.channels)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(np.ascontiguousarray(self.samples, dtype="<i2").tobytes())
+        return buffer.getvalue()
+
+
+def load_pcm(file_path: Union[str, Path], max_seconds: Optional[float] = None) -> PCMAudio:
+    """
+    Decode an audio file to 16-bit PCM.
+
+    WAV files (PCM, float, A-law and mu-law) keep their native sample rate
+    and channel layout; 16-bit PCM samples stay a view of the mapped file.
+    Other formats, including the audio track of video files, are decoded
+    through ffmpeg to 16 kHz mono.
+
+    Args:
+        file_path: Path to the audio file
+        max_seconds: Decode only this much from the start of the file
+
+    Returns:
+        PCMAudio: Decoded samples
+
+    Raises:
+        RuntimeError: If the file needs ffmpeg and ffmpeg is not installed
+    """
+    path = Path(file_path)
+
+    if path.suffix.lower() == ".wav":
+        try:
+            return load_wav(MappedWav(path), max_seconds)
+        except Exception:
+            # WAV payloads the reader cannot map are handled by ffmpeg below
+            pass
+
+    return _load_with_ffmpeg(path, max_seconds)
+
+
+def load_wav(wav: MappedWav, max_seconds: Optional[float] = None) -> PCMAudio:
+    """
+    Get a mapped WAV file as 16-bit PCM.
+
+    Args:
+        wav: Mapped WAV file
+        max_seconds: Convert only this much from the start of the file
+
+    Returns:
+        PCMAudio: Samples at the file's sample rate and channel layout
+
+    Raises:
+        ValueError: If the sample format is not supported
+    """
+    end_frame = int(max_seconds * wav.sample_rate) if max_seconds is not None else None
+    return PCMAudio(wav.to_int16(0, end_frame), wav.sample_rate)
+
+
+def _load_with_ffmpeg(path: Path, max_seconds: Optional[float] = None) -> PCMAudio:
+    """Decode any ffmpeg-readable file, or its first max_seconds, to 16 kHz mono PCM."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"ffmpeg is required to decode {path.suffix or path.name} audio")
+
+    command = [
+        ffmpeg, "-nostdin", "-v", "error",
+        "-i", str(path),
+        "-vn",
+        *(["-t", f"{max_seconds:g}"] if max_seconds is not None else []),
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(DEFAULT_SAMPLE_RATE),
+        "-",
+    ]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {path}: {completed.stderr.decode(errors='replace').strip()}")
+
+    return PCMAudio(np.frombuffer(completed.stdout, dtype="<i2"), DEFAULT_SAMPLE_RATE)
+
+
+def frame_energy_db(samples: np.ndarray, sample_rate: int, frame_ms: int = 30) -> np.ndarray:
+    """
+    Compute the RMS energy of consecutive fixed-size frames.
+
+    Multi-channel samples are mixed down one block at a time, so no mono
+    copy of the whole recording is made.
+
+    Args:
+        samples: Samples in int16 units, either mono or shaped (frames, channels)
+        sample_rate: Sample rate in Hz
+        frame_ms: Frame length in milliseconds
+
+    Returns:
+        np.ndarray: Energy of each frame in dBFS (trailing partial frame dropped)
+    """
+    if samples.ndim == 2 and samples.shape[1] == 1:
+        samples = samples[:, 0]
+    channels = samples.shape[1] if samples.ndim == 2 else 1
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    count = len(samples) // frame_length
+    energy = np.empty(count, dtype=np.float32)
+
+    # Work through the samples in blocks so temporaries stay small for long recordings
+    block = max(1, ENERGY_BLOCK_SAMPLES // (frame_length * channels))
+    for start in range(0, count, block):
+        end = min(count, start + block)
+        frames = samples[start * frame_length:end * frame_length]
+        if channels > 1:
+            frames = frames.mean(axis=1, dtype=np.float32)
+        frames = np.asarray(frames, dtype=np.float32).reshape(end - start, frame_length) / 32768.0
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        energy[start:end] = 20.0 * np.log10(rms + 1e-10)
+    return energy
@@ -0,0 +1,498 @@
+"""
+Batch transcription of many audio files with a resumable on-disk manifest.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from cache import TranscriptionCache
+from concurrency import AdaptiveLimiter
+from config import AzureSpeechConfig
+from hedging import HedgingPolicy
+from index import TranscriptIndex
+from instrumentation import JsonLinesExporter, PrometheusExporter
+from locales import LocaleCache
+from speech_client import AzureSpeechClient, TranscriptionOutcome
+from transcode import TRANSCODE_CODECS, Transcoder
+from utils import INPUT_EXTENSIONS, validate_audio_file, probe_audio
+from writers import WRITERS, write_transcript
+
+
+class BatchManifest:
+    """
+    Append-only JSON-lines record of finished files.
+
+    Every completed file adds one line, so a crashed run loses at most the
+    files that were in flight. The last line for a path wins when loading.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Load an existing manifest or start a new one.
+
+        Args:
+            path: Location of the manifest file
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A partially written last line from a crashed run
+                        continue
+                    self.entries[entry["path"]] = entry
+
+    def is_done(self, audio_path: Path) -> bool:
+        """
+        Check whether a file was already transcribed and has not changed since.
+
+        Args:
+            audio_path: Path to the audio file
+
+        Returns:
+            bool: True if the file can be skipped
+        """
+        entry = self.entries.get(str(audio_path))
+        if not entry or entry.get("status") != "done":
+            return False
+
+        stat = audio_path.stat()
+        return (
+            entry.get("size") == stat.st_size
+            and entry.get("mtime") == stat.st_mtime
+            and Path(entry.get("output", "")).exists()
+        )
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """
+        Append an entry and flush it to disk.
+
+        Args:
+            entry: Manifest entry; must contain "path"
+        """
+        self.entries[entry["path"]] = entry
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def collect_inputs(inputs: Iterable[str]) -> List[Path]:
+    """
+    Expand directories, glob patterns and list files into audio file paths.
+
+    Args:
+        inputs: Directories (searched recursively), glob patterns, audio file
+            paths, or "@file" references to text files with one path per line
+
+    Returns:
+        List[Path]: De-duplicated audio file paths, in input order
+    """
+    paths = []
+    for item in inputs:
+        if item.startswith("@"):
+            with open(item[1:], "r") as f:
+                paths.extend(Path(line.strip()) for line in f if line.strip())
+        elif Path(item).is_dir():
+            paths.extend(
+                sorted(p for p in Path(item).rglob("*") if p.suffix.lower() in INPUT_EXTENSIONS)
+            )
+        elif glob.has_magic(item):
+            paths.extend(sorted(Path(p) for p in glob.glob(item, recursive=True)))
+        else:
+            paths.append(Path(item))
+
+    seen = set()
+    unique = []
+    for path in paths:
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+def input_root(audio_paths: Iterable[Path]) -> Optional[Path]:
+    """
+    Get the deepest directory that contains every input file.
+
+    Args:
+        audio_paths: Paths to the audio files
+
+    Returns:
+        Path, or None if there are no inputs
+    """
+    parents = [str(Path(path).resolve().parent) for path in audio_paths]
+    return Path(os.path.commonpath(parents)) if parents else None
+
+
+def output_path_for(
+    audio_path: Path,
+    output_dir: Path,
+    format: str = "json",
+    root: Optional[Path] = None
+) -> Path:
+    """
+    Get the result file location for an audio file.
+
+    The result keeps the audio file's full name, extension included, so
+    call.wav and call.mp3 get call.wav.json and call.mp3.json. Files under
+    `root` keep their subdirectory below it, so a/call.wav and b/call.wav
+    do not share a result either.
+
+    Args:
+        audio_path: Path to the audio file
+        output_dir: Directory that receives the results
+        format: Output format, which sets the file extension
+        root: Directory whose layout is mirrored in output_dir
+
+    Returns:
+        Path: Result path inside output_dir
+    """
+    extension = WRITERS[format].extension if format in WRITERS else ".json"
+    relative = Path(Path(audio_path).name)
+    if root is not None:
+        try:
+            relative = Path(audio_path).resolve().relative_to(Path(root).resolve())
+        except ValueError:
+            # Outside the root; the name alone is used
+            pass
+    return output_dir / relative.parent / f"{relative.name}{extension}"
+
+
+def write_result(result: Dict[str, Any], output_path: Path, format: str = "json") -> None:
+    """
+    Write a transcription result atomically.
+
+    Args:
+        result: Transcription response
+        output_path: Destination file
+        format: "json" for the full response, or one of the writers' formats
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        if format == "json":
+            json.dump(result, f, indent=2)
+        else:
+            write_transcript(result, f, format)
+    os.replace(temp_path, output_path)
+
+
+def run_batch(
+    client: AzureSpeechClient,
+    audio_paths: List[Path],
+    output_dir: Path,
+    manifest: BatchManifest,
+    locales: List[str] = ["en-US"],
+    max_workers: int = 4,
+    format: str = "json",
+    limiter: Optional[AdaptiveLimiter] = None,
+    index: Optional[TranscriptIndex] = None,
+    pack_max_clip_seconds: Optional[float] = None,
+    probe_seconds: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Transcribe files that the manifest does not mark as done.
+
+    Args:
+        client: Client used for every request
+        audio_paths: Files to transcribe
+        output_dir: Directory that receives the results
+        manifest: Manifest used to skip and record files
+        locales: List of language locales for transcription
+        max_workers: Maximum number of requests in flight at once
+        format: Output format of the result files
+        limiter: Adaptive concurrency limit used instead of max_workers
+        index: Search index that receives every result, keyed by the audio path
+        pack_max_clip_seconds: Pack files up to this long several to a
+            request (see AzureSpeechClient.transcribe_many), or None to
+            send every file on its own
+        probe_seconds: With several locales, identify each file's locale
+            from this much speech before its upload (see
+            AzureSpeechClient.transcribe_identified)
+
+    Returns:
+        List of manifest entries written during this run
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Taken from every input, not only the pending ones, so a resumed run keeps the layout
+    root = input_root(audio_paths)
+
+    pending = []
+    for audio_path in audio_paths:
+        if manifest.is_done(audio_path):
+            continue
+        with client.instrumentation.measure("validate", audio=audio_path.name):
+            valid = validate_audio_file(audio_path)
+        if not valid:
+            print(f"Skipping invalid or non-existent audio file: {audio_path}", file=sys.stderr)
+            continue
+        pending.append(audio_path)
+
+    skipped = len(audio_paths) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} file(s) that are already done or invalid")
+
+    entries = []
+    if pack_max_clip_seconds is not None:
+        clips = client.packable(pending, pack_max_clip_seconds, probe_seconds)
+        if clips:
+            print(f"Packing {len(clips)} short file(s) several to a request")
+    outcomes = client.transcribe_many(pending, locales, max_workers=max_workers, limiter=limiter,
+                                      probe_seconds=probe_seconds, pack_max_clip_seconds=pack_max_clip_seconds)
+    for outcome in outcomes:
+        entry = _record_outcome(outcome, output_dir, manifest, format, root)
+        entries.append(entry)
+        if entry["status"] == "done":
+            if index is not None:
+                index.add_result(entry["path"], outcome.result)
+            print(f"[{len(entries)}/{len(pending)}] {entry['path']}: {entry['elapsed']:.2f}s "
+                  f"({entry['realtime_factor']:.1f}x realtime)")
+        else:
+            print(f"[{len(entries)}/{len(pending)}] {entry['path']}: failed: {entry['error']}",
+                  file=sys.stderr)
+
+    return entries
+
+
+def _record_outcome(
+    outcome: TranscriptionOutcome,
+    output_dir: Path,
+    manifest: BatchManifest,
+    format: str = "json",
+    root: Optional[Path] = None
+) -> Dict[str, Any]:
+    """Persist one outcome and its manifest entry."""
+    audio_path = Path(outcome.audio_file)
+    entry = {
+        "path": str(audio_path),
+        "size": None,
+        "mtime": None,
+        "elapsed": outcome.elapsed,
+    }
+    error = outcome.error
+    try:
+        stat = audio_path.stat()
+        entry.update(size=stat.st_size, mtime=stat.st_mtime)
+    except OSError as e:
+        # Moved or deleted during the run: record it as failed and carry on
+        error = error or e
+
+    if error is not None:
+        entry.update(status="failed", error=str(error))
+        manifest.record(entry)
+        return entry
+
+    output_path = output_path_for(audio_path, output_dir, format, root)
+    write_result(outcome.result, output_path, format)
+
+    duration = _audio_seconds(audio_path, outcome.result)
+    entry.update(
+        status="done",
+        output=str(output_path),
+        duration=duration,
+        realtime_factor=duration / outcome.elapsed if outcome.elapsed > 0 else 0,
+    )
+    manifest.record(entry)
+    return entry
+
+
+def _audio_seconds(audio_path: Path, result: Dict[str, Any]) -> float:
+    """Get the audio duration, preferring the service-reported value."""
+    if "durationMilliseconds" in result:
+        return result["durationMilliseconds"] / 1000.0
+    try:
+        # Cached from validation, so this does not re-read the file
+        return probe_audio(audio_path).duration
+    except Exception:
+        return 0.0
+
+
+def print_summary(entries: List[Dict[str, Any]], wall_seconds: float) -> None:
+    """
+    Print aggregate throughput for a batch run.
+
+    Args:
+        entries: Manifest entries written during the run
+        wall_seconds: Wall-clock time of the run
+    """
+    done = [entry for entry in entries if entry["status"] == "done"]
+    failed = len(entries) - len(done)
+    audio_seconds = sum(entry["duration"] for entry in done)
+
+    print("\nBatch summary:")
+    print(f"  Files transcribed: {len(done)} ({failed} failed)")
+    print(f"  Audio transcribed: {audio_seconds / 3600:.2f} hours")
+    print(f"  Wall-clock time: {wall_seconds:.2f} seconds")
+    if done:
+        mean_factor = sum(entry["realtime_factor"] for entry in done) / len(done)
+        print(f"  Mean per-file speed: {mean_factor:.1f}x realtime")
+    if wall_seconds > 0:
+        print(f"  Throughput: {audio_seconds / wall_seconds:.1f} audio hours per wall-clock hour")
+
+
+def main():
+    """Main entry point for batch transcription."""
+    parser = argparse.ArgumentParser(description="Batch transcribe audio files using Azure Speech-to-Text API")
+    parser.add_argument("inputs", nargs="+",
+                        help="Audio files, directories, glob patterns or @file lists to transcribe")
+    parser.add_argument("--output-dir", "-o", required=True, help="Directory for the transcription results")
+    parser.add_argument("--format", "-f", choices=["json", *WRITERS], default="json",
+                        help="Format of the result files: full JSON response, JSON lines per phrase, "
+                             "SRT or WebVTT subtitles, or plain text (default: json)")
+    parser.add_argument("--manifest", "-m",
+                        help="Manifest file used to resume interrupted runs (default: OUTPUT_DIR/manifest.jsonl)")
+    parser.add_argument("--workers", "-w", type=int, default=4,
+                        help="Maximum number of files in flight (default: 4)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Adapt the number of files in flight to throttling and latency, "
+                             "up to --workers")
+    parser.add_argument("--hedge", type=float, metavar="PERCENTILE",
+                        help="Send a second copy of requests slower than this latency percentile "
+                             "of recent requests, e.g. 95")
+    parser.add_argument("--hedge-max-extra", type=float, default=0.05,
+                        help="Highest ratio of extra requests hedging may add (default: 0.05)")
+    parser.add_argument("--pack", type=float, metavar="SECONDS", nargs="?", const=30.0,
+                        help="Pack files up to SECONDS long (default: 30) several to a request "
+                             "and split the results per file")
+    parser.add_argument("--transcode", choices=TRANSCODE_CODECS, nargs="?", const="wav",
+                        help="Convert WAV and FLAC files to 16 kHz mono before upload, as WAV (default), "
+                             "or FLAC or Opus when ffmpeg is installed")
+    parser.add_argument("--cache-dir", help="Directory for cached transcription results")
+    parser.add_argument("--cache-max-mb", type=float,
+                        help="Evict least recently used cache entries beyond this size in MB")
+    parser.add_argument("--index", help="Add every result to this search index database (see index.py)")
+    parser.add_argument("--locale", "-l", default="en-US", help="Locale for transcription (default: en-US)")
+    parser.add_argument("--skip-locale-check", action="store_true",
+                        help="Do not check the locale against the cached list of supported locales")
+    parser.add_argument("--candidate-locales", metavar="LOCALES",
+                        help="Comma-separated locales the files may be in, e.g. en-US,fr-FR; a short speech "
+                             "probe picks one per file before its upload (overrides --locale)")
+    parser.add_argument("--probe-seconds", type=float, default=30.0,
+                        help="Speech sent in the --candidate-locales probe in seconds (default: 30)")
+    parser.add_argument("--region", "-r", help="Azure region (overrides .env setting)")
+    parser.add_argument("--api-key", "-k", help="API key (overrides .env setting)")
+    parser.add_argument("--metrics-jsonl", help="Append per-phase timing events to this JSON lines file")
+    parser.add_argument("--metrics-prom", help="Write per-phase timing metrics to this file in Prometheus text format")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = BatchManifest(Path(args.manifest) if args.manifest else output_dir / "manifest.jsonl")
+
+    audio_paths = collect_inputs(args.inputs)
+    if not audio_paths:
+        print("Error: No audio files matched the inputs", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        config = AzureSpeechConfig(
+            region=args.region,
+            api_key=args.api_key
+        )
+        cache = None
+        if args.cache_dir:
+            max_bytes = int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None
+            cache = TranscriptionCache(args.cache_dir, max_bytes=max_bytes)
+        hedging = None
+        if args.hedge is not None:
+            hedging = HedgingPolicy(percentile=args.hedge, max_extra_load=args.hedge_max_extra)
+        transcoder = Transcoder(args.transcode) if args.transcode else None
+        client = AzureSpeechClient(config, pool_size=args.workers, cache=cache, hedging=hedging,
+                                   transcoder=transcoder)
+
+        locales = [args.locale]
+        if args.candidate_locales:
+            locales = [locale.strip() for locale in args.candidate_locales.split(",") if locale.strip()]
+
+        # Reject unsupported locales before any audio is uploaded
+        if not args.skip_locale_check:
+            try:
+                locales = LocaleCache(client).validate(locales)
+            except requests.RequestException as e:
+                print(f"Warning: Could not fetch the supported locales: {e}", file=sys.stderr)
+    except ValueError as e:
+        print(f"Configuration Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    jsonl_exporter = prom_exporter = None
+    if args.metrics_jsonl:
+        jsonl_exporter = JsonLinesExporter(args.metrics_jsonl)
+        client.add_hook(jsonl_exporter)
+    if args.metrics_prom:
+        prom_exporter = PrometheusExporter()
+        client.add_hook(prom_exporter)
+
+    index = TranscriptIndex(args.index) if args.index else None
+    limiter = None
+    if args.adaptive:
+        limiter = AdaptiveLimiter(initial=min(4, args.workers), max_limit=args.workers,
+                                  instrumentation=client.instrumentation)
+        print(f"Transcribing {len(audio_paths)} file(s) with up to {args.workers} adaptive worker(s)")
+    else:
+        print(f"Transcribing {len(audio_paths)} file(s) with {args.workers} worker(s)")
+    start_time = time.time()
+    entries = run_batch(
+        client,
+        audio_paths,
+        output_dir,
+        manifest,
+        locales=locales,
+        max_workers=args.workers,
+        format=args.format,
+        limiter=limiter,
+        index=index,
+        pack_max_clip_seconds=args.pack,
+        probe_seconds=args.probe_seconds if args.candidate_locales else None
+    )
+    print_summary(entries, time.time() - start_time)
+    if index is not None:
+        index.close()
+    if limiter is not None:
+        print(f"  Concurrency: final limit {int(limiter.limit)}, "
+              f"{limiter.increases} increase(s), {limiter.decreases} decrease(s)")
+    if jsonl_exporter is not None:
+        jsonl_exporter.close()
+    if prom_exporter is not None:
+        prom_exporter.write(args.metrics_prom)
+    if hedging is not None:
+        print(f"  Hedging: {hedging.hedges} hedged request(s), {hedging.hedge_wins} won by the hedge "
+              f"({hedging.extra_load:.1%} extra load)")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"  Cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['evictions']} eviction(s)")
+    if len(client.locale_probes):
+        identified: Dict[str, int] = {}
+        for guess in client.locale_probes.guesses():
+            if guess is not None:
+                identified[guess.locale] = identified.get(guess.locale, 0) + 1
+        counts = ", ".join(f"{locale} {count}" for locale, count in sorted(identified.items()))
+        print(f"  Locales: {len(client.locale_probes)} file(s) probed ({counts or 'no speech found'})")
+    if transcoder is not None:
+        stats = transcoder.stats()
+        saved = stats["bytes_saved"] / stats["bytes_in"] if stats["bytes_in"] else 0.0
+        print(f"  Transcoding: {stats['files']} file(s) shrunk from {stats['bytes_in'] / 1e6:.1f} MB "
+              f"to {stats['bytes_out'] / 1e6:.1f} MB ({saved:.0%} saved), {stats['skipped']} sent as is")
+    if len(client.endpoints.states) > 1:
+        for stats in client.endpoints.stats():
+            print(f"  Endpoint {stats['endpoint']}: {stats['requests']} attempt(s), {stats['successes']} succeeded, "
+                  f"{stats['throttled']} throttled, {stats['ejections']} ejection(s)")
+
+    if any(entry["status"] != "done" for entry in entries):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Offline benchmark of the speech clients against the local stand-in server.
+
+Every scenario (client mode x file duration x concurrency) runs in a fresh
+interpreter so its peak RSS is measured in isolation. Results are written
+as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from async_client import AsyncAzureSpeechClient
+from config import AzureSpeechConfig
+from hedging import HedgingPolicy
+from retry import RetryPolicy
+from speech_client import AzureSpeechClient
+from standin_server import StandInSpeechServer
+
+
+MODES = ("sync", "async", "chunked")
+
+
+def make_test_audio(path: Path, seconds: float, sample_rate: int = 16000) -> Path:
+    """
+    Write a synthetic 16-bit mono WAV file of speech-like bursts and pauses.
+
+    Args:
+        path: Destination file
+        seconds: Duration in seconds
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Path: The written file
+    """
+    rng = np.random.default_rng(0)
+    frames = int(seconds * sample_rate)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        # Write a minute at a time to keep memory flat for long files
+        block = 60 * sample_rate
+        for start in range(0, frames, block):
+            count = min(block, frames - start)
+            t = np.arange(start, start + count)
+            # 4 seconds of noise bursts followed by 1 second of silence
+            talking = (t // sample_rate) % 5 != 4
+            samples = rng.normal(0, 3000, count) * talking
+            f.writeframes(samples.astype("<i2").tobytes())
+    return path
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Get a percentile of a list of values, or 0.0 if it is empty."""
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one scenario and measure it.
+
+    Args:
+        scenario: Dict with mode, endpoint, audio_file, audio_seconds,
+            concurrency, requests and hedge_percentile (None for no hedging)
+
+    Returns:
+        Dict with the scenario parameters and its measurements
+    """
+    config = AzureSpeechConfig(api_key="benchmark", endpoint=scenario["endpoint"])
+    audio_file = Path(scenario["audio_file"])
+    mode = scenario["mode"]
+    concurrency = scenario["concurrency"]
+    count = scenario["requests"]
+    retry_policy = RetryPolicy(max_retries=8, backoff_base=0.05, backoff_max=2.0)
+    hedge_percentile = scenario.get("hedge_percentile")
+
+    latencies = []
+    failures = 0
+    start_time = time.perf_counter()
+
+    def sync_client() -> AzureSpeechClient:
+        hedging = HedgingPolicy(percentile=hedge_percentile) if hedge_percentile else None
+        return AzureSpeechClient(config, retry_policy=retry_policy, pool_size=concurrency, hedging=hedging)
+
+    hedges = 0
+    if mode == "sync":
+        with sync_client() as client:
+            outcomes = client.transcribe_many([audio_file] * count, max_workers=concurrency)
+            for outcome in outcomes:
+                latencies.append(outcome.elapsed)
+                failures += outcome.error is not None
+            hedges = client.hedging.hedges if client.hedging else 0
+
+    elif mode == "async":
+        async def run_all():
+            nonlocal failures
+            async with AsyncAzureSpeechClient(
+                config,
+                max_connections=concurrency,
+                max_concurrency_per_host=concurrency,
+                retry_policy=retry_policy
+            ) as client:
+                # Limit concurrency here too, so latency excludes time spent queued
+                slots = asyncio.Semaphore(concurrency)
+
+                async def timed():
+                    nonlocal failures
+                    async with slots:
+                        started = time.perf_counter()
+                        try:
+                            await client.transcribe(audio_file)
+                        except Exception:
+                            failures += 1
+                        latencies.append(time.perf_counter() - started)
+                await asyncio.gather(*(timed() for _ in range(count)))
+        asyncio.run(run_all())
+
+    elif mode == "chunked":
+        with sync_client() as client:
+            for _ in range(count):
+                started = time.perf_counter()
+                try:
+                    client.transcribe_chunked(audio_file, chunk_seconds=scenario["chunk_seconds"],
+                                              max_workers=concurrency)
+                except Exception:
+                    failures += 1
+                latencies.append(time.perf_counter() - started)
+            hedges = client.hedging.hedges if client.hedging else 0
+
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+
+    wall = time.perf_counter() - start_time
+    upload_bytes = audio_file.stat().st_size * count
+    audio_seconds = scenario["audio_seconds"] * count
+
+    return {
+        "mode": mode,
+        "audio_seconds": scenario["audio_seconds"],
+        "file_bytes": audio_file.stat().st_size,
+        "concurrency": concurrency,
+        "requests": count,
+        "failures": failures,
+        "hedges": hedges,
+        "wall_seconds": wall,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "upload_mb_per_second": upload_bytes / wall / 1e6 if wall > 0 else 0.0,
+        "realtime_factor": audio_seconds / wall if wall > 0 else 0.0,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_benchmark(
+    modes: List[str],
+    durations: List[float],
+    concurrency_levels: List[int],
+    requests_per_scenario: int,
+    server: StandInSpeechServer,
+    chunk_seconds: float = 60.0,
+    hedge_percentile: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Run every combination of mode, audio duration and concurrency.
+
+    Args:
+        modes: Client modes to run ("sync", "async", "chunked")
+        durations: Audio durations in seconds
+        concurrency_levels: Numbers of requests in flight
+        requests_per_scenario: Files transcribed per scenario
+        server: Running stand-in server
+        chunk_seconds: Chunk length for chunked mode
+        hedge_percentile: Latency percentile after which the sync and
+            chunked clients hedge requests, or None for no hedging
+
+    Returns:
+        Dict with the server settings and one result per scenario
+    """
+    results = []
+    # A fresh interpreter per scenario keeps peak RSS measurements independent
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for seconds in durations:
+            audio_file = make_test_audio(Path(temp_dir) / f"bench-{seconds:g}s.wav", seconds)
+            for mode in modes:
+                for concurrency in concurrency_levels:
+                    scenario = {
+                        "mode": mode,
+                        "endpoint": server.url,
+                        "audio_file": str(audio_file),
+                        "audio_seconds": seconds,
+                        "concurrency": concurrency,
+                        "requests": requests_per_scenario,
+                        "chunk_seconds": chunk_seconds,
+                        "hedge_percentile": hedge_percentile,
+                    }
+                    with context.Pool(1) as pool:
+                        result = pool.apply(run_scenario, (scenario,))
+                    print(f"{mode:>8} {seconds:>7g}s x{concurrency:<3} "
+                          f"p50={result['latency_p50']:.3f}s p99={result['latency_p99']:.3f}s "
+                          f"{result['realtime_factor']:.1f}x realtime", file=sys.stderr)
+                    results.append(result)
+
+    return {
+        "server": {
+            "latency": server.latency,
+            "seconds_per_audio_second": server.seconds_per_audio_second,
+            "upload_mbps": server.upload_bytes_per_second / 125000 if server.upload_bytes_per_second else None,
+            "error_rate": server.error_rate,
+            "error_status": server.error_status,
+            "straggler_rate": server.straggler_rate,
+            "straggler_latency": server.straggler_latency,
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    """Main entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the speech clients against a local stand-in server")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="Client modes to run")
+    parser.add_argument("--durations", nargs="+", type=float, default=[10, 60, 600],
+                        help="Audio durations in seconds (default: 10 60 600)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16],
+                        help="Concurrency levels (default: 1 4 16)")
+    parser.add_argument("--requests", type=int, default=16, help="Files transcribed per scenario (default: 16)")
+    parser.add_argument("--chunk-seconds", type=float, default=60.0,
+                        help="Chunk length for chunked mode (default: 60)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in fixed processing time in seconds")
+    parser.add_argument("--seconds-per-audio-second", type=float, default=0.002,
+                        help="Stand-in processing time per second of audio")
+    parser.add_argument("--upload-mbps", type=float, help="Stand-in upload bandwidth limit in megabits per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests the stand-in rejects")
+    parser.add_argument("--error-status", type=int, default=429, help="Status code of injected errors")
+    parser.add_argument("--straggler-rate", type=float, default=0.0,
+                        help="Fraction of requests the stand-in answers slowly")
+    parser.add_argument("--straggler-latency", type=float, default=2.0,
+                        help="Extra processing time of slow requests in seconds (default: 2)")
+    parser.add_argument("--hedge", type=float, metavar="PERCENTILE",
+                        help="Hedge sync and chunked requests slower than this latency percentile")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    server = StandInSpeechServer(
+        latency=args.latency,
+        seconds_per_audio_second=args.seconds_per_audio_second,
+        upload_mbps=args.upload_mbps,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=0.05,
+        straggler_rate=args.straggler_rate,
+        straggler_latency=args.straggler_latency,
+        seed=0
+    )
+    with server:
+        report = run_benchmark(
+            args.modes,
+            args.durations,
+            args.concurrency,
+            args.requests,
+            server,
+            chunk_seconds=args.chunk_seconds,
+            hedge_percentile=args.hedge
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark report saved to: {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
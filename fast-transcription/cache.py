@@ -0,0 +1,208 @@
+"""
+Content-addressed on-disk cache of transcription results.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+# Eviction makes room down to this fraction of max_bytes, so a full cache
+# is scanned once per that much writing rather than on every put
+EVICT_TARGET = 0.9
+
+class TranscriptionCache:
+    """
+    Stores transcription responses keyed by the audio bytes and request definition.
+
+    Each entry is one JSON file named after its key. The file's access time
+    records when the entry was last used, and its modification time when it
+    was written, so eviction needs no separate index:
+
+    - entries older than `max_age_seconds` are treated as misses and removed
+    - when the cache grows beyond `max_bytes`, least recently used entries
+      are removed first
+
+    The total size is counted as entries are written and removed, so the
+    directory is only scanned when the count says the limit was passed.
+    Eviction then frees space down to EVICT_TARGET of the limit.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: Optional[int] = None,
+        max_age_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory holding the cache entries; created if missing
+            max_bytes: Maximum total size of the entries, or None for no limit
+            max_age_seconds: Maximum age of an entry, or None for no limit
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Total size of the entries, None until the first scan
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(audio_digest: str, definition: Dict[str, Any]) -> str:
+        """
+        Get the cache key for a request.
+
+        Args:
+            audio_digest: SHA-256 hex digest of the audio bytes
+            definition: Definition payload sent with the audio
+
+        Returns:
+            str: Hex key identifying the request
+        """
+        canonical = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{audio_digest}:{canonical}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Dict containing the cached response, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if self.max_age_seconds is not None and time.time() - stat.st_mtime > self.max_age_seconds:
+                self._remove(path, stat.st_size)
+                raise FileNotFoundError(path)
+            with open(path, "r") as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # Mark the entry as recently used without changing its age
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            # Evicted by another thread or process since it was read
+            pass
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Store a response and evict old entries if the cache is over its limits.
+
+        Args:
+            key: Key from make_key
+            result: Transcription response
+        """
+        path = self._path(key)
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(result, f)
+        size = temp_path.stat().st_size
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(temp_path, path)
+
+        if self.max_bytes is not None:
+            with self._lock:
+                if self._total_bytes is not None:
+                    self._total_bytes += size - replaced
+                over = self._total_bytes is None or self._total_bytes > self.max_bytes
+            if over:
+                self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least recently used ones until under
+        EVICT_TARGET of max_bytes.
+
+        Returns:
+            int: Number of entries removed
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self.max_age_seconds is not None and now - stat.st_mtime > self.max_age_seconds:
+                removed += self._remove(path)
+            else:
+                entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if self.max_bytes is not None:
+            target = self.max_bytes * EVICT_TARGET
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                removed += self._remove(path)
+                total -= size
+
+        # The scan also takes in entries written by other processes
+        with self._lock:
+            self._total_bytes = total
+        return removed
+
+    def _remove(self, path: Path, size: Optional[int] = None) -> int:
+        """Delete one entry, tolerating concurrent removal."""
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        with self._lock:
+            self.evictions += 1
+            if size is not None and self._total_bytes is not None:
+                self._total_bytes -= size
+        return 1
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache counters.
+
+        Returns:
+            Dict with hits, misses, evictions and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,142 @@
+"""
+Silence-aware splitting of long recordings into independently transcribable chunks.
+"""
+
+import io
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Union
+
+import numpy as np
+
+from audio import PCMAudio, load_pcm, load_wav, frame_energy_db
+from utils import MappedWav
+
+
+class AudioChunk:
+    """A segment of a longer recording and its position on the original timeline."""
+
+    def __init__(self, index: int, audio: PCMAudio, start_frame: int, wav: Optional[MappedWav] = None):
+        """
+        Initialize the chunk.
+
+        Args:
+            index: Position of the chunk in the recording
+            audio: Samples covered by the chunk
+            start_frame: Frame in the original recording where the chunk starts
+            wav: Mapped WAV file the chunk was cut from, if any
+        """
+        self.index = index
+        self.audio = audio
+        self.start_frame = start_frame
+        self.wav = wav
+
+    @property
+    def offset_ms(self) -> int:
+        """Start of the chunk on the original timeline, in milliseconds."""
+        return int(round(self.start_frame * 1000 / self.audio.sample_rate))
+
+    def to_file(self) -> BinaryIO:
+        """
+        Encode the chunk as a WAV file ready for upload.
+
+        Chunks of a mapped WAV file are a new header in front of the mapped
+        samples, in their original encoding, with nothing copied. Other
+        chunks are encoded as 16-bit PCM in memory.
+
+        Returns:
+            BinaryIO: WAV file named after the chunk index
+        """
+        if self.wav is not None:
+            segment = self.wav.segment(self.start_frame, self.start_frame + self.audio.frames)
+            segment.name = f"chunk-{self.index:04d}.wav"
+            return segment
+
+        buffer = io.BytesIO(self.audio.to_wav_bytes())
+        buffer.name = f"chunk-{self.index:04d}.wav"
+        return buffer
+
+
+def find_split_points(
+    audio: PCMAudio,
+    chunk_seconds: float = 300.0,
+    search_seconds: float = 30.0,
+    frame_ms: int = 30,
+    smoothing_ms: int = 300
+) -> List[int]:
+    """
+    Choose frame positions to split audio at, preferring silence.
+
+    Each cut is placed at the quietest point within `search_seconds` either
+    side of the nominal chunk boundary, so chunks never exceed
+    `chunk_seconds + search_seconds`. The search window is capped at half a
+    chunk so cuts cannot collapse into very short chunks.
+
+    Args:
+        audio: Decoded audio to split
+        chunk_seconds: Nominal chunk length in seconds
+        search_seconds: How far around each nominal boundary to look for silence
+        frame_ms: Analysis frame length in milliseconds
+        smoothing_ms: Window used to favour longer pauses over single quiet frames
+
+    Returns:
+        List[int]: Sorted frame indices to cut at (empty if no split is needed)
+    """
+    # Keep every chunk at least half the nominal length
+    search_seconds = min(search_seconds, chunk_seconds / 2)
+    if audio.duration <= chunk_seconds + search_seconds:
+        return []
+
+    energy = frame_energy_db(audio.samples, audio.sample_rate, frame_ms)
+    window = max(1, smoothing_ms // frame_ms)
+    smoothed = np.convolve(energy, np.ones(window, dtype=np.float32) / window, mode="same")
+
+    frames_per_analysis = int(audio.sample_rate * frame_ms / 1000)
+    chunk_frames = int(chunk_seconds * 1000 / frame_ms)
+    search_frames = int(search_seconds * 1000 / frame_ms)
+
+    cuts = []
+    position = 0
+    while len(smoothed) - position > chunk_frames + search_frames:
+        low = position + chunk_frames - search_frames
+        high = min(len(smoothed), position + chunk_frames + search_frames)
+        quietest = low + int(np.argmin(smoothed[low:high]))
+        cuts.append(quietest * frames_per_analysis + frames_per_analysis // 2)
+        position = quietest
+
+    return cuts
+
+
+def split_audio(
+    audio_file: Union[str, Path],
+    chunk_seconds: float = 300.0,
+    search_seconds: float = 30.0
+) -> List[AudioChunk]:
+    """
+    Decode an audio file and split it at silence boundaries.
+
+    WAV files are memory-mapped, so their chunks are uploaded straight from
+    the mapping instead of being re-encoded.
+
+    Args:
+        audio_file: Path to the audio file
+        chunk_seconds: Nominal chunk length in seconds
+        search_seconds: How far around each nominal boundary to look for silence
+
+    Returns:
+        List[AudioChunk]: Chunks covering the whole recording, in order
+    """
+    wav = None
+    if Path(audio_file).suffix.lower() == ".wav":
+        try:
+            wav = MappedWav(audio_file)
+            audio = load_wav(wav)
+        except Exception:
+            wav = None
+    if wav is None:
+        audio = load_pcm(audio_file)
+    bounds = [0] + find_split_points(audio, chunk_seconds, search_seconds) + [audio.frames]
+
+    return [
+        AudioChunk(index, audio.slice(start, end), start, wav)
+        for index, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    ]
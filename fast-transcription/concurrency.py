@@ -0,0 +1,193 @@
+"""
+Adaptive concurrency limit for bulk transcription.
+
+AdaptiveLimiter applies additive-increase/multiplicative-decrease (AIMD),
+the same scheme TCP uses for its congestion window. Requests are allowed
+to pile up while the service answers quickly. The limit is cut back as
+soon as the service throttles or latency inflates.
+"""
+
+import collections
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from instrumentation import Instrumentation
+
+
+# Status codes that signal the service is overloaded rather than failing
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on the number of requests in flight.
+
+    - Slow start: until the first decrease, every healthy completion
+      raises the limit by one, which doubles it every round trip.
+    - Additive increase: afterwards every healthy completion raises it by
+      1/limit, about one extra request per round trip. The limit only
+      grows while it is actually being used.
+    - Multiplicative decrease: a throttled response (429/503) or
+      inflated latency multiplies the limit by `decrease_factor`. Only one
+      decrease happens per round trip, so a burst of 429s from requests
+      that were already in flight counts once.
+    - Retry-After pauses new requests for the requested time.
+
+    Latency is compared per second of audio, so long and short files can
+    be mixed. The baseline is the lowest recent normalised latency, and
+    latency counts as inflated when its moving average exceeds the
+    baseline by `latency_tolerance` times.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        window: int = 50,
+        instrumentation: Optional[Instrumentation] = None
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial: Starting limit
+            min_limit: Lowest limit
+            max_limit: Highest limit
+            decrease_factor: Factor applied to the limit on congestion
+            latency_tolerance: Ratio of smoothed to baseline latency that
+                counts as congestion
+            window: Number of recent latency samples the baseline is taken from
+            instrumentation: Registry that receives a "concurrency" event
+                for every change of the limit
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.instrumentation = instrumentation
+
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+
+        self._slow_start = True
+        self._samples = collections.deque(maxlen=window)
+        self._smoothed: Optional[float] = None
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Wait for a slot under the current limit.
+
+        Returns:
+            float: time.monotonic() start time to pass to release
+        """
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                elif self.in_flight >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    break
+            self.in_flight += 1
+            return time.monotonic()
+
+    def on_throttle(self, started: float, retry_after: Optional[float] = None) -> None:
+        """
+        Report a throttled response as soon as it arrives.
+
+        Args:
+            started: Start time returned by acquire
+            retry_after: Wait the service asked for, in seconds
+        """
+        with self._condition:
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            event = self._decrease(started, "throttled")
+        self._emit(event)
+
+    def release(self, started: float, audio_seconds: Optional[float] = None, throttled: bool = False) -> None:
+        """
+        Free a slot and adjust the limit from the request's outcome.
+
+        Args:
+            started: Start time returned by acquire
+            audio_seconds: Duration of the transcribed audio, used to
+                normalise latency; None for failed requests
+            throttled: Whether the request was throttled at any point
+        """
+        now = time.monotonic()
+        event = None
+        with self._condition:
+            self.in_flight -= 1
+            saturated = self.in_flight + 1 >= int(self.limit)
+
+            if throttled:
+                event = self._decrease(started, "throttled")
+            elif audio_seconds is not None:
+                latency = (now - started) / max(audio_seconds, 1.0)
+                self._samples.append(latency)
+                self._smoothed = latency if self._smoothed is None else 0.8 * self._smoothed + 0.2 * latency
+                baseline = min(self._samples)
+                if len(self._samples) >= 5 and self._smoothed > self.latency_tolerance * baseline:
+                    event = self._decrease(started, "latency")
+                elif saturated:
+                    event = self._increase()
+
+            self._condition.notify_all()
+        self._emit(event)
+
+    def _increase(self) -> Optional[Dict[str, Any]]:
+        # Called under the lock; the caller emits the event once it is
+        # released, so slow hooks never hold up acquire and release
+        if self.limit >= self.max_limit:
+            return None
+        step = 1.0 if self._slow_start else 1.0 / self.limit
+        self.limit = min(float(self.max_limit), self.limit + step)
+        self.increases += 1
+        return self.snapshot(decision="increase", reason="healthy")
+
+    def _decrease(self, started: float, reason: str) -> Optional[Dict[str, Any]]:
+        # Requests that started before the last cut were sent under the old limit
+        if started < self._last_decrease:
+            return None
+        self._slow_start = False
+        self._last_decrease = time.monotonic()
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self.decreases += 1
+        # Start measuring inflation afresh at the new limit
+        self._smoothed = None
+        return self.snapshot(decision="decrease", reason=reason)
+
+    def _emit(self, event: Optional[Dict[str, Any]]) -> None:
+        if event is not None and self.instrumentation is not None and self.instrumentation.enabled:
+            self.instrumentation.emit(event)
+
+    def snapshot(self, **fields) -> Dict[str, Any]:
+        """
+        Get the limiter's state as a "concurrency" event.
+
+        Args:
+            **fields: Extra fields, such as the decision that was made
+
+        Returns:
+            Dict describing the current limit
+        """
+        return {
+            "event": "concurrency",
+            "timestamp": time.time(),
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            **fields,
+        }
@@ -9,11 +9,89 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+DEFAULT_API_VERSION = "2024-11-15"
+
+
+class SpeechEndpoint:
+    """One Speech resource in an endpoint pool: a region or base URL and its key."""
+    
+    def __init__(self, api_key, region=None, endpoint=None, api_version=DEFAULT_API_VERSION):
+        """
+        Initialize the endpoint.
+        
+        Args:
+            api_key (str): API subscription key of the resource
+            region (str, optional): Azure region of the resource
+            endpoint (str, optional): Base URL of the resource, used instead of the region
+            api_version (str, optional): API version. Defaults to "2024-11-15".
+        """
+        if not (region or endpoint) or not api_key:
+            raise ValueError("An endpoint needs a region or base URL and an API key")
+        self.api_key = api_key
+        self.region = region
+        self.endpoint = endpoint
+        self.api_version = api_version
+    
+    @property
+    def name(self):
+        """Get the label used for the endpoint in stats and metrics."""
+        return self.endpoint.rstrip("/").split("://")[-1] if self.endpoint else self.region
+    
+    @property
+    def base_url(self):
+        """Get the base URL for API requests."""
+        if self.endpoint:
+            return f"{self.endpoint.rstrip('/')}/speechtotext"
+        return f"https://{self.region}.api.cognitive.microsoft.com/speechtotext"
+    
+    @property
+    def transcribe_url(self):
+        """Get the URL for transcription requests."""
+        return f"{self.base_url}/transcriptions:transcribe?api-version={self.api_version}"
+    
+    @property
+    def locales_url(self):
+        """Get the URL for supported locales requests."""
+        return f"{self.base_url}/locales?api-version={self.api_version}"
+
+
+def parse_endpoints(value, api_version=DEFAULT_API_VERSION):
+    """
+    Parse an endpoint pool from a string such as AZURE_SPEECH_ENDPOINTS.
+    
+    Entries are separated by commas and written as REGION=KEY or
+    BASE_URL=KEY, for example
+    "westeurope=key1,eastus=key2,https://my-resource.cognitiveservices.azure.com=key3".
+    
+    Args:
+        value (str): Endpoint list
+        api_version (str, optional): API version of every endpoint
+    
+    Returns:
+        list: SpeechEndpoint for each entry, in order
+    
+    Raises:
+        ValueError: If an entry has no key
+    """
+    endpoints = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        target, _, api_key = entry.partition("=")
+        if not api_key:
+            raise ValueError(f"Endpoint entry without a key: {target}")
+        if target.startswith(("http://", "https://")):
+            endpoints.append(SpeechEndpoint(api_key, endpoint=target, api_version=api_version))
+        else:
+            endpoints.append(SpeechEndpoint(api_key, region=target, api_version=api_version))
+    return endpoints
+
 
 class AzureSpeechConfig:
     """Configuration class for Azure Speech-to-Text API."""
     
-    def __init__(self, region=None, api_key=None, api_version="2024-11-15"):
+    def __init__(self, region=None, api_key=None, api_version=DEFAULT_API_VERSION, endpoint=None, endpoints=None):
         """
         Initialize configuration with API credentials.
         
@@ -21,23 +99,52 @@ class AzureSpeechConfig:
             region (str, optional): Azure region. Defaults to env var AZURE_SPEECH_REGION.
             api_key (str, optional): API subscription key. Defaults to env var AZURE_SPEECH_KEY.
             api_version (str, optional): API version. Defaults to "2024-11-15".
+            endpoint (str, optional): Base URL of the service, such as a custom
+                domain, a gateway or a local stand-in server. Defaults to env var
+                AZURE_SPEECH_ENDPOINT, or the regional endpoint if not set.
+            endpoints (list, optional): Pool of SpeechEndpoint resources that
+                requests are spread across. Defaults to env var
+                AZURE_SPEECH_ENDPOINTS (see parse_endpoints) when no region,
+                key or endpoint is passed. Without a pool, the single endpoint
+                described by the other arguments is used.
         """
+        # Explicit credentials override a pool configured in the environment
+        if endpoints is None and not (region or api_key or endpoint):
+            pool = os.getenv("AZURE_SPEECH_ENDPOINTS")
+            endpoints = parse_endpoints(pool, api_version) if pool else None
+        
+        self.api_version = api_version
+        if endpoints:
+            self.endpoints = list(endpoints)
+            # The first endpoint of the pool doubles as the primary one
+            primary = self.endpoints[0]
+            self.region, self.api_key, self.endpoint = primary.region, primary.api_key, primary.endpoint
+            return
+        
         self.region = region or os.getenv("AZURE_SPEECH_REGION")
         self.api_key = api_key or os.getenv("AZURE_SPEECH_KEY")
-        self.api_version = api_version
+        self.endpoint = endpoint or os.getenv("AZURE_SPEECH_ENDPOINT")
         
-        if not self.region or not self.api_key:
+        if not (self.region or self.endpoint) or not self.api_key:
             raise ValueError(
                 "Azure Speech API credentials not found. "
                 "Please provide region and api_key or set AZURE_SPEECH_REGION and AZURE_SPEECH_KEY environment variables."
             )
+        self.endpoints = [SpeechEndpoint(self.api_key, self.region, self.endpoint, api_version)]
     
     @property
     def base_url(self):
         """Get the base URL for API requests."""
+        if self.endpoint:
+            return f"{self.endpoint.rstrip('/')}/speechtotext"
         return f"https://{self.region}.api.cognitive.microsoft.com/speechtotext"
     
     @property
     def transcribe_url(self):
         """Get the URL for transcription requests."""
         return f"{self.base_url}/transcriptions:transcribe?api-version={self.api_version}"
+    
+    @property
+    def locales_url(self):
+        """Get the URL for supported locales requests."""
+        return f"{self.base_url}/locales?api-version={self.api_version}"
@@ -0,0 +1,224 @@
+"""
+Spreading requests across a pool of Speech resources.
+
+Each resource has its own quota, so adding (region, key) pairs to the
+pool adds throughput. Requests go to the endpoint with the fewest
+requests in flight relative to its recent latency, and an endpoint that
+throttles or fails is left out for a while, longer each time it fails
+again.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from concurrency import THROTTLE_STATUS_CODES
+from config import SpeechEndpoint
+from hedging import BYTES_PER_UNIT
+from instrumentation import Instrumentation
+from retry import RETRYABLE_STATUS_CODES
+
+
+def is_ejectable(status: Optional[int]) -> bool:
+    """Whether a response status means the endpoint should be left out for a while."""
+    return status is None or status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+class EndpointState:
+    """Load, health and counters of one endpoint in a pool."""
+
+    def __init__(self, endpoint: SpeechEndpoint):
+        """
+        Initialize the state.
+
+        Args:
+            endpoint: Endpoint the state belongs to
+        """
+        self.endpoint = endpoint
+        self.outstanding = 0
+        self.requests = 0
+        self.successes = 0
+        self.throttled = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        # Moving average of seconds per MB of upload, None until the first success
+        self.latency: Optional[float] = None
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get the counters as a dict for reports and metrics.
+
+        Args:
+            now: Current time.monotonic() value, used for the ejection time left
+
+        Returns:
+            Dict describing the endpoint
+        """
+        now = time.monotonic() if now is None else now
+        return {
+            "endpoint": self.endpoint.name,
+            "requests": self.requests,
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "in_flight": self.outstanding,
+            "latency_per_mb": self.latency,
+            "ejected_seconds": max(0.0, self.ejected_until - now),
+        }
+
+
+class EndpointPool:
+    """
+    Chooses an endpoint for every request attempt.
+
+    An attempt goes to the available endpoint with the lowest
+    (in flight + 1) x recent latency, so a region that answers in half the
+    time takes about twice the requests. Endpoints without a latency yet
+    count as the fastest. A 408, 429, 5xx or connection error ejects the endpoint
+    for its Retry-After, or for `base_ejection` doubled for every failure
+    in a row up to `max_ejection`. When every endpoint is ejected, the one
+    that comes back first is used.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[SpeechEndpoint],
+        base_ejection: float = 2.0,
+        max_ejection: float = 60.0,
+        latency_alpha: float = 0.2,
+        instrumentation: Optional[Instrumentation] = None
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            endpoints: Endpoints to spread requests across
+            base_ejection: Seconds an endpoint is left out after its first failure
+            max_ejection: Longest time an endpoint is left out, in seconds
+            latency_alpha: Weight of the newest latency in the moving average
+            instrumentation (Instrumentation, optional): Receives an
+                {"event": "endpoint"} event whenever an endpoint is ejected
+        """
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint")
+        self.states = [EndpointState(endpoint) for endpoint in endpoints]
+        self.base_ejection = base_ejection
+        self.max_ejection = max_ejection
+        self.latency_alpha = latency_alpha
+        self.instrumentation = instrumentation
+        self._lock = threading.Lock()
+
+    def acquire(self) -> EndpointState:
+        """
+        Choose an endpoint for one attempt and count it as in flight.
+
+        Returns:
+            EndpointState: Endpoint to send to; pass it to release() afterwards
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [state for state in self.states if state.ejected_until <= now]
+            if not candidates:
+                soonest = min(state.ejected_until for state in self.states)
+                candidates = [state for state in self.states if state.ejected_until == soonest]
+
+            # Endpoints without a latency yet are assumed to be as fast as the fastest one
+            known = [state.latency for state in candidates if state.latency is not None]
+            fastest = min(known) if known else 1.0
+
+            def load(state: EndpointState) -> float:
+                return (state.outstanding + 1) * (state.latency if state.latency is not None else fastest)
+
+            # Ties go to the endpoint with fewer requests so far, which keeps the spread even
+            chosen = min(candidates, key=lambda state: (load(state), state.outstanding, state.requests))
+            chosen.outstanding += 1
+            chosen.requests += 1
+            return chosen
+
+    def release(
+        self,
+        state: EndpointState,
+        status: Optional[int],
+        seconds: Optional[float] = None,
+        size: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ) -> None:
+        """
+        Record how an attempt ended.
+
+        Args:
+            state: Endpoint returned by acquire()
+            status: HTTP status of the response, or None for a connection
+                error or timeout
+            seconds: Time the attempt took, for successful responses
+            size: Upload size in bytes, if known
+            retry_after: Seconds the endpoint asked clients to wait, if any
+        """
+        event = None
+        with self._lock:
+            state.outstanding -= 1
+            if status in THROTTLE_STATUS_CODES:
+                state.throttled += 1
+            if not is_ejectable(status):
+                state.consecutive_failures = 0
+                if status is not None and status < 400:
+                    state.successes += 1
+                    if seconds is not None:
+                        per_unit = seconds / max(1.0, (size or 0) / BYTES_PER_UNIT)
+                        if state.latency is None:
+                            state.latency = per_unit
+                        else:
+                            state.latency += self.latency_alpha * (per_unit - state.latency)
+                return
+
+            state.failures += 1
+            state.consecutive_failures += 1
+            ejection = retry_after
+            if ejection is None:
+                ejection = self.base_ejection * (2 ** (state.consecutive_failures - 1))
+            ejection = min(self.max_ejection, ejection)
+            state.ejected_until = max(state.ejected_until, time.monotonic() + ejection)
+            state.ejections += 1
+            event = {
+                "event": "endpoint",
+                "timestamp": time.time(),
+                "endpoint": state.endpoint.name,
+                "decision": "eject",
+                "status": status,
+                "seconds": ejection,
+            }
+
+        if self.instrumentation is not None and self.instrumentation.enabled:
+            self.instrumentation.emit(event)
+
+    def cancel(self, state: EndpointState) -> None:
+        """
+        Stop counting an attempt that was abandoned, without judging the endpoint.
+
+        Args:
+            state: Endpoint returned by acquire()
+        """
+        with self._lock:
+            state.outstanding -= 1
+
+    def available(self) -> int:
+        """Get the number of endpoints that are not ejected."""
+        now = time.monotonic()
+        with self._lock:
+            return sum(state.ejected_until <= now for state in self.states)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get the counters of every endpoint.
+
+        Returns:
+            List of dicts with requests, successes, throttled responses,
+            failures, ejections, requests in flight, latency per MB and
+            ejection time left for each endpoint
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [state.to_dict(now) for state in self.states]
@@ -0,0 +1,392 @@
+"""
+Self-hosted gateway for the fast transcription API.
+
+Exposes the same POST /speechtotext/transcriptions:transcribe and GET
+/speechtotext/locales contract as the service, and forwards requests
+through one shared AzureSpeechClient. All callers share one connection
+pool, one concurrency limit and one request-rate budget, and identical
+requests that arrive while one is in flight share one upstream call.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from cache import TranscriptionCache
+from config import AzureSpeechConfig
+from multipart import ChunkedBodyReader, LimitedBodyReader, boundary_from_content_type, read_multipart
+from sources import SPOOL_MAX_MEMORY, SeekableAudioSource
+from retry import NO_RETRY, RETRY_AFTER_HEADERS
+from speech_client import AzureSpeechClient
+
+
+class TokenBucket:
+    """Request-rate limiter that allows bursts up to a fixed size."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize the bucket, full.
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket size. Defaults to one second's worth of tokens.
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take one token, waiting until one is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class _HashingSpool:
+    """Write target that spools the uploaded audio and hashes it on the way in."""
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        self.hasher = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self.hasher.update(data)
+        return self.file.write(data)
+
+
+class UpstreamError(Exception):
+    """Upstream failure carrying the status and body to return to the caller."""
+
+    def __init__(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None
+    ):
+        super().__init__(f"Upstream returned {status}")
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        # Retry-After headers, so callers back off as upstream asked
+        self.headers = headers or {}
+
+
+class TranscriptionGateway:
+    """
+    Threaded HTTP gateway in front of the fast transcription API.
+
+    Every upstream attempt must be charged to the concurrency and rate
+    budget, so the client should not retry on its own: throttled and failed
+    responses are passed back to callers with their Retry-After headers,
+    and callers retry through the gateway. Use as a context manager to run
+    it on a background thread:
+
+        client = AzureSpeechClient(config, retry_policy=NO_RETRY)
+        with TranscriptionGateway(client, max_concurrency=8) as gateway:
+            local = AzureSpeechConfig(api_key="any", endpoint=gateway.url)
+    """
+
+    def __init__(
+        self,
+        client: AzureSpeechClient,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_concurrency: int = 16,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        api_key: Optional[str] = None
+    ):
+        """
+        Initialize the gateway.
+
+        Args:
+            client: Client for the upstream service, with retry_policy=NO_RETRY
+                so retries do not bypass the budget; its pool size should be
+                at least max_concurrency
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+            max_concurrency: Upstream requests in flight at once, across all callers
+            rate_per_second: Upstream requests started per second, or None for no limit
+            burst: Requests that may start at once after an idle period.
+                Defaults to one second's worth.
+            api_key: Key callers must send as Ocp-Apim-Subscription-Key,
+                or None to accept any caller
+        """
+        self.client = client
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate_per_second, burst) if rate_per_second else None
+
+        self.requests = 0
+        self.upstream_requests = 0
+        self.coalesced = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """Base URL callers use as their config endpoint."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "TranscriptionGateway":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "TranscriptionGateway":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _upstream(self, call):
+        """Run an upstream call within the concurrency and rate budget."""
+        with self._slots:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            with self._lock:
+                self.upstream_requests += 1
+            try:
+                return call()
+            except requests.HTTPError as e:
+                response = e.response
+                raise UpstreamError(
+                    response.status_code,
+                    response.content,
+                    response.headers.get("Content-Type", "application/json"),
+                    {name: response.headers[name] for name in RETRY_AFTER_HEADERS if name in response.headers}
+                )
+            except requests.RequestException as e:
+                body = json.dumps({"error": {"code": "BadGateway", "message": str(e)}}).encode("utf-8")
+                raise UpstreamError(502, body)
+
+    def transcribe(
+        self,
+        spool: _HashingSpool,
+        filename: Optional[str],
+        definition: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Transcribe received audio, sharing the upstream call with identical requests.
+
+        Args:
+            spool: Received audio and its hash
+            filename: File name the caller sent with the audio
+            definition: Definition payload the caller sent
+
+        Returns:
+            Tuple of the transcription response and whether it was shared
+            with a request that was already in flight
+
+        Raises:
+            UpstreamError: If the upstream request fails, or with status 500
+                if the request fails in the gateway itself
+        """
+        digest = spool.hasher.hexdigest()
+        key = TranscriptionCache.make_key(digest, definition)
+
+        with self._lock:
+            leader = self._in_flight.get(key)
+            if leader is None:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if leader is not None:
+            return leader.result(), True
+
+        try:
+            spool.file.seek(0)
+            source = SeekableAudioSource(spool.file)
+            source.name = filename or source.name
+            source.record_digest(digest)
+            options = dict(definition)
+            locales = options.pop("locales", None) or ["en-US"]
+            result = self._upstream(lambda: self.client.transcribe(source, locales, **options))
+            future.set_result(result)
+            return result, False
+        except UpstreamError as e:
+            future.set_exception(e)
+            raise
+        except Exception as e:
+            # Followers re-raise what the leader sets, so it must be a response too
+            error = UpstreamError(500, json.dumps({
+                "error": {"code": "InternalServerError", "message": f"{type(e).__name__}: {e}"}
+            }).encode("utf-8"))
+            future.set_exception(error)
+            raise error from e
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _handler_class(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _authorized(self) -> bool:
+                if gateway.api_key is None or self.headers.get("Ocp-Apim-Subscription-Key") == gateway.api_key:
+                    return True
+                self.close_connection = True
+                self._send_json(401, {"error": {"code": "Unauthorized", "message": "Invalid subscription key"}})
+                return False
+
+            def do_GET(self):
+                if not self.path.startswith("/speechtotext/locales"):
+                    self._send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+                    return
+                if not self._authorized():
+                    return
+                try:
+                    result = gateway._upstream(gateway.client.get_supported_locales)
+                except UpstreamError as e:
+                    self._send_bytes(e.status, e.body, e.content_type, e.headers)
+                    return
+                self._send_json(200, result)
+
+            def do_POST(self):
+                if not self.path.startswith("/speechtotext/transcriptions:transcribe"):
+                    self._send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+                    return
+                if not self._authorized():
+                    return
+                with gateway._lock:
+                    gateway.requests += 1
+
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = ChunkedBodyReader(self.rfile)
+                else:
+                    body = LimitedBodyReader(self.rfile, int(self.headers.get("Content-Length", 0)))
+
+                spool = _HashingSpool()
+                try:
+                    try:
+                        boundary = boundary_from_content_type(self.headers.get("Content-Type", ""))
+                        parts = read_multipart(body, boundary, open_file=lambda name, filename: spool)
+                        if "audio" not in parts:
+                            raise ValueError("Missing audio part")
+                        definition = json.loads(parts["definition"].data) if "definition" in parts else {}
+                        if not isinstance(definition, dict):
+                            raise ValueError("Definition must be a JSON object")
+                    except (ValueError, KeyError) as e:
+                        self.close_connection = True
+                        self._send_json(400, {"error": {"code": "InvalidRequest", "message": str(e)}})
+                        return
+
+                    try:
+                        result, shared = gateway.transcribe(spool, parts["audio"].filename, definition)
+                    except UpstreamError as e:
+                        self._send_bytes(e.status, e.body, e.content_type, e.headers)
+                        return
+                    self._send_json(200, result, {"x-gateway-coalesced": "true" if shared else "false"})
+                finally:
+                    spool.file.close()
+
+            def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+                self._send_bytes(status, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+            def _send_bytes(self, status: int, data: bytes, content_type: str,
+                            headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    """Run the gateway in the foreground."""
+    parser = argparse.ArgumentParser(description="Shared gateway for the Azure fast transcription endpoint")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", "-p", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--max-concurrency", type=int, default=16,
+                        help="Upstream requests in flight at once (default: 16)")
+    parser.add_argument("--rate", type=float, help="Upstream requests started per second (default: no limit)")
+    parser.add_argument("--burst", type=float, help="Requests that may start at once (default: one second's worth)")
+    parser.add_argument("--gateway-key", help="Key callers must send as Ocp-Apim-Subscription-Key")
+    parser.add_argument("--region", "-r", help="Azure region (overrides .env setting)")
+    parser.add_argument("--api-key", "-k", help="API key (overrides .env setting)")
+    args = parser.parse_args()
+
+    try:
+        config = AzureSpeechConfig(
+            region=args.region,
+            api_key=args.api_key
+        )
+    except ValueError as e:
+        print(f"Configuration Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Callers retry through the gateway, so every attempt is charged to the budget
+    client = AzureSpeechClient(config, retry_policy=NO_RETRY, pool_size=args.max_concurrency)
+    gateway = TranscriptionGateway(
+        client,
+        host=args.host,
+        port=args.port,
+        max_concurrency=args.max_concurrency,
+        rate_per_second=args.rate,
+        burst=args.burst,
+        api_key=args.gateway_key
+    )
+    print(f"Transcription gateway listening on {gateway.url}, forwarding to {config.base_url}")
+    try:
+        gateway.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.httpd.server_close()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Hedged requests for cutting the tail latency of transcription calls.
+
+A request that is still running after a high percentile of recent
+latencies is sent a second time, and whichever copy finishes first wins.
+Stragglers caused by a slow backend instance then cost about one
+percentile of latency instead of the full wait.
+"""
+
+import collections
+import math
+import threading
+from typing import Optional
+
+
+# Upload size used as one unit when normalising latency
+BYTES_PER_UNIT = 1024 * 1024
+
+
+class HedgingPolicy:
+    """
+    When to send a duplicate request, and how many duplicates are allowed.
+
+    Latency is tracked over a rolling window of recent successful requests,
+    per MB of upload (files under 1 MB count as 1 MB), so one window serves
+    files of different lengths. A request is hedged once it has run longer
+    than `percentile` of that window scaled to its own size.
+
+    Extra load is capped with a token budget: every request adds
+    `max_extra_load` tokens and every hedge spends one, so hedges never
+    exceed that fraction of requests beyond a small burst.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        window: int = 500,
+        min_samples: int = 20,
+        max_extra_load: float = 0.05,
+        max_burst: float = 5.0,
+        min_delay: float = 0.1
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            percentile: Latency percentile after which a request is hedged
+            window: Number of recent latencies the percentile is taken from
+            min_samples: Latencies needed before any request is hedged
+            max_extra_load: Highest ratio of hedges to requests
+            max_burst: Hedges that may be sent in a row from saved-up budget
+            min_delay: Shortest time a request runs before it is hedged, in seconds
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_extra_load = max_extra_load
+        self.max_burst = max_burst
+        self.min_delay = min_delay
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+        self._samples = collections.deque(maxlen=window)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _units(size: Optional[int]) -> float:
+        return max(1.0, size / BYTES_PER_UNIT) if size else 1.0
+
+    def begin(self, size: Optional[int] = None) -> Optional[float]:
+        """
+        Count a new request and get how long to wait before hedging it.
+
+        Args:
+            size: Upload size in bytes, if known
+
+        Returns:
+            float: Seconds after which to hedge, or None while there are
+            too few latencies to judge
+        """
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.max_burst, self._tokens + self.max_extra_load)
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+            index = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100.0 * len(ordered)) - 1))
+            return max(self.min_delay, ordered[index] * self._units(size))
+
+    def allow_hedge(self) -> bool:
+        """
+        Spend budget on a hedge, if there is any left.
+
+        Returns:
+            bool: Whether the hedge may be sent
+        """
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            self.hedges += 1
+            return True
+
+    def record(self, seconds: float, size: Optional[int] = None, hedge_won: bool = False) -> None:
+        """
+        Add the latency of a successful request to the window.
+
+        Args:
+            seconds: Time from the start of the original request until a
+                copy succeeded, so slow originals are sampled even when
+                their hedge wins
+            size: Upload size in bytes, if known
+            hedge_won: Whether the hedge finished before the original
+        """
+        with self._lock:
+            self._samples.append(seconds / self._units(size))
+            if hedge_won:
+                self.hedge_wins += 1
+
+    @property
+    def extra_load(self) -> float:
+        """Ratio of hedges sent to requests so far."""
+        return self.hedges / self.requests if self.requests else 0.0
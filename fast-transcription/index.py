@@ -0,0 +1,500 @@
+"""
+On-disk inverted index of words and their timings across transcripts.
+
+Every word of every indexed transcription is stored as a posting of its
+normalized token: the recording, the word's position, offset, duration
+and confidence. Postings are clustered by token in SQLite, so finding
+where a word or phrase was said reads only that word's postings instead
+of scanning every transcript.
+"""
+
+import argparse
+import array
+import json
+import os
+import sqlite3
+import sys
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from writers import format_timestamp
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER,
+    size INTEGER,
+    duration_ms INTEGER,
+    words INTEGER NOT NULL,
+    -- Distinct token IDs of the file as int32s, used to delete its postings
+    token_ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    id INTEGER PRIMARY KEY,
+    token TEXT NOT NULL UNIQUE,
+    postings INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS postings (
+    token_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    offset_ms INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    confidence REAL,
+    PRIMARY KEY (token_id, file_id, position)
+) WITHOUT ROWID;
+"""
+
+# SQLite page cache per connection, in KiB
+CACHE_KIB = 256 * 1024
+
+# Result files picked up when indexing directories
+RESULT_EXTENSIONS = (".json", ".jsonl")
+
+
+def normalize_token(text: str) -> str:
+    """
+    Normalize a word for indexing and lookup.
+
+    Text is NFKC-normalized and case-folded, and punctuation and symbols
+    are stripped from both ends, so "Refund," and "refund" match.
+
+    Args:
+        text: Word as transcribed or typed
+
+    Returns:
+        str: Normalized token; empty if the word was only punctuation
+    """
+    token = unicodedata.normalize("NFKC", text).casefold()
+    if token.isalnum():
+        return token
+    start, end = 0, len(token)
+    while start < end and unicodedata.category(token[start])[0] in "PS":
+        start += 1
+    while end > start and unicodedata.category(token[end - 1])[0] in "PS":
+        end -= 1
+    return token[start:end]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized tokens, dropping empty ones."""
+    return [token for token in (normalize_token(word) for word in text.split()) if token]
+
+
+def result_postings(result: Dict[str, Any]) -> Iterator[Tuple[str, int, int, Optional[float]]]:
+    """
+    Get the timed tokens of a transcription response in spoken order.
+
+    Phrases are ordered by channel and offset, so each channel reads as one
+    continuous sequence. Phrases without word timings give every token the
+    timing of the whole phrase.
+
+    Args:
+        result: Transcription response with "phrases"
+
+    Yields:
+        (token, offset_ms, duration_ms, confidence) per token
+    """
+    phrases = sorted(
+        result.get("phrases", []),
+        key=lambda phrase: (phrase.get("channel", 0), phrase.get("offsetMilliseconds", 0))
+    )
+    for phrase in phrases:
+        confidence = phrase.get("confidence")
+        words = phrase.get("words")
+        if words:
+            for word in words:
+                for token in tokenize(word.get("text", "")):
+                    yield token, word.get("offsetMilliseconds", 0), word.get("durationMilliseconds", 0), confidence
+        else:
+            for token in tokenize(phrase.get("text", "")):
+                yield token, phrase.get("offsetMilliseconds", 0), phrase.get("durationMilliseconds", 0), confidence
+
+
+def load_result_file(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read a saved transcription result.
+
+    Args:
+        path: Full JSON response, or JSON lines with one phrase per line
+            as written by the jsonl format
+
+    Returns:
+        Dict with at least "phrases"
+
+    Raises:
+        ValueError: If the file holds neither form
+    """
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        if path.suffix.lower() == ".jsonl":
+            phrases = [json.loads(line) for line in f if line.strip()]
+            if not all(isinstance(phrase, dict) and "offsetMilliseconds" in phrase for phrase in phrases):
+                raise ValueError("Not a transcription result")
+            return {"phrases": phrases}
+        result = json.load(f)
+    if not isinstance(result, dict) or "phrases" not in result:
+        raise ValueError("Not a transcription result")
+    return result
+
+
+class Hit(NamedTuple):
+    """One occurrence of a query in an indexed recording."""
+
+    name: str
+    offset_ms: int
+    duration_ms: int
+    # Lowest confidence of the matched words, if the service reported it
+    confidence: Optional[float]
+
+
+class TranscriptIndex:
+    """
+    SQLite inverted index over transcription results.
+
+    Results are added one recording at a time. Re-adding a recording
+    replaces its postings, and files whose size and modification time are
+    unchanged are skipped, so indexing a results directory again only
+    touches new and changed files. The index is safe to share between
+    threads.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open or create an index.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Postings are inserted in token order, all over the file; keep hot pages cached
+        self._db.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        self._db.executescript(SCHEMA)
+        self._token_ids: Dict[str, int] = {}
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "TranscriptIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _token_id(self, token: str) -> int:
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            row = self._db.execute("SELECT id FROM tokens WHERE token = ?", (token,)).fetchone()
+            if row is None:
+                token_id = self._db.execute("INSERT INTO tokens (token) VALUES (?)", (token,)).lastrowid
+            else:
+                token_id = row[0]
+            self._token_ids[token] = token_id
+        return token_id
+
+    def _remove(self, file_id: int, token_ids: bytes) -> None:
+        # Postings are keyed by token first, so delete them token by token
+        for token_id in array.array("i", token_ids):
+            removed = self._db.execute(
+                "DELETE FROM postings WHERE token_id = ? AND file_id = ?", (token_id, file_id)
+            ).rowcount
+            self._db.execute("UPDATE tokens SET postings = postings - ? WHERE id = ?", (removed, token_id))
+        self._db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def add_result(
+        self,
+        name: str,
+        result: Dict[str, Any],
+        mtime_ns: Optional[int] = None,
+        size: Optional[int] = None
+    ) -> int:
+        """
+        Index a transcription response, replacing any earlier version.
+
+        Args:
+            name: Recording the response belongs to, as reported in hits
+            result: Transcription response from AzureSpeechClient
+            mtime_ns: Modification time of the result file, if any
+            size: Size of the result file, if any
+
+        Returns:
+            int: Number of postings written
+        """
+        with self._lock:
+            try:
+                return self._add_result(name, result, mtime_ns, size)
+            except BaseException:
+                # Token IDs inserted by the rolled-back transaction are gone
+                self._token_ids.clear()
+                raise
+
+    def _add_result(self, name: str, result: Dict[str, Any], mtime_ns: Optional[int], size: Optional[int]) -> int:
+        with self._db:
+            row = self._db.execute("SELECT id, token_ids FROM files WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                self._remove(*row)
+
+            counts: Dict[int, int] = {}
+            rows = []
+            for position, (token, offset_ms, duration_ms, confidence) in enumerate(result_postings(result)):
+                token_id = self._token_id(token)
+                counts[token_id] = counts.get(token_id, 0) + 1
+                rows.append((token_id, position, offset_ms, duration_ms, confidence))
+
+            file_id = self._db.execute(
+                "INSERT INTO files (name, mtime_ns, size, duration_ms, words, token_ids) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, mtime_ns, size, result.get("durationMilliseconds"), len(rows),
+                 array.array("i", counts).tobytes())
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO postings (token_id, file_id, position, offset_ms, duration_ms, confidence) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((token_id, file_id, position, offset_ms, duration_ms, confidence)
+                 for token_id, position, offset_ms, duration_ms, confidence in rows)
+            )
+            self._db.executemany(
+                "UPDATE tokens SET postings = postings + ? WHERE id = ?",
+                ((count, token_id) for token_id, count in counts.items())
+            )
+            return len(rows)
+
+    def add_file(self, path: Union[str, Path], force: bool = False) -> Optional[int]:
+        """
+        Index a saved result file if it is new or has changed.
+
+        Args:
+            path: Result file (.json or .jsonl); its path is the recording name
+            force: Re-index even if the file is unchanged
+
+        Returns:
+            int: Number of postings written, or None if the file was unchanged
+
+        Raises:
+            ValueError: If the file is not a transcription result
+        """
+        path = Path(path)
+        stat = path.stat()
+        name = str(path)
+        if not force:
+            with self._lock:
+                row = self._db.execute("SELECT mtime_ns, size FROM files WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+                return None
+        return self.add_result(name, load_result_file(path), stat.st_mtime_ns, stat.st_size)
+
+    def update(self, paths: Iterable[Union[str, Path]]) -> Dict[str, int]:
+        """
+        Index new and changed result files.
+
+        Args:
+            paths: Result files and directories (searched recursively)
+
+        Returns:
+            Dict with the number of files indexed, unchanged and skipped as
+            unreadable, and the postings written
+        """
+        stats = {"indexed": 0, "unchanged": 0, "skipped": 0, "postings": 0}
+        for path in paths:
+            path = Path(path)
+            files = sorted(
+                p for p in path.rglob("*") if p.suffix.lower() in RESULT_EXTENSIONS and p.is_file()
+            ) if path.is_dir() else [path]
+            for file in files:
+                try:
+                    written = self.add_file(file)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping {file}: {e}", file=sys.stderr)
+                    stats["skipped"] += 1
+                    continue
+                if written is None:
+                    stats["unchanged"] += 1
+                else:
+                    stats["indexed"] += 1
+                    stats["postings"] += written
+        return stats
+
+    def remove(self, name: str) -> bool:
+        """
+        Drop a recording from the index.
+
+        Args:
+            name: Recording name used when it was added
+
+        Returns:
+            bool: Whether the recording was indexed
+        """
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id, token_ids FROM files WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return False
+            self._remove(*row)
+            return True
+
+    def prune(self) -> int:
+        """
+        Drop result files that no longer exist on disk.
+
+        Returns:
+            int: Number of recordings dropped
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT name FROM files WHERE mtime_ns IS NOT NULL").fetchall()
+        return sum(self.remove(name) for (name,) in rows if not os.path.exists(name))
+
+    def search(
+        self,
+        query: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        limit: Optional[int] = 100
+    ) -> List[Hit]:
+        """
+        Find where a word or phrase was said.
+
+        A phrase matches consecutive words of one recording. The rarest
+        word of the phrase drives the lookup and every other word is
+        checked by position, so common words cost little.
+
+        Args:
+            query: Word or phrase; normalized like the indexed text
+            start_ms: Only hits that end after this time
+            end_ms: Only hits that start before this time
+            name_prefix: Only recordings whose name starts with this
+            limit: Maximum number of hits, or None for all
+
+        Returns:
+            List of hits ordered by recording, in the order they were
+            indexed, and by time within each recording
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            placeholders = ",".join("?" * len(set(tokens)))
+            rows = self._db.execute(
+                f"SELECT token, id, postings FROM tokens WHERE token IN ({placeholders})", list(set(tokens))
+            ).fetchall()
+            found = {token: (token_id, postings) for token, token_id, postings in rows}
+            if len(found) < len(set(tokens)):
+                return []
+
+            # Start from the rarest word; CROSS JOIN keeps SQLite from reordering
+            anchor = min(range(len(tokens)), key=lambda i: found[tokens[i]][1])
+            order = [anchor] + [i for i in range(len(tokens)) if i != anchor]
+            joins = []
+            params: List[Any] = []
+            for i in order[1:]:
+                joins.append(
+                    f"CROSS JOIN postings p{i} ON p{i}.token_id = ? AND p{i}.file_id = p{anchor}.file_id "
+                    f"AND p{i}.position = p{anchor}.position + {i - anchor}"
+                )
+                params.append(found[tokens[i]][0])
+
+            first, last = "p0", f"p{len(tokens) - 1}"
+            conditions = [f"p{anchor}.token_id = ?"]
+            params.append(found[tokens[anchor]][0])
+            if start_ms is not None:
+                conditions.append(f"{last}.offset_ms + {last}.duration_ms > ?")
+                params.append(start_ms)
+            if end_ms is not None:
+                conditions.append(f"{first}.offset_ms < ?")
+                params.append(end_ms)
+            if name_prefix is not None:
+                conditions.append("substr(files.name, 1, ?) = ?")
+                params.extend([len(name_prefix), name_prefix])
+
+            confidences = ", ".join(f"p{i}.confidence" for i in range(len(tokens)))
+            min_confidence = f"min({confidences})" if len(tokens) > 1 else "p0.confidence"
+            sql = (
+                f"SELECT files.name, {first}.offset_ms, "
+                f"{last}.offset_ms + {last}.duration_ms - {first}.offset_ms, {min_confidence} "
+                f"FROM postings p{anchor} {' '.join(joins)} "
+                f"CROSS JOIN files ON files.id = p{anchor}.file_id "
+                f"WHERE {' AND '.join(conditions)} "
+                # Postings are stored in this order, so a limit stops the scan early
+                f"ORDER BY p{anchor}.file_id, p{anchor}.position"
+            )
+            if limit is not None:
+                sql += f" LIMIT {int(limit)}"
+            rows = self._db.execute(sql, params).fetchall()
+
+        return [Hit(name, offset_ms, duration_ms, confidence) for name, offset_ms, duration_ms, confidence in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size of the index.
+
+        Returns:
+            Dict with the number of recordings, distinct tokens and
+            postings, and the indexed audio in hours
+        """
+        with self._lock:
+            files, postings, duration_ms = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(words), 0), COALESCE(SUM(duration_ms), 0) FROM files"
+            ).fetchone()
+            tokens = self._db.execute("SELECT COUNT(*) FROM tokens WHERE postings > 0").fetchone()[0]
+        return {"recordings": files, "tokens": tokens, "postings": postings, "audio_hours": duration_ms / 3600000.0}
+
+
+def main():
+    """Main entry point for the index command-line interface."""
+    parser = argparse.ArgumentParser(description="Index saved transcription results and search them")
+    parser.add_argument("--db", default="transcripts.db", help="Index database file (default: transcripts.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Index new and changed result files")
+    add.add_argument("paths", nargs="+", help="Result files (.json or .jsonl) or directories")
+    add.add_argument("--prune", action="store_true", help="Also drop results that were deleted from disk")
+
+    search = commands.add_parser("search", help="Find where a word or phrase was said")
+    search.add_argument("query", help="Word or phrase to find")
+    search.add_argument("--after", type=float, help="Only hits ending after this many seconds into a recording")
+    search.add_argument("--before", type=float, help="Only hits starting before this many seconds into a recording")
+    search.add_argument("--prefix", help="Only recordings whose name starts with this")
+    search.add_argument("--limit", type=int, default=100, help="Maximum number of hits (default: 100)")
+
+    commands.add_parser("stats", help="Show the size of the index")
+    args = parser.parse_args()
+
+    with TranscriptIndex(args.db) as index:
+        if args.command == "add":
+            stats = index.update(args.paths)
+            pruned = index.prune() if args.prune else 0
+            print(f"Indexed {stats['indexed']} file(s) ({stats['postings']} words), "
+                  f"{stats['unchanged']} unchanged, {stats['skipped']} skipped, {pruned} pruned")
+        elif args.command == "search":
+            hits = index.search(
+                args.query,
+                start_ms=int(args.after * 1000) if args.after is not None else None,
+                end_ms=int(args.before * 1000) if args.before is not None else None,
+                name_prefix=args.prefix,
+                limit=args.limit
+            )
+            for hit in hits:
+                confidence = f"  {hit.confidence:.2f}" if hit.confidence is not None else ""
+                print(f"{hit.name}  {format_timestamp(hit.offset_ms)}  "
+                      f"{hit.duration_ms / 1000:.2f}s{confidence}")
+            if not hits:
+                print("No matches", file=sys.stderr)
+                sys.exit(1)
+        else:
+            stats = index.stats()
+            print(f"{stats['recordings']} recording(s), {stats['audio_hours']:.1f} hours of audio, "
+                  f"{stats['tokens']} distinct words, {stats['postings']} postings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""
+Per-phase timing instrumentation for transcription requests.
+
+The client reports one event per request to every registered hook. Events
+are plain dicts, so hooks can log, aggregate or forward them. Two
+exporters are provided: JSON lines and the Prometheus text format.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, TextIO, Union
+
+
+# Response headers that carry server-side timing or request correlation
+SERVER_TIMING_HEADERS = (
+    "server-timing",
+    "x-envoy-upstream-service-time",
+    "apim-request-id",
+    "x-ms-request-id",
+    "x-standin-processing-ms",
+)
+
+# Histogram buckets for phase durations, in seconds
+PHASE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+Hook = Callable[[Dict[str, Any]], None]
+
+
+class RequestTrace:
+    """
+    Timings and counters for one client request.
+
+    Phases of a transcription request:
+    - transcode: converting the audio to a compact upload (see transcode.py)
+    - hash: hashing the audio for a cache lookup
+    - encode: opening the audio and preparing the multipart body
+    - upload: from sending the request until the last body byte was handed over
+    - server: from the end of the upload until the response headers arrived
+    - download: reading the response body
+    - decode: parsing the JSON response
+    - retry_wait: backoff sleeps between attempts
+
+    A hedged request counts the attempts, bytes and throttling of both
+    copies, and the phases of the copy that won.
+    """
+
+    def __init__(self, operation: str, audio: Optional[str] = None):
+        """
+        Start a trace.
+
+        Args:
+            operation: Client operation, such as "transcribe"
+            audio: Name of the audio being transcribed, if any
+        """
+        self.operation = operation
+        self.audio = audio
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.attempts = 0
+        self.bytes_sent = 0
+        # Bytes the transcoded upload saved over the original file
+        self.bytes_saved = 0
+        self.status: Optional[int] = None
+        self.server_headers: Dict[str, str] = {}
+        self.cache_hit = False
+        self.error: Optional[str] = None
+        self.throttled = 0
+        self.hedged = False
+        self.hedge_won = False
+        # Pool endpoint of the last attempt
+        self.endpoint: Optional[str] = None
+        # Called with the Retry-After seconds (or None) of every throttled response
+        self.on_throttle: Optional[Callable[[Optional[float]], None]] = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        """
+        Add time to a phase.
+
+        Args:
+            phase: Phase name
+            seconds: Time spent, added to any earlier time in the same phase
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(0.0, seconds)
+
+    @contextlib.contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block as part of a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def record_response(self, status: int, headers: Mapping[str, str]) -> None:
+        """
+        Record the status and server timing headers of a response.
+
+        Args:
+            status: HTTP status code
+            headers: Response headers (case-insensitive mapping)
+        """
+        self.status = status
+        for name in SERVER_TIMING_HEADERS:
+            value = headers.get(name)
+            if value is not None:
+                self.server_headers[name] = value
+
+    def record_throttle(self, retry_after: Optional[float]) -> None:
+        """
+        Record a throttled (429/503) response.
+
+        Args:
+            retry_after: Seconds the service asked the client to wait, if any
+        """
+        self.throttled += 1
+        if self.on_throttle is not None:
+            self.on_throttle(retry_after)
+
+    def merge(self, other: "RequestTrace", won: bool) -> None:
+        """
+        Fold in the trace of one copy of a hedged request.
+
+        Args:
+            other: Trace of the copy
+            won: Whether the copy's response is the one returned; its
+                phases, status and server headers are kept
+        """
+        self.attempts += other.attempts
+        self.bytes_sent += other.bytes_sent
+        self.throttled += other.throttled
+        if won:
+            for phase, seconds in other.phases.items():
+                self.add(phase, seconds)
+            self.status = other.status
+            self.endpoint = other.endpoint
+            self.server_headers.update(other.server_headers)
+
+    def to_event(self) -> Dict[str, Any]:
+        """
+        Get the trace as an event dict for hooks.
+
+        Returns:
+            Dict describing the request
+        """
+        return {
+            "event": "request",
+            "timestamp": time.time(),
+            "operation": self.operation,
+            "audio": self.audio,
+            "status": self.status,
+            "error": self.error,
+            "cache_hit": self.cache_hit,
+            "attempts": self.attempts,
+            "throttled": self.throttled,
+            "hedged": self.hedged,
+            "hedge_won": self.hedge_won,
+            "endpoint": self.endpoint,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_saved,
+            "total_seconds": time.perf_counter() - self.started,
+            "phases": dict(self.phases),
+            "server_headers": dict(self.server_headers),
+        }
+
+
+class Instrumentation:
+    """Registry of hooks that receive instrumentation events."""
+
+    def __init__(self, hooks: Optional[List[Hook]] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            hooks: Callables that receive each event dict
+        """
+        self._hooks: List[Hook] = list(hooks or [])
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any hook is registered."""
+        return bool(self._hooks)
+
+    def add_hook(self, hook: Hook) -> None:
+        """
+        Register a hook.
+
+        Args:
+            hook: Callable that receives each event dict
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        """
+        Unregister a hook.
+
+        Args:
+            hook: Previously registered callable
+        """
+        self._hooks.remove(hook)
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """
+        Send an event to every hook.
+
+        Args:
+            event: Event dict
+        """
+        for hook in list(self._hooks):
+            try:
+                hook(event)
+            except Exception:
+                # A broken metrics sink must not fail the transcription
+                pass
+
+    @contextlib.contextmanager
+    def measure(self, phase: str, **fields) -> Iterator[None]:
+        """
+        Time work done outside the client, such as file validation or probing.
+
+        Emits a {"event": "phase"} event when the block exits.
+
+        Args:
+            phase: Phase name
+            **fields: Extra fields for the event, such as the audio name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.emit({
+                    "event": "phase",
+                    "timestamp": time.time(),
+                    "phase": phase,
+                    "seconds": time.perf_counter() - start,
+                    **fields,
+                })
+
+
+class JsonLinesExporter:
+    """Hook that appends each event to a file or stream as one JSON line."""
+
+    def __init__(self, target: Union[str, Path, TextIO]):
+        """
+        Initialize the exporter.
+
+        Args:
+            target: File path to append to, or an open text stream
+        """
+        if isinstance(target, (str, Path)):
+            self._stream = open(target, "a")
+            self._owned = True
+        else:
+            self._stream = target
+            self._owned = False
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def close(self) -> None:
+        """Close the file if the exporter opened it."""
+        if self._owned:
+            self._stream.close()
+
+
+class PrometheusExporter:
+    """
+    Hook that aggregates events into Prometheus metrics.
+
+    Call render() for the text exposition format, or write() to publish it
+    as a file for the node_exporter textfile collector.
+    """
+
+    def __init__(self, prefix: str = "transcription"):
+        """
+        Initialize the exporter.
+
+        Args:
+            prefix: Prefix of every metric name
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._requests: Dict[tuple, int] = {}
+        self._bytes_sent = 0
+        self._bytes_saved = 0
+        self._attempts = 0
+        self._throttled = 0
+        self._cache_hits = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._phase_buckets: Dict[str, List[int]] = {}
+        self._phase_sums: Dict[str, float] = {}
+        self._phase_counts: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._decisions: Dict[tuple, int] = {}
+        self._endpoint_requests: Dict[tuple, int] = {}
+        self._ejections: Dict[str, int] = {}
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            if event.get("event") == "request":
+                status = str(event.get("status") or "error")
+                key = (event.get("operation", ""), status)
+                self._requests[key] = self._requests.get(key, 0) + 1
+                self._bytes_sent += event.get("bytes_sent", 0)
+                self._bytes_saved += event.get("bytes_saved", 0)
+                self._attempts += event.get("attempts", 0)
+                self._throttled += event.get("throttled", 0)
+                self._cache_hits += bool(event.get("cache_hit"))
+                self._hedges += bool(event.get("hedged"))
+                self._hedge_wins += bool(event.get("hedge_won"))
+                if event.get("endpoint"):
+                    key = (event["endpoint"], status)
+                    self._endpoint_requests[key] = self._endpoint_requests.get(key, 0) + 1
+                for phase, seconds in event.get("phases", {}).items():
+                    self._observe(phase, seconds)
+                self._observe("total", event.get("total_seconds", 0.0))
+            elif event.get("event") == "phase":
+                self._observe(event["phase"], event.get("seconds", 0.0))
+            elif event.get("event") == "concurrency":
+                self._gauges["concurrency_limit"] = event["limit"]
+                self._gauges["concurrency_in_flight"] = event["in_flight"]
+                key = (event.get("decision", ""), event.get("reason", ""))
+                self._decisions[key] = self._decisions.get(key, 0) + 1
+            elif event.get("event") == "endpoint":
+                self._ejections[event["endpoint"]] = self._ejections.get(event["endpoint"], 0) + 1
+
+    def _observe(self, phase: str, seconds: float) -> None:
+        buckets = self._phase_buckets.setdefault(phase, [0] * len(PHASE_BUCKETS))
+        for index, bound in enumerate(PHASE_BUCKETS):
+            if seconds <= bound:
+                buckets[index] += 1
+        self._phase_sums[phase] = self._phase_sums.get(phase, 0.0) + seconds
+        self._phase_counts[phase] = self._phase_counts.get(phase, 0) + 1
+
+    def render(self) -> str:
+        """
+        Get the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines.append(f"# HELP {p}_requests_total Client requests by operation and final status.")
+            lines.append(f"# TYPE {p}_requests_total counter")
+            for (operation, status), count in sorted(self._requests.items()):
+                lines.append(f'{p}_requests_total{{operation="{operation}",status="{status}"}} {count}')
+
+            lines.append(f"# HELP {p}_attempts_total HTTP attempts including retries.")
+            lines.append(f"# TYPE {p}_attempts_total counter")
+            lines.append(f"{p}_attempts_total {self._attempts}")
+
+            lines.append(f"# HELP {p}_throttled_total Throttled (429/503) responses.")
+            lines.append(f"# TYPE {p}_throttled_total counter")
+            lines.append(f"{p}_throttled_total {self._throttled}")
+
+            lines.append(f"# HELP {p}_cache_hits_total Requests served from the result cache.")
+            lines.append(f"# TYPE {p}_cache_hits_total counter")
+            lines.append(f"{p}_cache_hits_total {self._cache_hits}")
+
+            lines.append(f"# HELP {p}_hedges_total Requests that were sent a second time to cut tail latency.")
+            lines.append(f"# TYPE {p}_hedges_total counter")
+            lines.append(f"{p}_hedges_total {self._hedges}")
+
+            lines.append(f"# HELP {p}_hedge_wins_total Hedged requests answered by the second copy.")
+            lines.append(f"# TYPE {p}_hedge_wins_total counter")
+            lines.append(f"{p}_hedge_wins_total {self._hedge_wins}")
+
+            lines.append(f"# HELP {p}_bytes_sent_total Request body bytes sent.")
+            lines.append(f"# TYPE {p}_bytes_sent_total counter")
+            lines.append(f"{p}_bytes_sent_total {self._bytes_sent}")
+
+            lines.append(f"# HELP {p}_bytes_saved_total Upload bytes saved by transcoding audio before sending it.")
+            lines.append(f"# TYPE {p}_bytes_saved_total counter")
+            lines.append(f"{p}_bytes_saved_total {self._bytes_saved}")
+
+            lines.append(f"# HELP {p}_phase_seconds Time spent in each phase of a request.")
+            lines.append(f"# TYPE {p}_phase_seconds histogram")
+            for phase in sorted(self._phase_buckets):
+                for bound, count in zip(PHASE_BUCKETS, self._phase_buckets[phase]):
+                    lines.append(f'{p}_phase_seconds_bucket{{phase="{phase}",le="{bound:g}"}} {count}')
+                lines.append(f'{p}_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {self._phase_counts[phase]}')
+                lines.append(f'{p}_phase_seconds_sum{{phase="{phase}"}} {self._phase_sums[phase]:.6f}')
+                lines.append(f'{p}_phase_seconds_count{{phase="{phase}"}} {self._phase_counts[phase]}')
+
+            if self._decisions:
+                lines.append(f"# HELP {p}_concurrency_decisions_total Adaptive concurrency limit changes.")
+                lines.append(f"# TYPE {p}_concurrency_decisions_total counter")
+                for (decision, reason), count in sorted(self._decisions.items()):
+                    lines.append(f'{p}_concurrency_decisions_total{{decision="{decision}",reason="{reason}"}} {count}')
+
+            if self._endpoint_requests:
+                lines.append(f"# HELP {p}_endpoint_requests_total Client requests by pool endpoint of the last attempt and final status.")
+                lines.append(f"# TYPE {p}_endpoint_requests_total counter")
+                for (endpoint, status), count in sorted(self._endpoint_requests.items()):
+                    lines.append(f'{p}_endpoint_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            if self._ejections:
+                lines.append(f"# HELP {p}_endpoint_ejections_total Times a pool endpoint was left out after throttling or failing.")
+                lines.append(f"# TYPE {p}_endpoint_ejections_total counter")
+                for endpoint, count in sorted(self._ejections.items()):
+                    lines.append(f'{p}_endpoint_ejections_total{{endpoint="{endpoint}"}} {count}')
+
+            for name in sorted(self._gauges):
+                lines.append(f"# TYPE {p}_{name} gauge")
+                lines.append(f"{p}_{name} {self._gauges[name]:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Union[str, Path]) -> None:
+        """
+        Write the metrics to a file atomically.
+
+        Args:
+            path: Destination file, typically *.prom in the textfile collector directory
+        """
+        path = Path(path)
+        temp_path = path.with_name(path.name + ".tmp")
+        temp_path.write_text(self.render())
+        os.replace(temp_path, path)
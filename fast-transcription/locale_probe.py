@@ -0,0 +1,153 @@
+"""
+Identifying the spoken locale from a short probe clip before the full upload.
+
+When the language of a recording is unknown, sending every candidate
+locale with the full file leaves the service to identify it phrase by
+phrase, and guessing one locale risks redoing the whole upload. A probe
+transcribes only the first stretch of speech with all the candidates,
+and the locale that carries most of the confident speech is used for
+the full file.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from audio import DEFAULT_SAMPLE_RATE, PCMAudio
+from vad import detect_speech
+
+
+# Speech sent in a probe
+DEFAULT_PROBE_SECONDS = 30.0
+
+# Audio decoded from the start of the file to find the probe's speech, as a multiple of it
+PROBE_SEARCH_FACTOR = 4
+
+
+class LocaleGuess(NamedTuple):
+    """Locale identified by a probe."""
+    locale: str
+    # Duration-weighted mean confidence of the locale's phrases
+    confidence: float
+    # Fraction of the recognized speech attributed to the locale
+    share: float
+    # Sum of confidence x duration (seconds) for every candidate locale
+    scores: Dict[str, float]
+
+
+def build_probe(audio: PCMAudio, probe_seconds: float = DEFAULT_PROBE_SECONDS) -> Optional[PCMAudio]:
+    """
+    Cut the first stretch of speech out of decoded audio.
+
+    Speech spans are taken in order, without the silence between them,
+    until `probe_seconds` of speech are collected. The probe is mixed down
+    to 16 kHz mono.
+
+    Args:
+        audio: Decoded audio from the start of the recording
+        probe_seconds: Speech to collect
+
+    Returns:
+        PCMAudio with the probe, or None if no speech was found
+    """
+    budget = int(probe_seconds * audio.sample_rate)
+    parts = []
+    for start, end in detect_speech(audio):
+        end = min(end, start + budget)
+        parts.append(audio.samples[start:end])
+        budget -= end - start
+        if budget <= 0:
+            break
+    if not parts:
+        return None
+    return PCMAudio(np.concatenate(parts), audio.sample_rate).resample(DEFAULT_SAMPLE_RATE, mono=True)
+
+
+def score_locales(result: Dict[str, Any], candidates: Sequence[str]) -> Optional[LocaleGuess]:
+    """
+    Pick the locale that carries most of the confident speech in a response.
+
+    Each phrase counts for its confidence times its duration towards the
+    locale the service reported for it. Phrases without a confidence
+    count for their duration alone.
+
+    Args:
+        result: Transcription response for the probe
+        candidates: Locales the probe was sent with
+
+    Returns:
+        LocaleGuess, or None if no phrase names one of the candidates
+    """
+    # The service may report a locale in a different case from the request
+    by_key = {candidate.lower(): candidate for candidate in candidates}
+    scores: Dict[str, float] = {candidate: 0.0 for candidate in candidates}
+    seconds: Dict[str, float] = {candidate: 0.0 for candidate in candidates}
+    for phrase in result.get("phrases", []):
+        locale = by_key.get(str(phrase.get("locale", "")).lower())
+        if locale is None:
+            continue
+        duration = phrase.get("durationMilliseconds", 0) / 1000.0
+        scores[locale] += phrase.get("confidence", 1.0) * duration
+        seconds[locale] += duration
+
+    total = sum(seconds.values())
+    if total <= 0:
+        return None
+    locale = max(candidates, key=lambda candidate: scores[candidate])
+    return LocaleGuess(
+        locale=locale,
+        confidence=scores[locale] / seconds[locale] if seconds[locale] else 0.0,
+        share=seconds[locale] / total,
+        scores=scores,
+    )
+
+
+class LocaleProbeCache:
+    """
+    Probe outcomes per file and candidate set, in memory.
+
+    Entries are keyed by path, modification time and size like
+    utils.probe_audio, so an edited file is probed again. A probe that
+    found no speech is cached too.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[Path, int, int, Tuple[str, ...]], Optional[LocaleGuess]] = {}
+        self._lock = threading.Lock()
+
+    def key(self, audio_file: Union[str, Path], candidates: Sequence[str]) -> Tuple[Path, int, int, Tuple[str, ...]]:
+        """Get the cache key of a file and candidate set."""
+        path = Path(audio_file).resolve()
+        stat = path.stat()
+        return (path, stat.st_mtime_ns, stat.st_size, tuple(candidates))
+
+    def get(self, key: Tuple) -> Tuple[bool, Optional[LocaleGuess]]:
+        """
+        Look up a probe outcome.
+
+        Args:
+            key: Key from key()
+
+        Returns:
+            Tuple of whether the file was probed and the guess, if any
+        """
+        with self._lock:
+            if key in self._entries:
+                return True, self._entries[key]
+            return False, None
+
+    def put(self, key: Tuple, guess: Optional[LocaleGuess]) -> None:
+        """Store a probe outcome."""
+        with self._lock:
+            self._entries[key] = guess
+
+    def guesses(self) -> List[Optional[LocaleGuess]]:
+        """Get every cached outcome, None for probes that found no speech."""
+        with self._lock:
+            return list(self._entries.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,185 @@
+"""
+On-disk cache of the service's supported locales and client-side locale validation.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+
+# How long a fetched locales list is used before it is refreshed
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+def default_cache_dir() -> Path:
+    """Get the per-user cache directory ($XDG_CACHE_HOME/fast-transcription)."""
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "fast-transcription"
+
+
+def parse_locales(response: Any) -> List[str]:
+    """
+    Get the transcription locales from a locales endpoint response.
+
+    Args:
+        response: Either a list of locales or a dict keyed by feature
+            with a "Transcribe" list
+
+    Returns:
+        List of locale codes
+
+    Raises:
+        ValueError: If the response has neither shape
+    """
+    if isinstance(response, dict):
+        for key in ("Transcribe", "transcribe"):
+            if key in response:
+                return list(response[key])
+    elif isinstance(response, list):
+        return list(response)
+    raise ValueError("Unexpected locales response")
+
+
+class LocaleCache:
+    """
+    Supported-locales list backed by a TTL'd file.
+
+    The list is loaded on first use. A fresh file is used as is. A stale
+    file is still used, and a background thread fetches a new list for
+    the next run. A lookup waits for the service only when there is no
+    file at all, or when validation misses on a list read from the file,
+    in case the service added the locale since.
+    """
+
+    def __init__(
+        self,
+        client,
+        path: Optional[Union[str, Path]] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            client: AzureSpeechClient used to fetch the list
+            path: Cache file. Defaults to a file per endpoint in default_cache_dir().
+            ttl_seconds: Age after which the file is refreshed
+        """
+        self.client = client
+        if path is None:
+            endpoint_hash = hashlib.sha256(client.config.base_url.encode("utf-8")).hexdigest()[:16]
+            path = default_cache_dir() / f"locales-{endpoint_hash}.json"
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+
+        self._locales: Optional[List[str]] = None
+        self._fetched = False
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def _read(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                entry = json.load(f)
+            if isinstance(entry.get("locales"), list):
+                return entry
+        except (OSError, ValueError, AttributeError):
+            pass
+        return None
+
+    def refresh(self) -> List[str]:
+        """
+        Fetch the list from the service and store it.
+
+        Returns:
+            List of supported locale codes
+
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        locales = parse_locales(self.client.get_supported_locales())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"fetched_at": time.time(), "locales": locales}, f)
+        os.replace(temp_path, self.path)
+        self._locales = locales
+        self._fetched = True
+        return locales
+
+    def _refresh_in_background(self) -> None:
+        def run():
+            try:
+                self.refresh()
+            except Exception:
+                # The stale list stays in use; the next run tries again
+                pass
+
+        with self._lock:
+            if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                self._refresh_thread = threading.Thread(target=run, daemon=True)
+                self._refresh_thread.start()
+
+    def locales(self) -> List[str]:
+        """
+        Get the supported locales.
+
+        Returns:
+            List of supported locale codes
+
+        Raises:
+            requests.RequestException: If there is no cached list and the
+                request fails
+        """
+        if self._locales is not None:
+            return self._locales
+
+        entry = self._read()
+        if entry is None:
+            return self.refresh()
+
+        self._locales = entry["locales"]
+        if time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            self._refresh_in_background()
+        return self._locales
+
+    def validate(self, locales: List[str]) -> List[str]:
+        """
+        Check locales against the supported list.
+
+        Args:
+            locales: Locale codes to check
+
+        Returns:
+            List of the locales with the service's capitalization
+
+        Raises:
+            ValueError: If a locale is not supported, naming close matches
+            requests.RequestException: If there is no cached list and the
+                request fails
+        """
+        supported = self.locales()
+        if not self._fetched and any(locale.lower() not in {s.lower() for s in supported} for locale in locales):
+            try:
+                supported = self.refresh()
+            except Exception:
+                # Judge by the cached list if the service cannot be reached
+                pass
+        by_lower = {locale.lower(): locale for locale in supported}
+
+        canonical = []
+        for locale in locales:
+            match = by_lower.get(locale.lower())
+            if match is None:
+                suggestions = difflib.get_close_matches(locale.lower(), list(by_lower), n=3, cutoff=0.6)
+                message = f"Unsupported locale: {locale}"
+                if suggestions:
+                    message += f" (did you mean {', '.join(by_lower[s] for s in suggestions)}?)"
+                raise ValueError(message)
+            canonical.append(match)
+        return canonical
@@ -0,0 +1,365 @@
+"""
+Streaming multipart/form-data encoding and decoding for audio uploads.
+"""
+
+import hashlib
+import io
+import re
+import time
+import uuid
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Union
+
+
+# Size of the blocks read from audio streams
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadCancelled(Exception):
+    """Raised while sending a body whose encoder was cancelled."""
+
+
+class MultipartField(NamedTuple):
+    """One part of a multipart/form-data body."""
+
+    name: str
+    data: Union[bytes, BinaryIO]
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    # Size of a stream's data in bytes, or None if unknown
+    size: Optional[int] = None
+
+
+class MultipartEncoder:
+    """
+    Produces a multipart/form-data body block by block.
+
+    Stream fields are read in CHUNK_SIZE blocks and hashed with SHA-256 as
+    they pass through, so memory use does not depend on the size of the
+    audio. The encoder is both iterable and file-like (read), which lets
+    requests and http.client send it without building the body in memory.
+
+    When every field size is known, `len` holds the total body length and
+    the request is sent with a Content-Length header; otherwise `len` is
+    None and the body is sent with chunked transfer encoding.
+    """
+
+    def __init__(self, fields: List[MultipartField], chunk_size: int = CHUNK_SIZE):
+        """
+        Initialize the encoder.
+
+        Args:
+            fields: Parts of the body, in order
+            chunk_size: Size of the blocks read from stream fields
+        """
+        self.fields = fields
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        self.bytes_read = 0
+        # perf_counter() time at which the last block was handed out
+        self.completed_at: Optional[float] = None
+        self.cancelled = False
+
+        self._hashers: Dict[str, "hashlib._Hash"] = {}
+        self._complete = set()
+        self._headers = [self._part_header(field) for field in fields]
+        self._trailer = f"--{self.boundary}--\r\n".encode("ascii")
+        self._blocks = self._iter_blocks()
+        self._buffer = bytearray()
+
+        self.len = self._content_length()
+
+    @property
+    def content_type(self) -> str:
+        """Value for the request's Content-Type header."""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _part_header(self, field: MultipartField) -> bytes:
+        disposition = f'form-data; name="{field.name}"'
+        if field.filename is not None:
+            disposition += f'; filename="{field.filename}"'
+        lines = [f"--{self.boundary}", f"Content-Disposition: {disposition}"]
+        if field.content_type is not None:
+            lines.append(f"Content-Type: {field.content_type}")
+        elif field.filename is not None:
+            lines.append("Content-Type: application/octet-stream")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+
+    def _content_length(self) -> Optional[int]:
+        total = len(self._trailer)
+        for header, field in zip(self._headers, self.fields):
+            size = len(field.data) if isinstance(field.data, bytes) else field.size
+            if size is None:
+                return None
+            # Each part is its header, its data and a CRLF
+            total += len(header) + size + 2
+        return total
+
+    def cancel(self) -> None:
+        """Stop the upload: reading the next block raises UploadCancelled."""
+        self.cancelled = True
+
+    def _iter_blocks(self) -> Iterator[bytes]:
+        for header, field in zip(self._headers, self.fields):
+            yield header
+            if isinstance(field.data, bytes):
+                yield field.data
+            else:
+                hasher = self._hashers[field.name] = hashlib.sha256()
+                while True:
+                    if self.cancelled:
+                        raise UploadCancelled("Upload cancelled")
+                    block = field.data.read(self.chunk_size)
+                    if not block:
+                        break
+                    hasher.update(block)
+                    yield block
+                self._complete.add(field.name)
+            yield b"\r\n"
+        self.completed_at = time.perf_counter()
+        yield self._trailer
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._buffer:
+            pending = bytes(self._buffer)
+            self._buffer.clear()
+            self.bytes_read += len(pending)
+            yield pending
+        for block in self._blocks:
+            self.bytes_read += len(block)
+            yield block
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to size bytes of the body.
+
+        Args:
+            size: Maximum number of bytes, or -1 for the rest of the body
+
+        Returns:
+            bytes: Next part of the body; empty once it is exhausted
+        """
+        if size is None or size < 0:
+            return b"".join(self)
+
+        while len(self._buffer) < size:
+            block = next(self._blocks, None)
+            if block is None:
+                break
+            self._buffer += block
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def hexdigest(self, name: str) -> Optional[str]:
+        """
+        Get the SHA-256 digest of a stream field.
+
+        Args:
+            name: Field name
+
+        Returns:
+            str: Hex digest, or None if the field is not a stream or has not
+                been fully read yet
+        """
+        if name not in self._complete:
+            return None
+        return self._hashers[name].hexdigest()
+
+
+class ChunkedBodyReader(io.RawIOBase):
+    """Decodes a request body sent with chunked transfer encoding."""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._remaining = 0
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._done:
+            return 0
+        if self._remaining == 0:
+            size_line = self._stream.readline()
+            self._remaining = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if self._remaining == 0:
+                # Skip trailers up to the final blank line
+                while self._stream.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                self._done = True
+                return 0
+        data = self._stream.read(min(len(buffer), self._remaining))
+        if not data:
+            raise ValueError("Chunked body ended early")
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        if self._remaining == 0:
+            self._stream.readline()
+        return len(data)
+
+
+class LimitedBodyReader(io.RawIOBase):
+    """Reads a Content-Length body, optionally throttled to a bandwidth limit."""
+
+    def __init__(self, stream: BinaryIO, length: int, bytes_per_second: Optional[float] = None):
+        self._stream = stream
+        self._remaining = length
+        self._bytes_per_second = bytes_per_second
+        self._start = time.monotonic()
+        self._read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        data = self._stream.read(min(len(buffer), self._remaining))
+        if not data:
+            raise ValueError("Request body ended early")
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        self._read += len(data)
+
+        if self._bytes_per_second:
+            # Sleep until the body has taken as long as the bandwidth allows
+            due = self._start + self._read / self._bytes_per_second
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return len(data)
+
+
+class ReceivedPart(NamedTuple):
+    """One part of a decoded multipart/form-data body."""
+
+    name: str
+    filename: Optional[str]
+    content_type: Optional[str]
+    # Bytes for plain fields, or the object returned by open_file for file fields
+    data: Union[bytes, BinaryIO]
+
+
+_DISPOSITION_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+
+def boundary_from_content_type(content_type: str) -> str:
+    """
+    Get the boundary parameter of a multipart Content-Type header.
+
+    Args:
+        content_type: Header value
+
+    Returns:
+        str: Boundary string
+
+    Raises:
+        ValueError: If the header is not multipart/form-data with a boundary
+    """
+    media_type, _, params = content_type.partition(";")
+    if media_type.strip().lower() != "multipart/form-data":
+        raise ValueError(f"Expected multipart/form-data, got {media_type.strip()!r}")
+    for param in params.split(";"):
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary" and value:
+            return value.strip('"')
+    raise ValueError("multipart/form-data Content-Type has no boundary")
+
+
+def read_multipart(
+    stream: BinaryIO,
+    boundary: str,
+    open_file: Optional[Callable[[str, str], BinaryIO]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> Dict[str, ReceivedPart]:
+    """
+    Decode a multipart/form-data body while it is being received.
+
+    The body is read in chunk_size blocks. File parts are written
+    to the object returned by open_file as they arrive, so memory use does
+    not depend on the size of the upload. Plain fields are kept as bytes.
+
+    Args:
+        stream: Body stream, read until the closing boundary
+        boundary: Boundary from the request's Content-Type
+        open_file: Called with (field name, filename) for each file part;
+            returns a writable object. Defaults to an in-memory buffer.
+        chunk_size: Size of the blocks read from the stream
+
+    Returns:
+        Dict mapping field names to their parts
+
+    Raises:
+        ValueError: If the body is malformed or ends early
+    """
+    delimiter = b"\r\n--" + boundary.encode("ascii")
+    # A leading CRLF lets the first boundary line match the delimiter too
+    buffer = bytearray(b"\r\n")
+    eof = False
+
+    def fill() -> None:
+        nonlocal eof
+        block = stream.read(chunk_size)
+        if not block:
+            eof = True
+        buffer.extend(block)
+
+    def copy_until_delimiter(sink) -> None:
+        while True:
+            index = buffer.find(delimiter)
+            if index >= 0:
+                if sink is not None:
+                    sink.write(bytes(buffer[:index]))
+                del buffer[:index + len(delimiter)]
+                return
+            if eof:
+                raise ValueError("Multipart body ended before the closing boundary")
+            # Keep a possible partial delimiter at the end of the buffer
+            safe = len(buffer) - len(delimiter) + 1
+            if safe > 0:
+                if sink is not None:
+                    sink.write(bytes(buffer[:safe]))
+                del buffer[:safe]
+            fill()
+
+    # Skip the preamble
+    copy_until_delimiter(None)
+
+    parts = {}
+    while True:
+        while len(buffer) < 2 and not eof:
+            fill()
+        if buffer[:2] == b"--":
+            return parts
+
+        while True:
+            end = buffer.find(b"\r\n\r\n")
+            if end >= 0:
+                break
+            if eof:
+                raise ValueError("Multipart part headers are incomplete")
+            fill()
+
+        headers = {}
+        for line in bytes(buffer[2:end]).decode("utf-8", errors="replace").split("\r\n"):
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        del buffer[:end + 4]
+
+        params = dict(_DISPOSITION_PARAM.findall(headers.get("content-disposition", "")))
+        name = params.get("name", "")
+        filename = params.get("filename")
+
+        if filename is not None and open_file is not None:
+            sink = open_file(name, filename)
+            copy_until_delimiter(sink)
+            data = sink
+        else:
+            sink = io.BytesIO()
+            copy_until_delimiter(sink)
+            data = sink.getvalue()
+
+        parts[name] = ReceivedPart(name, filename, headers.get("content-type"), data)
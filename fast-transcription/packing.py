@@ -0,0 +1,228 @@
+"""
+Packing many short clips into one upload and splitting the response per clip.
+
+For voice notes of a few seconds, connection reuse, multipart encoding and
+the service's per-request job setup cost more than the audio itself.
+Packing places the clips back to back, separated by silence, so one
+request carries dozens of them; an offset table then splits the returned
+phrases back into one result per clip on the clip's own timeline.
+"""
+
+import bisect
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+from audio import DEFAULT_SAMPLE_RATE, PCMAudio
+from utils import probe_audio
+
+
+# Silence placed between packed clips, long enough to end a phrase
+DEFAULT_GAP_MS = 1000
+
+# Packs are uploaded as 16-bit mono at this rate, whatever the clips' formats
+PACK_SAMPLE_RATE = DEFAULT_SAMPLE_RATE
+
+
+class PackedClip(NamedTuple):
+    """Position of one clip in a packed upload."""
+    audio_file: Union[str, Path]
+    start_ms: int
+    duration_ms: int
+
+
+class ClipTable:
+    """
+    Offset table of the clips in one packed upload.
+
+    Each clip owns its own span of the packed timeline plus half of the
+    silence either side of it, so a time in a gap belongs to the nearer
+    clip.
+    """
+
+    def __init__(self, clips: List[PackedClip]):
+        """
+        Initialize the table.
+
+        Args:
+            clips: Clips in the order they were packed
+        """
+        self.clips = clips
+        # A clip's share of the timeline starts halfway through the gap before it
+        self._bounds = [
+            (previous.start_ms + previous.duration_ms + clip.start_ms) // 2
+            for previous, clip in zip(clips, clips[1:])
+        ]
+
+    def clip_at(self, ms: float) -> int:
+        """
+        Get the clip a time on the packed timeline belongs to.
+
+        Args:
+            ms: Time on the packed timeline in milliseconds
+
+        Returns:
+            int: Index of the clip
+        """
+        return bisect.bisect_right(self._bounds, ms)
+
+    def split_result(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Split the response for a packed upload into one response per clip.
+
+        Words are assigned to clips by their midpoint, so a phrase the
+        service ran across a gap is divided, and its text rebuilt from its
+        words. Phrases without words go by their midpoint. Offsets are
+        moved onto each clip's own timeline and clamped to the clip.
+
+        Args:
+            result: Transcription response for the packed audio
+
+        Returns:
+            List of transcription responses, one per clip, in packing order
+        """
+        phrases: List[List[Dict[str, Any]]] = [[] for _ in self.clips]
+        for phrase in result.get("phrases", []):
+            for index, piece in self._split_phrase(phrase):
+                phrases[index].append(self._rebase(piece, self.clips[index]))
+
+        results = []
+        for clip, clip_phrases in zip(self.clips, phrases):
+            combined: Dict[Any, List[str]] = {}
+            for phrase in clip_phrases:
+                if phrase.get("text"):
+                    combined.setdefault(phrase.get("channel"), []).append(phrase["text"])
+            combined_phrases = []
+            for channel, texts in combined.items():
+                entry = {"text": " ".join(texts)}
+                if channel is not None:
+                    entry = {"channel": channel, **entry}
+                combined_phrases.append(entry)
+            results.append({
+                "durationMilliseconds": clip.duration_ms,
+                "combinedPhrases": combined_phrases,
+                "phrases": clip_phrases,
+            })
+        return results
+
+    def _split_phrase(self, phrase: Dict[str, Any]) -> List[Tuple[int, Dict[str, Any]]]:
+        """Divide a phrase between the clips its words fall in."""
+        words = phrase.get("words")
+        if not words:
+            offset = phrase.get("offsetMilliseconds", 0)
+            return [(self.clip_at(offset + phrase.get("durationMilliseconds", 0) / 2), phrase)]
+
+        groups: List[Tuple[int, List[Dict[str, Any]]]] = []
+        for word in words:
+            index = self.clip_at(word.get("offsetMilliseconds", 0) + word.get("durationMilliseconds", 0) / 2)
+            if groups and groups[-1][0] == index:
+                groups[-1][1].append(word)
+            else:
+                groups.append((index, [word]))
+        if len(groups) == 1:
+            return [(groups[0][0], phrase)]
+
+        # Languages written without spaces have none between words either
+        separator = " " if " " in phrase.get("text", " ") else ""
+        pieces = []
+        for index, group in groups:
+            start = group[0].get("offsetMilliseconds", 0)
+            end = max(word.get("offsetMilliseconds", 0) + word.get("durationMilliseconds", 0) for word in group)
+            piece = dict(phrase)
+            piece.update(
+                offsetMilliseconds=start,
+                durationMilliseconds=end - start,
+                text=separator.join(word.get("text", "") for word in group),
+                words=group,
+            )
+            pieces.append((index, piece))
+        return pieces
+
+    def _rebase(self, item: Dict[str, Any], clip: PackedClip) -> Dict[str, Any]:
+        """Move a phrase or word, including nested words, onto the clip's timeline."""
+        rebased = dict(item)
+        start = item.get("offsetMilliseconds", 0) - clip.start_ms
+        end = start + item.get("durationMilliseconds", 0)
+        start = min(max(0, start), clip.duration_ms)
+        rebased["offsetMilliseconds"] = start
+        if "durationMilliseconds" in item:
+            rebased["durationMilliseconds"] = max(0, min(end, clip.duration_ms) - start)
+        if "words" in item:
+            rebased["words"] = [self._rebase(word, clip) for word in item["words"]]
+        return rebased
+
+
+def pack_clips(
+    clips: Sequence[Tuple[Union[str, Path], PCMAudio]],
+    gap_ms: int = DEFAULT_GAP_MS
+) -> Tuple[PCMAudio, ClipTable]:
+    """
+    Place decoded clips back to back with silence between them.
+
+    Every clip is mixed down to mono and resampled to PACK_SAMPLE_RATE.
+
+    Args:
+        clips: (audio file, decoded audio) for each clip, in packing order
+        gap_ms: Silence between consecutive clips in milliseconds
+
+    Returns:
+        Tuple of the packed audio and its offset table
+    """
+    gap = np.zeros(PACK_SAMPLE_RATE * gap_ms // 1000, dtype=np.int16)
+    parts = []
+    table = []
+    frames = 0
+    for index, (audio_file, audio) in enumerate(clips):
+        if index:
+            parts.append(gap)
+            frames += len(gap)
+        samples = audio.resample(PACK_SAMPLE_RATE, mono=True).samples[:, 0]
+        table.append(PackedClip(
+            audio_file,
+            int(round(frames * 1000 / PACK_SAMPLE_RATE)),
+            int(round(len(samples) * 1000 / PACK_SAMPLE_RATE))
+        ))
+        parts.append(samples)
+        frames += len(samples)
+
+    packed = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+    return PCMAudio(packed, PACK_SAMPLE_RATE), ClipTable(table)
+
+
+def plan_packs(
+    audio_files: Sequence[Union[str, Path]],
+    max_pack_seconds: float = 300.0,
+    max_clips: int = 50,
+    gap_ms: int = DEFAULT_GAP_MS
+) -> List[List[Union[str, Path]]]:
+    """
+    Group clips into packs by their header durations, keeping input order.
+
+    Args:
+        audio_files: Paths to the clips
+        max_pack_seconds: Longest packed audio, gaps included
+        max_clips: Most clips in one pack
+        gap_ms: Silence between consecutive clips in milliseconds
+
+    Returns:
+        List of packs, each a list of paths
+    """
+    packs: List[List[Union[str, Path]]] = []
+    current: List[Union[str, Path]] = []
+    current_seconds = 0.0
+    for audio_file in audio_files:
+        try:
+            seconds = probe_audio(audio_file).duration or 0.0
+        except Exception:
+            # Unreadable headers are reported when the clip is decoded
+            seconds = 0.0
+        needed = seconds + (gap_ms / 1000.0 if current else 0.0)
+        if current and (len(current) >= max_clips or current_seconds + needed > max_pack_seconds):
+            packs.append(current)
+            current, current_seconds, needed = [], 0.0, seconds
+        current.append(audio_file)
+        current_seconds += needed
+    if current:
+        packs.append(current)
+    return packs
@@ -0,0 +1,115 @@
+"""
+Retry policy for throttled or failed Azure Speech-to-Text requests.
+"""
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+# Status codes that indicate throttling or a transient service failure
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+# Headers that say how long to wait before retrying, in the order they are read
+RETRY_AFTER_HEADERS = ("retry-after-ms", "x-ms-retry-after-ms", "Retry-After")
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Get the server-requested wait time from response headers.
+
+    Azure services send either the standard Retry-After header (seconds or
+    an HTTP date) or the millisecond variants retry-after-ms and
+    x-ms-retry-after-ms.
+
+    Args:
+        headers: Response headers (case-insensitive mapping)
+
+    Returns:
+        float: Seconds to wait, or None if the server did not say
+    """
+    for name in RETRY_AFTER_HEADERS[:2]:
+        value = headers.get(name)
+        if value:
+            try:
+                return max(0.0, float(value) / 1000.0)
+            except ValueError:
+                pass
+
+    value = headers.get(RETRY_AFTER_HEADERS[2])
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that honours Retry-After."""
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 60.0,
+        retry_statuses=RETRYABLE_STATUS_CODES
+    ):
+        """
+        Initialize the retry policy.
+
+        Args:
+            max_retries: Maximum number of retries after the first attempt
+            backoff_base: Backoff ceiling for the first retry in seconds;
+                doubles with every further retry
+            backoff_max: Upper bound for any single wait in seconds,
+                including server-requested waits
+            retry_statuses: HTTP status codes that are retried
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def retry_delay(
+        self,
+        attempt: int,
+        status_code: Optional[int] = None,
+        headers: Optional[Mapping[str, str]] = None
+    ) -> Optional[float]:
+        """
+        Decide whether to retry a failed attempt and how long to wait first.
+
+        Args:
+            attempt: Zero-based number of the attempt that just failed
+            status_code: HTTP status of the response, or None for a
+                connection error or timeout
+            headers: Response headers, if a response was received
+
+        Returns:
+            float: Seconds to wait before retrying, or None to give up
+        """
+        if attempt >= self.max_retries:
+            return None
+        if status_code is not None and status_code not in self.retry_statuses:
+            return None
+
+        retry_after = parse_retry_after(headers) if headers is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+
+        # Full jitter keeps many throttled clients from retrying in lockstep
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+# Policy that never retries, for callers that handle failures themselves
+NO_RETRY = RetryPolicy(max_retries=0)
@@ -0,0 +1,405 @@
+"""
+Re-readable audio sources so failed uploads can be retried from the start.
+"""
+
+import hashlib
+import io
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Union
+
+from utils import is_video_file, probe_audio
+
+
+# In-memory limit of the replay buffer kept for non-seekable streams
+SPOOL_MAX_MEMORY = 4 * 1024 * 1024
+
+# Read size used when hashing audio
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Audio codecs uploaded without re-encoding, with the format ffmpeg writes them in
+COPY_FORMATS = {
+    "aac": ("adts", ".aac"),
+    "mp3": ("mp3", ".mp3"),
+    "opus": ("ogg", ".ogg"),
+    "vorbis": ("ogg", ".ogg"),
+    "flac": ("flac", ".flac"),
+}
+
+# Encoding for every other codec: lossless, 16 kHz mono
+TRANSCODE_ARGS = ["-c:a", "flac", "-ac", "1", "-ar", "16000", "-f", "flac"]
+
+
+class AudioSource:
+    """Audio that can be opened again from its first byte for every upload attempt."""
+
+    name = "audio"
+    # Whether the audio can be re-read without first spooling it
+    seekable = True
+
+    def open(self) -> BinaryIO:
+        """
+        Get a stream positioned at the start of the audio.
+
+        Returns:
+            BinaryIO: Readable stream; only valid until the next open or close
+        """
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        """
+        Get the size of the audio in bytes.
+
+        Returns:
+            int: Size in bytes, or None if it is not known in advance
+        """
+        return None
+
+    def fork(self) -> Optional["AudioSource"]:
+        """
+        Get an independent source for uploading the same audio concurrently.
+
+        Returns:
+            AudioSource: New source the caller closes, or None if the audio
+            cannot be read twice at once
+        """
+        return None
+
+    def record_digest(self, digest: str) -> None:
+        """
+        Remember a digest computed while the audio was being uploaded.
+
+        Args:
+            digest: SHA-256 hex digest of the complete audio
+        """
+        self._digest = digest
+
+    def digest(self) -> str:
+        """
+        Get the SHA-256 digest of the audio bytes.
+
+        The audio is read once and the result kept, so later uploads
+        re-open the source as usual.
+
+        Returns:
+            str: Hex digest
+        """
+        if getattr(self, "_digest", None) is None:
+            hasher = hashlib.sha256()
+            stream = self.open()
+            for block in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(block)
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    def close(self) -> None:
+        """Release any handles opened by the source."""
+
+    def __enter__(self) -> "AudioSource":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class FileAudioSource(AudioSource):
+    """Audio file on disk, re-opened for every attempt."""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Initialize the source.
+
+        Args:
+            path: Path to the audio file
+
+        Raises:
+            ValueError: If the file does not exist
+        """
+        self.path = Path(path)
+        if not self.path.exists():
+            raise ValueError(f"Audio file not found: {self.path}")
+        self.name = self.path.name
+        self._handle: Optional[BinaryIO] = None
+
+    def open(self) -> BinaryIO:
+        self.close()
+        self._handle = open(self.path, "rb")
+        return self._handle
+
+    def size(self) -> Optional[int]:
+        return self.path.stat().st_size
+
+    def fork(self) -> Optional[AudioSource]:
+        return FileAudioSource(self.path)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class SeekableAudioSource(AudioSource):
+    """Caller-owned seekable stream, rewound to its starting position for every attempt."""
+
+    def __init__(self, stream: BinaryIO):
+        """
+        Initialize the source.
+
+        Args:
+            stream: Seekable binary stream positioned at the start of the audio
+        """
+        self.stream = stream
+        self.name = _stream_name(stream)
+        self._start = stream.tell()
+
+    def open(self) -> BinaryIO:
+        self.stream.seek(self._start)
+        return self.stream
+
+    def size(self) -> Optional[int]:
+        end = self.stream.seek(0, io.SEEK_END)
+        self.stream.seek(self._start)
+        return end - self._start
+
+    def fork(self) -> Optional[AudioSource]:
+        # In-memory buffers and WAV segments can be read twice without copying the audio
+        if isinstance(self.stream, io.BytesIO):
+            stream = io.BytesIO(self.stream.getvalue())
+        elif hasattr(self.stream, "clone"):
+            stream = self.stream.clone()
+        else:
+            return None
+        stream.seek(self._start)
+        source = SeekableAudioSource(stream)
+        source.name = self.name
+        return source
+
+
+class ReplayableAudioSource(AudioSource):
+    """
+    Non-seekable stream such as stdin or a subprocess pipe.
+
+    Bytes are copied into a spooled temporary file as they are read, so a
+    retry replays what was already consumed and then continues with the
+    rest of the stream. Memory use is bounded by SPOOL_MAX_MEMORY; larger
+    streams spill to a temporary file.
+    """
+
+    seekable = False
+
+    def __init__(self, stream: BinaryIO):
+        """
+        Initialize the source.
+
+        Args:
+            stream: Readable binary stream positioned at the start of the audio
+        """
+        self.stream = stream
+        self.name = _stream_name(stream)
+        self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        self._exhausted = False
+
+    def open(self) -> BinaryIO:
+        self._spool.seek(0)
+        return _ReplayReader(self)
+
+    def size(self) -> Optional[int]:
+        # Only known once the stream has been read to the end
+        if self._exhausted:
+            return self._spool.seek(0, io.SEEK_END)
+        return None
+
+    def close(self) -> None:
+        self._spool.close()
+
+
+class FFmpegAudioSource(AudioSource):
+    """
+    Audio track of a video file, extracted by ffmpeg while it is uploaded.
+
+    Every open() starts a new ffmpeg process whose output is read as the
+    request body, so extraction overlaps with the upload and no temporary
+    file is written. Tracks in a codec the service accepts (AAC, MP3, Opus,
+    Vorbis, FLAC) are copied without re-encoding; others are transcoded to
+    16 kHz mono FLAC. The size is not known in advance, so the body is
+    sent with chunked transfer encoding.
+    """
+
+    def __init__(self, path: Union[str, Path], codec: Optional[str] = None):
+        """
+        Initialize the source.
+
+        Args:
+            path: Path to the video file
+            codec: Codec of the audio track. Probed with ffprobe if not given.
+
+        Raises:
+            ValueError: If the file does not exist
+            RuntimeError: If ffmpeg is not installed
+        """
+        self.path = Path(path)
+        if not self.path.exists():
+            raise ValueError(f"Audio file not found: {self.path}")
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError(f"ffmpeg is required to extract the audio of {self.path.suffix} files")
+
+        if codec is None:
+            try:
+                codec = probe_audio(self.path).codec
+            except Exception:
+                # Transcode whatever the track turns out to be
+                codec = None
+        self.codec = codec
+
+        if codec in COPY_FORMATS:
+            container, extension = COPY_FORMATS[codec]
+            output_args = ["-c:a", "copy", "-f", container]
+        else:
+            extension = ".flac"
+            output_args = TRANSCODE_ARGS
+        self.name = f"{self.path.stem}{extension}"
+        self.command: List[str] = [
+            ffmpeg, "-nostdin", "-v", "error",
+            "-i", str(self.path),
+            "-map", "0:a:0", "-vn", "-sn", "-dn",
+            *output_args,
+            "pipe:1",
+        ]
+        self._process: Optional[subprocess.Popen] = None
+
+    def open(self) -> BinaryIO:
+        self.close()
+        # ffmpeg's messages go to a file, so a full pipe can never stall it
+        stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(self.command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+        return io.BufferedReader(_FFmpegReader(self._process, stderr, self.path), buffer_size=HASH_CHUNK_SIZE)
+
+    def fork(self) -> Optional[AudioSource]:
+        return FFmpegAudioSource(self.path, self.codec)
+
+    def digest(self) -> str:
+        # The container identifies the audio, and hashing it is cheaper than extracting the track
+        if getattr(self, "_digest", None) is None:
+            hasher = hashlib.sha256()
+            with open(self.path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    hasher.update(block)
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    def record_digest(self, digest: str) -> None:
+        # The extracted bytes depend on the ffmpeg version; keep the container digest
+        pass
+
+    def close(self) -> None:
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.kill()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+
+class _FFmpegReader(io.RawIOBase):
+    """Reads ffmpeg's output and raises at the end if ffmpeg failed, so no truncated audio is uploaded."""
+
+    def __init__(self, process: subprocess.Popen, stderr: BinaryIO, path: Path):
+        self._process = process
+        self._stderr = stderr
+        self._path = path
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._process.stdout.readinto(buffer)
+        if count:
+            return count
+
+        returncode = self._process.wait()
+        if returncode != 0:
+            self._stderr.seek(0)
+            message = self._stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg could not extract the audio of {self._path}: {message}")
+        return 0
+
+    def close(self) -> None:
+        self._stderr.close()
+        super().close()
+
+
+class _ReplayReader(io.RawIOBase):
+    """Reads the spooled prefix of a ReplayableAudioSource, then the live stream."""
+
+    def __init__(self, source: ReplayableAudioSource):
+        self._source = source
+        self._position = 0
+        self.name = source.name
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        source = self._source
+        spool = source._spool
+
+        # Replay bytes consumed by earlier attempts first
+        spooled = spool.seek(0, io.SEEK_END)
+        if self._position < spooled:
+            spool.seek(self._position)
+            count = spool.readinto(buffer)
+            self._position += count
+            return count
+
+        if source._exhausted:
+            return 0
+
+        data = source.stream.read(len(buffer))
+        if not data:
+            source._exhausted = True
+            return 0
+
+        spool.write(data)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+def _stream_name(stream: BinaryIO) -> str:
+    """Get a file name for the upload from a stream's name attribute, if it has one."""
+    name = getattr(stream, "name", None)
+    if isinstance(name, (str, Path)) and not str(name).startswith("<"):
+        return Path(name).name
+    return AudioSource.name
+
+
+def open_audio_source(audio_file: Union[str, Path, BinaryIO, AudioSource]) -> AudioSource:
+    """
+    Wrap an audio argument in a source that can be re-read for retries.
+
+    Paths to video files get an FFmpegAudioSource that extracts their
+    audio track.
+
+    Args:
+        audio_file: Path to audio file, file-like object, or AudioSource
+
+    Returns:
+        AudioSource: Source for the audio
+
+    Raises:
+        ValueError: If a path does not exist
+    """
+    if isinstance(audio_file, AudioSource):
+        return audio_file
+    if isinstance(audio_file, (str, Path)):
+        if is_video_file(audio_file):
+            return FFmpegAudioSource(audio_file)
+        return FileAudioSource(audio_file)
+
+    seekable = getattr(audio_file, "seekable", None)
+    if seekable is not None and seekable():
+        return SeekableAudioSource(audio_file)
+    return ReplayableAudioSource(audio_file)
@@ -2,39 +2,432 @@
 Azure Speech-to-Text client for making transcription requests.
 """
 
+import io
 import json
+import logging
+import threading
+import time
 import requests
-from typing import List, Dict, Any, Optional, Union, BinaryIO
+from requests.adapters import HTTPAdapter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import List, Dict, Any, Optional, Union, BinaryIO, Iterable, Iterator, NamedTuple, Callable
 import os
 from pathlib import Path
 
-from config import AzureSpeechConfig
+from cache import TranscriptionCache
+from concurrency import THROTTLE_STATUS_CODES, AdaptiveLimiter
+from config import AzureSpeechConfig, SpeechEndpoint
+from audio import load_pcm
+from instrumentation import Hook, Instrumentation, RequestTrace
+from locale_probe import DEFAULT_PROBE_SECONDS, PROBE_SEARCH_FACTOR, LocaleGuess, LocaleProbeCache, build_probe, score_locales
+from chunking import AudioChunk, split_audio
+from endpoints import EndpointPool
+from hedging import HedgingPolicy
+from multipart import MultipartEncoder, MultipartField, UploadCancelled
+from packing import DEFAULT_GAP_MS, pack_clips, plan_packs
+from retry import RetryPolicy, parse_retry_after
+from sources import AudioSource, open_audio_source
+from transcode import Transcoder
+from utils import merge_transcription_results, probe_audio
+from vad import strip_silence
+
+
+logger = logging.getLogger(__name__)
+
+
+def build_headers(config: Union[AzureSpeechConfig, SpeechEndpoint]) -> Dict[str, str]:
+    """
+    Get the authentication headers for API requests.
+    
+    Args:
+        config: Configuration or pool endpoint holding the API key
+    
+    Returns:
+        Dict of HTTP headers
+    """
+    return {
+        "Ocp-Apim-Subscription-Key": config.api_key
+    }
+
+
+def build_definition(locales: List[str], **kwargs) -> Dict[str, Any]:
+    """
+    Get the definition payload sent alongside the audio.
+    
+    Args:
+        locales: List of language locales for transcription
+        **kwargs: Additional parameters to pass to the API
+    
+    Returns:
+        Dict containing the transcription definition
+    """
+    return {
+        "locales": locales,
+        **kwargs
+    }
+
+
+def encode_request(source: AudioSource, definition: Dict[str, Any]) -> MultipartEncoder:
+    """
+    Get a streaming multipart body for a transcription request.
+    
+    Args:
+        source: Audio to upload, opened from its first byte
+        definition: Definition payload sent alongside the audio
+    
+    Returns:
+        MultipartEncoder that reads the audio as the body is sent
+    """
+    return MultipartEncoder([
+        MultipartField("audio", source.open(), filename=source.name, size=source.size()),
+        MultipartField("definition", json.dumps(definition).encode("utf-8"), content_type="application/json"),
+    ])
+
+
+class TranscriptionRequest:
+    """
+    Steps of a transcription request that do not depend on how it is sent.
+    
+    AzureSpeechClient and AsyncAzureSpeechClient both go through these
+    steps, so caching, transcoding and request events behave the same in
+    either client:
+    
+    1. lookup() returns a cached response, if there is one
+    2. prepare() transcodes the file
+    3. the client sends the body from encode_request(request.upload, ...)
+       and calls uploaded() with the encoder of a successful attempt
+    4. store() caches the response
+    5. close() releases the sources and emits the request event
+    
+    Every step may block on disk, CPU or hooks; the async client runs them
+    in a worker thread.
+    """
+    
+    def __init__(
+        self,
+        audio_file: Union[str, Path, BinaryIO, AudioSource],
+        definition: Dict[str, Any],
+        trace: RequestTrace,
+        cache: Optional[TranscriptionCache] = None,
+        transcoder: Optional[Transcoder] = None,
+        instrumentation: Optional[Instrumentation] = None
+    ):
+        """
+        Open the audio of a request.
+        
+        Args:
+            audio_file: Path to audio file, file-like object or AudioSource
+            definition: Definition payload sent alongside the audio
+            trace: Trace that records the request
+            cache: Cache consulted before uploading, if any
+            transcoder: Transcoder applied to paths before uploading, if any
+            instrumentation: Hook registry that receives the request event
+        
+        Raises:
+            ValueError: If audio_file is invalid
+        """
+        self.audio_file = audio_file
+        self.definition = definition
+        self.trace = trace
+        self.cache = cache
+        self.transcoder = transcoder if isinstance(audio_file, (str, Path)) else None
+        self.instrumentation = instrumentation
+        self.source = open_audio_source(audio_file)
+        # Audio sent in the body: the source, or its transcoded copy
+        self.upload = self.source
+        trace.audio = self.source.name
+        
+        # Transcoded files are cached under the original audio and the
+        # transcoder's settings, so a hit skips the transcode as well
+        self._cache_definition = definition
+        if self.transcoder is not None:
+            self._cache_definition = {**definition, "transcode": self.transcoder.settings}
+        self._key: Optional[str] = None
+    
+    def lookup(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached response for identical audio and definition.
+        
+        Non-seekable streams are not hashed up front, which would mean
+        spooling them before the upload; they are stored after it instead.
+        
+        Returns:
+            Dict containing the cached response, or None on a miss
+        """
+        if self.cache is None or not self.source.seekable:
+            return None
+        with self.trace.phase("hash"):
+            self._key = self.cache.make_key(self.source.digest(), self._cache_definition)
+        cached = self.cache.get(self._key)
+        if cached is not None:
+            self.trace.cache_hit = True
+        return cached
+    
+    def prepare(self) -> None:
+        """Shrink the upload if the client transcodes."""
+        if self.transcoder is None:
+            return
+        with self.trace.phase("transcode"):
+            transcoded = self.transcoder.transcode(self.audio_file)
+        if transcoded is not None:
+            self.upload = open_audio_source(transcoded.stream)
+            self.trace.bytes_saved = transcoded.bytes_saved
+    
+    def uploaded(self, encoder: MultipartEncoder) -> None:
+        """Keep the digest computed while the audio of a successful attempt was sent."""
+        self.upload.record_digest(encoder.hexdigest("audio"))
+    
+    def store(self, result: Dict[str, Any]) -> None:
+        """Cache a successful response."""
+        if self.cache is None:
+            return
+        if self._key is None:
+            self._key = self.cache.make_key(self.upload.digest(), self._cache_definition)
+        self.cache.put(self._key, result)
+    
+    def fail(self, error: BaseException) -> None:
+        """Record why the request failed."""
+        self.trace.error = f"{type(error).__name__}: {error}"
+    
+    def close(self) -> None:
+        """Close the sources opened for the request and emit its event."""
+        if self.upload is not self.source:
+            self.upload.close()
+        if self.source is not self.audio_file:
+            self.source.close()
+        if self.instrumentation is not None and self.instrumentation.enabled:
+            self.instrumentation.emit(self.trace.to_event())
+
+
+class TranscriptionOutcome(NamedTuple):
+    """Result of one file in a bulk transcription."""
+    
+    audio_file: Union[str, Path]
+    result: Optional[Dict[str, Any]]
+    error: Optional[Exception]
+    elapsed: float
+
+
+class _Attempt:
+    """One copy of a hedged request."""
+    
+    def __init__(self, source: AudioSource, trace: RequestTrace):
+        self.source = source
+        self.trace = trace
+        self.started = time.monotonic()
+        self.cancelled = threading.Event()
+        self.encoder: Optional[MultipartEncoder] = None
+        self.future: Optional[Future] = None
+    
+    def cancel(self) -> None:
+        """Stop retrying and abort the upload if it is still running."""
+        self.cancelled.set()
+        if self.encoder is not None:
+            self.encoder.cancel()
+
+
+def _discard_response(future: Future) -> None:
+    """Close the response of a losing copy once it arrives."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
 
 
 class AzureSpeechClient:
     """Client for Azure Speech-to-Text API."""
     
-    def __init__(self, config: Optional[AzureSpeechConfig] = None):
+    def __init__(
+        self,
+        config: Optional[AzureSpeechConfig] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        pool_size: int = 16,
+        timeout: Optional[float] = None,
+        cache: Optional[TranscriptionCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        transcoder: Optional[Transcoder] = None
+    ):
         """
         Initialize the Azure Speech-to-Text client.
         
+        Requests share one keep-alive session, so only the first request to
+        each host pays for the TCP and TLS handshake. When the config has
+        several endpoints, every attempt goes to the one the client's
+        EndpointPool picks.
+        
         Args:
             config (AzureSpeechConfig, optional): Configuration object.
                 If not provided, a default config will be created.
+            retry_policy (RetryPolicy, optional): Backoff policy for throttled
+                (429) and failed (5xx) requests. Defaults to RetryPolicy().
+            pool_size: Maximum number of kept-alive connections per host;
+                should be at least the number of concurrent workers
+            timeout: Per-request timeout in seconds, or None for no timeout
+            cache (TranscriptionCache, optional): Cache consulted before
+                uploading; responses are stored in it after a successful request
+            instrumentation (Instrumentation, optional): Hook registry that
+                receives a timing event for every request. Pass one to share
+                it with code that times work outside the client.
+            hedging (HedgingPolicy, optional): Send a second copy of
+                transcription requests that run longer than a latency
+                percentile, and use whichever answers first
+            transcoder (Transcoder, optional): Convert lossless audio files to
+                16 kHz mono, and optionally FLAC or Opus, before uploading them
         """
         self.config = config or AzureSpeechConfig()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeout = timeout
+        self.cache = cache
+        self.instrumentation = instrumentation or Instrumentation()
+        self.hedging = hedging
+        self.transcoder = transcoder
+        # Locales identified by probes, per file and candidate set
+        self.locale_probes = LocaleProbeCache()
+        self.endpoints = EndpointPool(self.config.endpoints, instrumentation=self.instrumentation)
+        # Hedged requests run both copies off the caller's thread
+        self._hedge_pool = ThreadPoolExecutor(max_workers=2 * pool_size) if hedging is not None else None
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def __enter__(self) -> "AzureSpeechClient":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Close the pooled connections."""
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+        self.session.close()
+    
+    def add_hook(self, hook: Hook) -> None:
+        """
+        Register a callable that receives a timing event for every request.
+        
+        See instrumentation.RequestTrace for the phases reported.
+        
+        Args:
+            hook: Callable taking the event dict, such as a JsonLinesExporter
+                or PrometheusExporter
+        """
+        self.instrumentation.add_hook(hook)
+    
+    def _send(
+        self,
+        send: Callable[[], requests.Response],
+        trace: Optional[RequestTrace] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> requests.Response:
+        """
+        Send a request, retrying throttled and transient failures.
+        
+        Args:
+            send: Callable that performs one attempt; called again for every retry
+            trace: Trace that records attempts, response status and backoff time
+            cancelled: Event that stops further attempts once set
+        
+        Returns:
+            The successful response
+        
+        Raises:
+            requests.RequestException: If the request fails and is not retried
+            UploadCancelled: If the request was cancelled
+        """
+        attempt = 0
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                raise UploadCancelled("Request cancelled")
+            if trace is not None:
+                trace.attempts += 1
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout):
+                if cancelled is not None and cancelled.is_set():
+                    raise UploadCancelled("Request cancelled")
+                delay = self.retry_policy.retry_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                if trace is not None:
+                    trace.record_response(response.status_code, response.headers)
+                    if response.status_code in THROTTLE_STATUS_CODES:
+                        trace.record_throttle(parse_retry_after(response.headers))
+                if response.ok:
+                    return response
+                delay = self.retry_policy.retry_delay(attempt, response.status_code, response.headers)
+                if delay is None:
+                    response.raise_for_status()
+                response.close()
+            
+            # The failed endpoint is ejected; another one can take the retry straight away
+            if len(self.endpoints.states) > 1 and self.endpoints.available():
+                delay = 0.0
+            if cancelled is not None:
+                cancelled.wait(delay)
+            else:
+                time.sleep(delay)
+            if trace is not None:
+                trace.add("retry_wait", delay)
+            attempt += 1
+    
+    def _on_endpoint(
+        self,
+        call: Callable[[SpeechEndpoint], requests.Response],
+        size: Optional[int] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> requests.Response:
+        """
+        Make one attempt on the endpoint the pool picks, and record how it went.
+        
+        Args:
+            call: Callable that sends the request to a given endpoint
+            size: Upload size in bytes, if known
+            cancelled: Event set when the attempt was abandoned on purpose,
+                which is not held against the endpoint
+        
+        Returns:
+            The endpoint's response
+        """
+        state = self.endpoints.acquire()
+        started = time.perf_counter()
+        try:
+            response = call(state.endpoint)
+        except (requests.ConnectionError, requests.Timeout):
+            if cancelled is not None and cancelled.is_set():
+                self.endpoints.cancel(state)
+            else:
+                self.endpoints.release(state, None)
+            raise
+        except BaseException:
+            self.endpoints.cancel(state)
+            raise
+        retry_after = None if response.ok else parse_retry_after(response.headers)
+        self.endpoints.release(state, response.status_code, time.perf_counter() - started, size, retry_after)
+        return response
     
     def transcribe(
         self, 
-        audio_file: Union[str, Path, BinaryIO],
+        audio_file: Union[str, Path, BinaryIO, AudioSource],
         locales: List[str] = ["en-US"],
         **kwargs
     ) -> Dict[str, Any]:
         """
         Transcribe audio to text.
         
+        The request body is streamed in fixed-size blocks, so memory use does
+        not grow with the size of the audio, and pipes or stdin can be passed
+        directly. If the client has a cache, the audio is hashed first and a
+        cached response for the same audio and definition is returned without
+        uploading. Throttled and transient failures are retried according to
+        the client's retry policy. Every retry uploads the audio again from its
+        first byte: paths are re-opened, seekable streams are rewound, and
+        non-seekable streams (pipes, stdin) are replayed from a spooled copy.
+        
         Args:
-            audio_file: Path to audio file or file-like object
+            audio_file: Path to audio file, file-like object or AudioSource
             locales: List of language locales for transcription
             **kwargs: Additional parameters to pass to the API
         
@@ -45,45 +438,631 @@ class AzureSpeechClient:
             ValueError: If audio_file is invalid
             requests.RequestException: If the API request fails
         """
-        # Prepare URL and headers
-        url = self.config.transcribe_url
-        headers = {
-            "Ocp-Apim-Subscription-Key": self.config.api_key
-        }
-        
-        # Prepare definition payload
-        definition = {
-            "locales": locales,
-            **kwargs
-        }
-        
-        # Prepare file for upload
-        if isinstance(audio_file, (str, Path)):
-            audio_path = Path(audio_file)
-            if not audio_path.exists():
-                raise ValueError(f"Audio file not found: {audio_path}")
-            audio_data = open(audio_path, "rb")
-        else:
-            # Assume file-like object
-            audio_data = audio_file
+        return self._transcribe(audio_file, locales, RequestTrace("transcribe"), kwargs)
+    
+    def _transcribe(
+        self,
+        audio_file: Union[str, Path, BinaryIO, AudioSource],
+        locales: List[str],
+        trace: RequestTrace,
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Transcribe audio, recording the request in the given trace."""
+        request = TranscriptionRequest(
+            audio_file,
+            build_definition(locales, **kwargs),
+            trace,
+            self.cache,
+            self.transcoder,
+            self.instrumentation
+        )
+        
+        def send(
+            upload_source: Optional[AudioSource] = None,
+            attempt_trace: RequestTrace = trace,
+            attempt: Optional[_Attempt] = None
+        ) -> requests.Response:
+            # Stream multipart/form-data from the start of the audio
+            with attempt_trace.phase("encode"):
+                encoder = encode_request(upload_source or request.upload, request.definition)
+            if attempt is not None:
+                attempt.encoder = encoder
+                if attempt.cancelled.is_set():
+                    encoder.cancel()
+            
+            def post(endpoint: SpeechEndpoint) -> requests.Response:
+                attempt_trace.endpoint = endpoint.name
+                return self.session.post(
+                    endpoint.transcribe_url,
+                    headers={**build_headers(endpoint), "Content-Type": encoder.content_type},
+                    data=encoder,
+                    timeout=self.timeout
+                )
+            
+            sent_at = time.perf_counter()
+            try:
+                response = self._on_endpoint(post, encoder.len, attempt.cancelled if attempt is not None else None)
+            finally:
+                attempt_trace.bytes_sent += encoder.bytes_read
+            
+            # The body is read before post() returns; elapsed covers the
+            # time from sending the request until the headers arrived
+            headers_at = sent_at + response.elapsed.total_seconds()
+            upload_done_at = encoder.completed_at or sent_at
+            attempt_trace.add("upload", upload_done_at - sent_at)
+            attempt_trace.add("server", headers_at - upload_done_at)
+            attempt_trace.add("download", time.perf_counter() - headers_at)
+            
+            if response.ok:
+                request.uploaded(encoder)
+            return response
         
         try:
-            # Prepare multipart/form-data
-            files = {
-                'audio': audio_data,
-                'definition': (None, json.dumps(definition), 'application/json')
-            }
+            # Identical audio with an identical definition is served from the cache
+            cached = request.lookup()
+            if cached is not None:
+                return cached
+            request.prepare()
             
-            # Make the request
-            response = requests.post(url, headers=headers, files=files)
-            response.raise_for_status()
+            if self.hedging is not None:
+                response = self._send_hedged(send, request.upload, trace)
+            else:
+                response = self._send(send, trace)
+            with trace.phase("decode"):
+                result = response.json()
             
-            return response.json()
+            request.store(result)
+            return result
+        
+        except Exception as e:
+            request.fail(e)
+            raise
         
         finally:
-            # Close file if we opened it
-            if isinstance(audio_file, (str, Path)) and audio_data:
-                audio_data.close()
+            request.close()
+    
+    def _send_hedged(
+        self,
+        send: Callable[..., requests.Response],
+        source: AudioSource,
+        trace: RequestTrace
+    ) -> requests.Response:
+        """
+        Send a transcription request, with a second copy if the first is slow.
+        
+        Both copies upload from their own fork of the source, so the
+        caller's stream is never read from another thread. The first
+        successful response is returned; the other copy's upload is
+        aborted, it stops retrying, and its response is discarded if the
+        service still sends one.
+        
+        Args:
+            send: Callable performing one attempt from a given source,
+                into a given trace
+            source: Audio being transcribed
+            trace: Trace that receives the attempts of both copies
+        
+        Returns:
+            The first successful response
+        
+        Raises:
+            requests.RequestException: If every copy fails
+        """
+        size = source.size()
+        delay = self.hedging.begin(size)
+        primary_source = source.fork() if delay is not None else None
+        if primary_source is None:
+            # Too few latencies to judge yet, or the audio cannot be read twice
+            started = time.monotonic()
+            response = self._send(send, trace)
+            self.hedging.record(time.monotonic() - started, size)
+            return response
+        
+        def run(attempt: _Attempt) -> requests.Response:
+            try:
+                return self._send(
+                    lambda: send(attempt.source, attempt.trace, attempt),
+                    attempt.trace,
+                    attempt.cancelled
+                )
+            finally:
+                attempt.source.close()
+        
+        attempts: List[_Attempt] = []
+        
+        def start(attempt_source: AudioSource) -> None:
+            attempt_trace = RequestTrace(trace.operation, trace.audio)
+            attempt_trace.on_throttle = trace.on_throttle
+            attempt = _Attempt(attempt_source, attempt_trace)
+            attempt.future = self._hedge_pool.submit(run, attempt)
+            attempts.append(attempt)
+        
+        start(primary_source)
+        done, _ = wait([attempts[0].future], timeout=delay)
+        if not done and self.hedging.allow_hedge():
+            hedge_source = source.fork()
+            if hedge_source is not None:
+                trace.hedged = True
+                start(hedge_source)
+        
+        # The first copy to succeed wins; a failure waits for the other copy
+        pending = {attempt.future: attempt for attempt in attempts}
+        winner = None
+        error = None
+        while pending and winner is None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = pending.pop(future)
+                if future.exception() is not None:
+                    error = future.exception()
+                elif winner is None:
+                    winner = attempt
+        
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+                attempt.future.add_done_callback(_discard_response)
+                trace.merge(attempt.trace, won=False)
+        if winner is None:
+            raise error
+        
+        trace.merge(winner.trace, won=True)
+        trace.hedge_won = winner is not attempts[0]
+        # What the caller waited: a slow primary still counts when the hedge beats it
+        self.hedging.record(time.monotonic() - attempts[0].started, size, hedge_won=trace.hedge_won)
+        return winner.future.result()
+    
+    def transcribe_chunked(
+        self,
+        audio_file: Union[str, Path],
+        locales: List[str] = ["en-US"],
+        chunk_seconds: float = 300.0,
+        max_workers: int = 4,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Transcribe a long recording as concurrently uploaded chunks.
+        
+        The audio is split at silence boundaries near every `chunk_seconds`,
+        each chunk is transcribed on a bounded worker pool, and the results
+        are stitched back onto the original timeline. Because every request
+        carries only one chunk, the per-request size and duration limits
+        apply to chunks rather than to the whole file.
+        
+        Args:
+            audio_file: Path to audio file
+            locales: List of language locales for transcription
+            chunk_seconds: Nominal chunk length in seconds
+            max_workers: Maximum number of chunks in flight at once
+            **kwargs: Additional parameters to pass to the API
+        
+        Returns:
+            Dict containing the merged transcription response
+        
+        Raises:
+            ValueError: If audio_file is invalid
+            RuntimeError: If the audio cannot be decoded
+            requests.RequestException: If any chunk request fails
+        """
+        audio_path = Path(audio_file)
+        if not audio_path.exists():
+            raise ValueError(f"Audio file not found: {audio_path}")
+        
+        chunks = split_audio(audio_path, chunk_seconds)
+        
+        def transcribe_chunk(chunk: AudioChunk) -> Dict[str, Any]:
+            # Encode inside the worker so only in-flight chunks are held as WAV bytes
+            with chunk.to_file() as chunk_file:
+                return self.transcribe(chunk_file, locales, **kwargs)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(transcribe_chunk, chunks))
+        
+        total_ms = int(round(sum(chunk.audio.duration for chunk in chunks) * 1000))
+        return merge_transcription_results(results, [chunk.offset_ms for chunk in chunks], total_ms)
+    
+    def transcribe_speech_only(
+        self,
+        audio_file: Union[str, Path],
+        locales: List[str] = ["en-US"],
+        min_silence_ms: int = 1000,
+        padding_ms: int = 250,
+        threshold_db: Optional[float] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Transcribe audio after removing long silences.
+        
+        Non-speech spans longer than `min_silence_ms` are cut out before
+        upload, and phrase and word offsets and durations in the response
+        are translated back to the original timeline.
+        
+        Args:
+            audio_file: Path to audio file
+            locales: List of language locales for transcription
+            min_silence_ms: Shortest non-speech run that is removed
+            padding_ms: Audio kept either side of each speech span
+            threshold_db: Speech threshold in dBFS; estimated from the
+                noise floor if not given
+            **kwargs: Additional parameters to pass to the API
+        
+        Returns:
+            Dict containing the transcription response on the original timeline
+        
+        Raises:
+            ValueError: If audio_file is invalid
+            RuntimeError: If the audio cannot be decoded
+            requests.RequestException: If the API request fails
+        """
+        audio_path = Path(audio_file)
+        if not audio_path.exists():
+            raise ValueError(f"Audio file not found: {audio_path}")
+        
+        audio = load_pcm(audio_path)
+        speech, offset_map = strip_silence(
+            audio,
+            min_silence_ms=min_silence_ms,
+            padding_ms=padding_ms,
+            threshold_db=threshold_db
+        )
+        
+        with io.BytesIO(speech.to_wav_bytes()) as speech_file:
+            speech_file.name = f"{audio_path.stem}.wav"
+            result = self.transcribe(speech_file, locales, **kwargs)
+        
+        return offset_map.remap_result(result, int(round(audio.duration * 1000)))
+    
+    def identify_locale(
+        self,
+        audio_file: Union[str, Path],
+        candidate_locales: List[str],
+        probe_seconds: float = DEFAULT_PROBE_SECONDS
+    ) -> Optional[LocaleGuess]:
+        """
+        Identify the spoken locale from the first stretch of speech.
+        
+        Up to `probe_seconds` of speech is cut from the start of the file,
+        with the silence between phrases removed, and transcribed with all
+        the candidate locales. The service reports a locale and confidence
+        for every phrase, and the locale with the most confident speech
+        wins. The outcome is cached per file and candidate set in
+        `locale_probes`, and the probe request goes through the result
+        cache like any other.
+        
+        Args:
+            audio_file: Path to audio file
+            candidate_locales: Locales the recording may be in
+            probe_seconds: Speech to send in the probe
+        
+        Returns:
+            LocaleGuess, or None if the probe found no speech
+        
+        Raises:
+            ValueError: If audio_file is invalid
+            RuntimeError: If the audio cannot be decoded
+            requests.RequestException: If the API request fails
+        """
+        audio_path = Path(audio_file)
+        if not audio_path.exists():
+            raise ValueError(f"Audio file not found: {audio_path}")
+        
+        key = self.locale_probes.key(audio_path, candidate_locales)
+        probed, guess = self.locale_probes.get(key)
+        if probed:
+            return guess
+        
+        # Decode only enough of the start of the file to find the probe's speech
+        audio = load_pcm(audio_path, max_seconds=probe_seconds * PROBE_SEARCH_FACTOR)
+        probe = build_probe(audio, probe_seconds)
+        if probe is not None:
+            with io.BytesIO(probe.to_wav_bytes()) as probe_file:
+                probe_file.name = f"{audio_path.stem}-probe.wav"
+                result = self._transcribe(probe_file, list(candidate_locales), RequestTrace("identify_locale"), {})
+            guess = score_locales(result, candidate_locales)
+        
+        self.locale_probes.put(key, guess)
+        return guess
+    
+    def choose_locales(
+        self,
+        audio_file: Union[str, Path],
+        candidate_locales: List[str],
+        probe_seconds: float = DEFAULT_PROBE_SECONDS,
+        min_share: float = 0.5
+    ) -> List[str]:
+        """
+        Get the locales to transcribe a file with, probing it if that pays off.
+        
+        See transcribe_identified() for when all the candidates are kept.
+        
+        Args:
+            audio_file: Path to audio file
+            candidate_locales: Locales the recording may be in
+            probe_seconds: Speech to send in the probe
+            min_share: Smallest fraction of the probe's speech the winning
+                locale must hold to be used on its own
+        
+        Returns:
+            List with the identified locale, or all the candidates
+        
+        Raises:
+            ValueError: If audio_file is invalid
+        """
+        if len(candidate_locales) < 2:
+            return list(candidate_locales)
+        try:
+            duration = probe_audio(audio_file).duration
+        except Exception:
+            duration = None
+        # A probe of a short file would be the whole file
+        if duration is not None and duration <= probe_seconds:
+            return list(candidate_locales)
+        
+        try:
+            guess = self.identify_locale(audio_file, candidate_locales, probe_seconds)
+        except RuntimeError:
+            # Audio the client cannot decode is left to the service to identify
+            guess = None
+        except requests.RequestException as e:
+            # A throttled or failed probe is not cached, so the next call probes again
+            logger.warning("Locale probe of %s failed, sending all candidates: %s", audio_file, e)
+            guess = None
+        if guess is None or guess.share < min_share:
+            return list(candidate_locales)
+        return [guess.locale]
+    
+    def transcribe_identified(
+        self,
+        audio_file: Union[str, Path],
+        candidate_locales: List[str],
+        probe_seconds: float = DEFAULT_PROBE_SECONDS,
+        min_share: float = 0.5,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Transcribe audio in an unknown locale, identified first from a short probe.
+        
+        The file is transcribed with the locale identify_locale() picks, so
+        a long recording is uploaded once, with one locale. All the
+        candidates are sent instead when the file is no longer than the
+        probe, when the probe finds no speech, cannot decode the file or
+        its request fails, and when the winning locale holds less than
+        `min_share` of the probe's speech, as in a recording that switches
+        language.
+        
+        Args:
+            audio_file: Path to audio file
+            candidate_locales: Locales the recording may be in
+            probe_seconds: Speech to send in the probe
+            min_share: Smallest fraction of the probe's speech the winning
+                locale must hold to be used on its own
+            **kwargs: Additional parameters to pass to the API
+        
+        Returns:
+            Dict containing the transcription response
+        
+        Raises:
+            ValueError: If audio_file is invalid
+            requests.RequestException: If the API request fails
+        """
+        locales = self.choose_locales(audio_file, candidate_locales, probe_seconds, min_share)
+        return self.transcribe(audio_file, locales, **kwargs)
+    
+    def transcribe_many(
+        self,
+        audio_files: Iterable[Union[str, Path]],
+        locales: List[str] = ["en-US"],
+        max_workers: int = 4,
+        limiter: Optional[AdaptiveLimiter] = None,
+        probe_seconds: Optional[float] = None,
+        pack_max_clip_seconds: Optional[float] = None,
+        **kwargs
+    ) -> Iterator[TranscriptionOutcome]:
+        """
+        Transcribe many audio files concurrently.
+        
+        Outcomes are yielded as soon as each file finishes, so callers can
+        persist results incrementally. A failing file does not stop the
+        others; its exception is returned in the outcome instead.
+        
+        With a limiter, the number of requests in flight adapts to the
+        service instead of being fixed. It rises while responses are fast
+        and falls on throttling, Retry-After or rising latency, up to the
+        limiter's max_limit.
+        
+        With `pack_max_clip_seconds`, the files packable() picks are sent
+        several to a request as in transcribe_packed(). Packs and the other
+        files share one pool and the limiter, so neither waits for the other.
+        
+        Args:
+            audio_files: Paths to the audio files
+            locales: List of language locales for transcription
+            max_workers: Maximum number of requests in flight at once;
+                ignored when a limiter is given
+            limiter (AdaptiveLimiter, optional): Adaptive concurrency limit
+            probe_seconds: With several locales, identify each file's locale
+                from this much speech first, as in transcribe_identified()
+            pack_max_clip_seconds: Pack files up to this long, or None to
+                send every file on its own
+            **kwargs: Additional parameters to pass to the API
+        
+        Yields:
+            TranscriptionOutcome for each file, in completion order
+        """
+        def transcribe_file(audio_file: Union[str, Path], trace: RequestTrace) -> List[TranscriptionOutcome]:
+            start_time = time.monotonic()
+            result = error = None
+            try:
+                file_locales = locales
+                if probe_seconds is not None:
+                    file_locales = self.choose_locales(audio_file, locales, probe_seconds)
+                result = self._transcribe(audio_file, file_locales, trace, kwargs)
+            except Exception as e:
+                error = e
+            return [TranscriptionOutcome(audio_file, result, error, time.monotonic() - start_time)]
+        
+        def limited(
+            work: Callable[[RequestTrace], List[TranscriptionOutcome]]
+        ) -> List[TranscriptionOutcome]:
+            trace = RequestTrace("transcribe")
+            started = None
+            if limiter is not None:
+                started = limiter.acquire()
+                trace.on_throttle = lambda retry_after: limiter.on_throttle(started, retry_after)
+            
+            outcomes = work(trace)
+            
+            if limiter is not None:
+                audio_seconds = None
+                durations = [
+                    outcome.result["durationMilliseconds"] for outcome in outcomes
+                    if outcome.result is not None and "durationMilliseconds" in outcome.result
+                ]
+                if durations and not trace.cache_hit:
+                    audio_seconds = sum(durations) / 1000.0
+                limiter.release(started, audio_seconds, throttled=trace.throttled > 0)
+            return outcomes
+        
+        audio_files = list(audio_files)
+        packs: List[List[Union[str, Path]]] = []
+        if pack_max_clip_seconds is not None:
+            clips = self.packable(audio_files, pack_max_clip_seconds, probe_seconds)
+            packed = set(clips)
+            audio_files = [audio_file for audio_file in audio_files if audio_file not in packed]
+            packs = plan_packs(clips)
+        
+        if limiter is not None:
+            if limiter.instrumentation is None:
+                limiter.instrumentation = self.instrumentation
+            max_workers = limiter.max_limit
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(limited, lambda trace, audio_file=audio_file: transcribe_file(audio_file, trace))
+                for audio_file in audio_files
+            ]
+            futures += [
+                pool.submit(limited, lambda trace, pack=pack: self._transcribe_pack(pack, locales, trace, DEFAULT_GAP_MS, kwargs))
+                for pack in packs
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+    
+    def packable(
+        self,
+        audio_files: Iterable[Union[str, Path]],
+        max_clip_seconds: float,
+        probe_seconds: Optional[float] = None
+    ) -> List[Union[str, Path]]:
+        """
+        Get the files transcribe_many() packs several to a request.
+        
+        When locales are probed, only files no longer than the probe are
+        packed: choose_locales() sends those with every candidate anyway,
+        so sharing a request with other files changes nothing. Longer
+        files are probed and sent on their own.
+        
+        Args:
+            audio_files: Paths to the audio files
+            max_clip_seconds: Longest file to pack
+            probe_seconds: Speech sent in locale probes, if files are probed
+        
+        Returns:
+            Files with a header duration above 0 and up to the limit, in order
+        """
+        if probe_seconds is not None:
+            max_clip_seconds = min(max_clip_seconds, probe_seconds)
+        clips = []
+        for audio_file in audio_files:
+            try:
+                seconds = probe_audio(audio_file).duration or 0.0
+            except Exception:
+                seconds = 0.0
+            if 0 < seconds <= max_clip_seconds:
+                clips.append(audio_file)
+        return clips
+    
+    def transcribe_packed(
+        self,
+        audio_files: Iterable[Union[str, Path]],
+        locales: List[str] = ["en-US"],
+        max_pack_seconds: float = 300.0,
+        max_clips: int = 50,
+        gap_ms: int = DEFAULT_GAP_MS,
+        max_workers: int = 4,
+        **kwargs
+    ) -> Iterator[TranscriptionOutcome]:
+        """
+        Transcribe many short clips, several per request.
+        
+        Clips are decoded, mixed down to 16 kHz mono and packed back to back
+        with `gap_ms` of silence between them, up to `max_clips` clips or
+        `max_pack_seconds` of audio per request. Each response is split
+        into one result per clip, with offsets on the clip's own timeline.
+        A clip that cannot be decoded fails on its own; a failed request
+        fails every clip in its pack.
+        
+        Args:
+            audio_files: Paths to the clips
+            locales: List of language locales for transcription
+            max_pack_seconds: Longest packed audio per request, gaps included
+            max_clips: Most clips per request
+            gap_ms: Silence between consecutive clips in milliseconds
+            max_workers: Maximum number of packs in flight at once
+            **kwargs: Additional parameters to pass to the API
+        
+        Yields:
+            TranscriptionOutcome for each clip, pack by pack in completion
+            order. The elapsed time of a pack is shared out between its
+            clips by duration.
+        """
+        packs = plan_packs(list(audio_files), max_pack_seconds, max_clips, gap_ms)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(self._transcribe_pack, pack, locales, RequestTrace("transcribe"), gap_ms, kwargs)
+                for pack in packs
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+    
+    def _transcribe_pack(
+        self,
+        pack: List[Union[str, Path]],
+        locales: List[str],
+        trace: RequestTrace,
+        gap_ms: int,
+        kwargs: Dict[str, Any]
+    ) -> List[TranscriptionOutcome]:
+        """Transcribe one pack of clips, recording its request in the given trace."""
+        start_time = time.monotonic()
+        outcomes = []
+        clips = []
+        for audio_file in pack:
+            try:
+                clips.append((audio_file, load_pcm(audio_file)))
+            except Exception as e:
+                outcomes.append(TranscriptionOutcome(audio_file, None, e, time.monotonic() - start_time))
+        if not clips:
+            return outcomes
+        
+        audio, table = pack_clips(clips, gap_ms)
+        try:
+            with io.BytesIO(audio.to_wav_bytes()) as pack_file:
+                pack_file.name = f"pack-{Path(pack[0]).stem}.wav"
+                results = table.split_result(self._transcribe(pack_file, locales, trace, kwargs))
+        except Exception as e:
+            results = [None] * len(table.clips)
+            error = e
+        else:
+            error = None
+        
+        elapsed = time.monotonic() - start_time
+        total_ms = sum(clip.duration_ms for clip in table.clips) or 1
+        for clip, result in zip(table.clips, results):
+            outcomes.append(TranscriptionOutcome(
+                clip.audio_file, result, error, elapsed * clip.duration_ms / total_ms
+            ))
+        return outcomes
     
     def get_supported_locales(self) -> Dict[str, Any]:
         """
@@ -92,12 +1071,19 @@ class AzureSpeechClient:
         Returns:
             Dict containing the supported locales information
         """
-        url = f"{self.config.base_url}/locales?api-version={self.config.api_version}"
-        headers = {
-            "Ocp-Apim-Subscription-Key": self.config.api_key
-        }
+        trace = RequestTrace("locales")
         
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        def get(endpoint: SpeechEndpoint) -> requests.Response:
+            trace.endpoint = endpoint.name
+            return self.session.get(endpoint.locales_url, headers=build_headers(endpoint), timeout=self.timeout)
         
-        return response.json()
+        try:
+            response = self._send(lambda: self._on_endpoint(get), trace)
+            with trace.phase("decode"):
+                return response.json()
+        except Exception as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if self.instrumentation.enabled:
+                self.instrumentation.emit(trace.to_event())
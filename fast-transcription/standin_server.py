@@ -0,0 +1,311 @@
+"""
+Local stand-in for the Azure Speech-to-Text fast transcription endpoint.
+
+Serves POST /speechtotext/transcriptions:transcribe and GET
+/speechtotext/locales with synthetic responses and configurable latency,
+upload bandwidth and error rates, so clients can be benchmarked and tested
+without spending real quota.
+"""
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from multipart import ChunkedBodyReader, LimitedBodyReader, boundary_from_content_type, read_multipart
+from utils import read_wav_header
+
+
+# Locales reported by the stand-in's locales endpoint
+STANDIN_LOCALES = ["de-DE", "en-GB", "en-US", "es-ES", "fr-FR", "it-IT", "ja-JP", "lt-LT", "pt-BR", "zh-CN"]
+
+# Bytes per second assumed for audio whose duration cannot be read (128 kbps)
+FALLBACK_BYTES_PER_SECOND = 16000
+
+WORDS = ["the", "quick", "brown", "fox", "jumps", "over", "a", "lazy", "dog"]
+
+
+class _AudioSink:
+    """Write target for the uploaded audio that keeps only its size and first bytes."""
+
+    HEAD_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.size = 0
+        self.head = bytearray()
+
+    def write(self, data: bytes) -> int:
+        if len(self.head) < self.HEAD_SIZE:
+            self.head += data[:self.HEAD_SIZE - len(self.head)]
+        self.size += len(data)
+        return len(data)
+
+
+def synthetic_result(duration_ms: int, locale: str, phrase_ms: int = 5000) -> Dict[str, Any]:
+    """
+    Build a response shaped like the fast transcription API's.
+
+    Args:
+        duration_ms: Duration of the audio in milliseconds
+        locale: Locale reported on every phrase
+        phrase_ms: Length of each synthetic phrase
+
+    Returns:
+        Dict containing the synthetic transcription response
+    """
+    phrases = []
+    for offset in range(0, max(duration_ms, 1), phrase_ms):
+        length = min(phrase_ms, duration_ms - offset)
+        word_ms = max(1, length // len(WORDS))
+        words = [
+            {"text": word, "offsetMilliseconds": offset + index * word_ms, "durationMilliseconds": word_ms}
+            for index, word in enumerate(WORDS)
+        ]
+        phrases.append({
+            "offsetMilliseconds": offset,
+            "durationMilliseconds": length,
+            "text": " ".join(WORDS),
+            "words": words,
+            "locale": locale,
+            "confidence": 0.9,
+        })
+
+    return {
+        "durationMilliseconds": duration_ms,
+        "combinedPhrases": [{"text": " ".join(phrase["text"] for phrase in phrases)}],
+        "phrases": phrases,
+    }
+
+
+class StandInSpeechServer:
+    """
+    Threaded HTTP server imitating the fast transcription API.
+
+    Use as a context manager to run it on a background thread:
+
+        with StandInSpeechServer(latency=0.2) as server:
+            config = AzureSpeechConfig(api_key="local", endpoint=server.url)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        seconds_per_audio_second: float = 0.0,
+        upload_mbps: Optional[float] = None,
+        error_rate: float = 0.0,
+        error_status: int = 429,
+        retry_after: Optional[float] = 1.0,
+        straggler_rate: float = 0.0,
+        straggler_latency: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+            latency: Fixed processing time added to every transcription, in seconds
+            seconds_per_audio_second: Processing time added per second of audio
+            upload_mbps: Upload bandwidth limit in megabits per second, or None
+            error_rate: Fraction of transcriptions answered with error_status
+            error_status: Status code of injected errors
+            retry_after: Retry-After seconds sent with injected errors, or None
+            straggler_rate: Fraction of transcriptions answered slowly, as if
+                by an overloaded backend instance
+            straggler_latency: Extra processing time of those transcriptions, in seconds
+            seed: Seed for the error injection's random generator
+        """
+        self.latency = latency
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.upload_bytes_per_second = upload_mbps * 125000 if upload_mbps else None
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.straggler_rate = straggler_rate
+        self.straggler_latency = straggler_latency
+        self.random = random.Random(seed)
+
+        self.requests = 0
+        self.errors = 0
+        self.stragglers = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as the config endpoint."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInSpeechServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StandInSpeechServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def _straggle(self) -> float:
+        with self._lock:
+            if self.random.random() < self.straggler_rate:
+                self.stragglers += 1
+                return self.straggler_latency
+            return 0.0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if not self.path.startswith("/speechtotext/locales"):
+                    self._send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+                    return
+                self._send_json(200, {"Transcribe": STANDIN_LOCALES})
+
+            def do_POST(self):
+                if not self.path.startswith("/speechtotext/transcriptions:transcribe"):
+                    self._send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+                    return
+
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = ChunkedBodyReader(self.rfile)
+                else:
+                    body = LimitedBodyReader(
+                        self.rfile,
+                        int(self.headers.get("Content-Length", 0)),
+                        server.upload_bytes_per_second
+                    )
+
+                try:
+                    boundary = boundary_from_content_type(self.headers.get("Content-Type", ""))
+                    sink = _AudioSink()
+                    parts = read_multipart(body, boundary, open_file=lambda name, filename: sink)
+                    definition = json.loads(parts["definition"].data)
+                    if "audio" not in parts:
+                        raise ValueError("Missing audio part")
+                except (ValueError, KeyError) as e:
+                    # The rest of the body may still be unread
+                    self.close_connection = True
+                    try:
+                        self._send_json(400, {"error": {"code": "InvalidRequest", "message": str(e)}})
+                    except OSError:
+                        # The client aborted the upload and is gone
+                        pass
+                    return
+
+                with server._lock:
+                    server.bytes_received += sink.size
+
+                if server._should_fail():
+                    headers = {}
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = f"{server.retry_after:g}"
+                    self._send_json(server.error_status, {"error": {"code": "Throttled"}}, headers)
+                    return
+
+                duration_ms = _duration_ms(sink)
+                processing = server.latency + server.seconds_per_audio_second * duration_ms / 1000.0
+                processing += server._straggle()
+                if processing > 0:
+                    time.sleep(processing)
+
+                locales: List[str] = definition.get("locales") or ["en-US"]
+                result = synthetic_result(duration_ms, locales[0])
+                self._send_json(200, result, {"x-standin-processing-ms": str(int(processing * 1000))})
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def _duration_ms(sink: _AudioSink) -> int:
+    """Get the duration of uploaded audio from its WAV header or its size."""
+    try:
+        header = read_wav_header(io.BytesIO(bytes(sink.head)))
+        data_size = sink.size - header["data_offset"]
+        return int(data_size / header["block_align"] / header["sample_rate"] * 1000)
+    except Exception:
+        return int(sink.size / FALLBACK_BYTES_PER_SECOND * 1000)
+
+
+def main():
+    """Run the stand-in server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the Azure fast transcription endpoint")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", "-p", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed processing time in seconds")
+    parser.add_argument("--seconds-per-audio-second", type=float, default=0.0,
+                        help="Processing time added per second of audio")
+    parser.add_argument("--upload-mbps", type=float, help="Upload bandwidth limit in megabits per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=429, help="Status code of injected errors (default: 429)")
+    parser.add_argument("--straggler-rate", type=float, default=0.0, help="Fraction of requests answered slowly")
+    parser.add_argument("--straggler-latency", type=float, default=0.0,
+                        help="Extra processing time of slow requests in seconds")
+    args = parser.parse_args()
+
+    server = StandInSpeechServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        seconds_per_audio_second=args.seconds_per_audio_second,
+        upload_mbps=args.upload_mbps,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        straggler_rate=args.straggler_rate,
+        straggler_latency=args.straggler_latency
+    )
+    print(f"Stand-in speech server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Shrinking audio to 16 kHz mono before upload.
+
+Speech recognition only uses 16 kHz mono, so a 48 kHz stereo WAV uploads
+six times the bytes the service needs. The transcoder mixes lossless
+sources down and resamples them locally, and can re-encode the result as
+FLAC or Opus when ffmpeg is installed. Lossy sources (MP3, AAC, Opus, ...)
+are already compact and are uploaded untouched, since re-encoding them
+would lose quality for little gain.
+"""
+
+import io
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Union
+
+import numpy as np
+
+from audio import DEFAULT_SAMPLE_RATE, PCMAudio, load_pcm
+
+
+# Codecs the transcoder can produce: 16-bit PCM WAV needs nothing installed,
+# FLAC and Opus need ffmpeg
+TRANSCODE_CODECS = ("wav", "flac", "opus")
+
+# Sources worth transcoding
+LOSSLESS_EXTENSIONS = (".wav", ".flac")
+
+# ffmpeg output options and file extension for each encoded codec
+ENCODER_ARGS = {
+    "flac": (["-c:a", "flac", "-f", "flac"], ".flac"),
+    "opus": (["-c:a", "libopus", "-application", "voip", "-f", "ogg"], ".ogg"),
+}
+
+
+class TranscodedAudio(NamedTuple):
+    """Compact copy of an audio file, ready to upload."""
+    stream: io.BytesIO
+    codec: str
+    original_size: int
+    size: int
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes the copy saves over the original file."""
+        return self.original_size - self.size
+
+
+class Transcoder:
+    """
+    Converts lossless audio files to a compact upload before they are sent.
+
+    The copy is held in memory; at 16 kHz mono an hour of WAV is about
+    115 MB, and FLAC or Opus a fraction of that. A file is uploaded as is
+    when it is lossy, cannot be decoded, or would not get smaller. Counters
+    are kept across all files for reporting.
+    """
+
+    def __init__(self, codec: str = "wav", sample_rate: int = DEFAULT_SAMPLE_RATE, opus_bitrate: str = "32k"):
+        """
+        Initialize the transcoder.
+
+        Args:
+            codec: "wav", "flac" or "opus". FLAC and Opus fall back to WAV
+                when ffmpeg is not installed.
+            sample_rate: Sample rate of the upload in Hz
+            opus_bitrate: Target bitrate for Opus, as an ffmpeg bitrate string
+        """
+        if codec not in TRANSCODE_CODECS:
+            raise ValueError(f"Unknown codec: {codec} (expected one of {', '.join(TRANSCODE_CODECS)})")
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.opus_bitrate = opus_bitrate
+
+        self.files = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Options that decide the upload, for keying cached results of transcoded files."""
+        return {"codec": self.codec, "sample_rate": self.sample_rate, "opus_bitrate": self.opus_bitrate}
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes saved across all transcoded files."""
+        return self.bytes_in - self.bytes_out
+
+    def transcode(self, audio_file: Union[str, Path]) -> Optional[TranscodedAudio]:
+        """
+        Get a compact copy of an audio file.
+
+        Args:
+            audio_file: Path to the audio file
+
+        Returns:
+            TranscodedAudio, or None if the file should be uploaded as is
+        """
+        path = Path(audio_file)
+        if path.suffix.lower() not in LOSSLESS_EXTENSIONS:
+            return self._skip()
+
+        original_size = path.stat().st_size
+        try:
+            # FLAC needs ffmpeg to decode; without it the file goes as is
+            audio = load_pcm(path)
+        except Exception:
+            return self._skip()
+        pcm = audio.resample(self.sample_rate, mono=True)
+
+        codec, data = "wav", None
+        if self.codec in ENCODER_ARGS and shutil.which("ffmpeg") is not None:
+            try:
+                data = self._encode(pcm, self.codec)
+                codec = self.codec
+            except RuntimeError:
+                data = None
+        if data is None:
+            data = pcm.to_wav_bytes()
+
+        if len(data) >= original_size:
+            return self._skip()
+
+        stream = io.BytesIO(data)
+        stream.name = path.stem + (ENCODER_ARGS[codec][1] if codec in ENCODER_ARGS else ".wav")
+        with self._lock:
+            self.files += 1
+            self.bytes_in += original_size
+            self.bytes_out += len(data)
+        return TranscodedAudio(stream, codec, original_size, len(data))
+
+    def _skip(self) -> None:
+        with self._lock:
+            self.skipped += 1
+        return None
+
+    def _encode(self, pcm: PCMAudio, codec: str) -> bytes:
+        """Encode mono PCM with ffmpeg."""
+        output_args, _ = ENCODER_ARGS[codec]
+        if codec == "opus":
+            output_args = [*output_args, "-b:a", self.opus_bitrate]
+        command = [
+            shutil.which("ffmpeg"), "-nostdin", "-v", "error",
+            "-f", "s16le", "-ar", str(pcm.sample_rate), "-ac", "1", "-i", "pipe:0",
+            *output_args,
+            "pipe:1",
+        ]
+        completed = subprocess.run(
+            command,
+            input=np.ascontiguousarray(pcm.samples, dtype="<i2").tobytes(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False
+        )
+        if completed.returncode != 0 or not completed.stdout:
+            raise RuntimeError(f"ffmpeg could not encode {codec}: {completed.stderr.decode(errors='replace').strip()}")
+        return completed.stdout
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters.
+
+        Returns:
+            Dict with files transcoded, files uploaded as is, bytes before
+            and after, and bytes saved
+        """
+        with self._lock:
+            return {
+                "files": self.files,
+                "skipped": self.skipped,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+            }
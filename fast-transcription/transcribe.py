@@ -6,11 +6,28 @@ import argparse
 import json
 import sys
 from pathlib import Path
+from typing import Any, Dict, TextIO
 
 import time
+import requests
+from cache import TranscriptionCache
 from config import AzureSpeechConfig
+from instrumentation import Instrumentation, JsonLinesExporter, PrometheusExporter
+from locales import LocaleCache
 from speech_client import AzureSpeechClient
-from utils import validate_audio_file, get_audio_duration
+from transcode import TRANSCODE_CODECS, Transcoder
+from utils import validate_audio_file, probe_audio
+from writers import WRITERS, write_transcript
+
+
+def write_output(result: Dict[str, Any], stream: TextIO, format: str) -> None:
+    """Write the result in the chosen --format, one phrase at a time."""
+    if format == "json":
+        # The default output is the combinedPhrases list
+        json.dump(result.get("combinedPhrases", []), stream, indent=2)
+        stream.write("\n")
+    else:
+        write_transcript(result, stream, format)
 
 
 def main():
@@ -18,20 +35,63 @@ def main():
     parser = argparse.ArgumentParser(description="Transcribe audio using Azure Speech-to-Text API")
     parser.add_argument("audio_file", help="Path to the audio file to transcribe")
     parser.add_argument("--locale", "-l", default="en-US", help="Locale for transcription (default: en-US)")
+    parser.add_argument("--skip-locale-check", action="store_true",
+                        help="Do not check the locale against the cached list of supported locales")
+    parser.add_argument("--candidate-locales", metavar="LOCALES",
+                        help="Comma-separated locales the audio may be in, e.g. en-US,fr-FR; a short speech "
+                             "probe picks one before the full upload (overrides --locale)")
+    parser.add_argument("--probe-seconds", type=float, default=30.0,
+                        help="Speech sent in the --candidate-locales probe in seconds (default: 30)")
     parser.add_argument("--region", "-r", help="Azure region (overrides .env setting)")
     parser.add_argument("--api-key", "-k", help="API key (overrides .env setting)")
     parser.add_argument("--output", "-o", help="Output file for the transcription result")
+    parser.add_argument("--format", "-f", choices=["json", *WRITERS], default="json",
+                        help="Output format: combinedPhrases JSON, JSON lines per phrase, "
+                             "SRT or WebVTT subtitles, or plain text (default: json)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Split the audio at silences and transcribe the chunks concurrently")
+    parser.add_argument("--chunk-seconds", type=float, default=300.0,
+                        help="Nominal chunk length in seconds for --chunked (default: 300)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Maximum number of chunks in flight for --chunked (default: 4)")
+    parser.add_argument("--strip-silence", action="store_true",
+                        help="Remove long silences before upload and map timestamps back")
+    parser.add_argument("--transcode", choices=TRANSCODE_CODECS, nargs="?", const="wav",
+                        help="Convert WAV and FLAC files to 16 kHz mono before upload, as WAV (default), "
+                             "or FLAC or Opus when ffmpeg is installed")
+    parser.add_argument("--cache-dir", help="Directory for cached transcription results")
+    parser.add_argument("--cache-max-mb", type=float,
+                        help="Evict least recently used cache entries beyond this size in MB")
+    parser.add_argument("--metrics-jsonl", help="Append per-phase timing events to this JSON lines file")
+    parser.add_argument("--metrics-prom", help="Write per-phase timing metrics to this file in Prometheus text format")
     args = parser.parse_args()
+    if args.chunked and args.strip_silence:
+        parser.error("--strip-silence cannot be combined with --chunked")
+
+    # Timing hooks for validation, probing and every request
+    instrumentation = Instrumentation()
+    jsonl_exporter = prom_exporter = None
+    if args.metrics_jsonl:
+        jsonl_exporter = JsonLinesExporter(args.metrics_jsonl)
+        instrumentation.add_hook(jsonl_exporter)
+    if args.metrics_prom:
+        prom_exporter = PrometheusExporter()
+        instrumentation.add_hook(prom_exporter)
 
     # Validate audio file
     audio_path = Path(args.audio_file)
-    if not validate_audio_file(audio_path):
+    with instrumentation.measure("validate", audio=audio_path.name):
+        valid = validate_audio_file(audio_path, enforce_limits=not args.chunked)
+    if not valid:
         print(f"Error: Invalid or non-existent audio file: {audio_path}", file=sys.stderr)
         sys.exit(1)
         
-    # Calculate and display audio duration
+    # Calculate and display audio duration (the probe is cached from validation)
+    duration_seconds = 0.0
     try:
-        duration_seconds = get_audio_duration(audio_path)
+        with instrumentation.measure("probe", audio=audio_path.name):
+            info = probe_audio(audio_path)
+        duration_seconds = info.duration
         minutes, seconds = divmod(duration_seconds, 60)
         hours, minutes = divmod(minutes, 60)
         
@@ -43,6 +103,8 @@ def main():
             duration_str = f"{seconds:.2f}s"
             
         print(f"Audio file duration: {duration_str} ({duration_seconds:.2f} seconds)")
+        if info.sample_rate and info.channels:
+            print(f"Audio format: {info.codec}, {info.sample_rate} Hz, {info.channels} channel(s)")
     except Exception as e:
         print(f"Warning: Could not determine audio duration: {e}", file=sys.stderr)
 
@@ -54,40 +116,83 @@ def main():
         )
         
         # Initialize client
-        client = AzureSpeechClient(config)
+        cache = None
+        if args.cache_dir:
+            max_bytes = int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None
+            cache = TranscriptionCache(args.cache_dir, max_bytes=max_bytes)
+        transcoder = Transcoder(args.transcode) if args.transcode else None
+        client = AzureSpeechClient(config, pool_size=args.workers, cache=cache, instrumentation=instrumentation,
+                                   transcoder=transcoder)
+        
+        locales = [args.locale]
+        if args.candidate_locales:
+            locales = [locale.strip() for locale in args.candidate_locales.split(",") if locale.strip()]
+        
+        # Reject unsupported locales before any audio is uploaded
+        if not args.skip_locale_check:
+            try:
+                locales = LocaleCache(client).validate(locales)
+            except requests.RequestException as e:
+                print(f"Warning: Could not fetch the supported locales: {e}", file=sys.stderr)
         
         print(f"Transcribing audio file: {audio_path}")
-        print(f"Using locale: {args.locale}")
         
         # Start timing the transcription process
         start_time = time.time()
         
+        # Narrow the candidates down with a probe of the first stretch of speech
+        if args.candidate_locales and len(locales) > 1:
+            print(f"Candidate locales: {', '.join(locales)}")
+            locales = client.choose_locales(audio_path, locales, args.probe_seconds)
+            guesses = client.locale_probes.guesses()
+            if len(locales) == 1 and guesses:
+                print(f"Identified locale: {locales[0]} (confidence {guesses[0].confidence:.2f}, "
+                      f"{guesses[0].share:.0%} of the probe's speech)")
+            else:
+                print("No single locale identified; sending all candidates")
+        print(f"Using locale: {', '.join(locales)}")
+        
         # Make the transcription request
-        result = client.transcribe(
-            audio_file=audio_path,
-            locales=[args.locale]
-        )
+        if args.chunked:
+            result = client.transcribe_chunked(
+                audio_file=audio_path,
+                locales=locales,
+                chunk_seconds=args.chunk_seconds,
+                max_workers=args.workers
+            )
+        elif args.strip_silence:
+            result = client.transcribe_speech_only(
+                audio_file=audio_path,
+                locales=locales
+            )
+        else:
+            result = client.transcribe(
+                audio_file=audio_path,
+                locales=locales
+            )
         
         # Calculate elapsed time
         elapsed_time = time.time() - start_time
         
-        # Extract and handle combinedPhrases from the result
-        combined_phrases = result.get("combinedPhrases", [])
-        
         # Calculate speedup compared to realtime
         realtime_speedup = duration_seconds / elapsed_time if elapsed_time > 0 else 0
         
         # Format elapsed time and speedup nicely
         elapsed_str = f"{elapsed_time:.2f} seconds"
         print(f"Took {elapsed_str} to Fast Transcribe the input ({realtime_speedup:.1f}x realtime)")
+        if cache is not None and cache.hits:
+            print(f"Served {cache.hits} of {cache.hits + cache.misses} request(s) from the cache")
+        if transcoder is not None and transcoder.files:
+            print(f"Transcoded the upload: {transcoder.bytes_in / 1e6:.1f} MB -> {transcoder.bytes_out / 1e6:.1f} MB "
+                  f"({transcoder.bytes_saved / 1e6:.1f} MB saved)")
         
         if args.output:
-            with open(args.output, "w") as f:
-                json.dump(combined_phrases, f, indent=2)
+            with open(args.output, "w", encoding="utf-8") as f:
+                write_output(result, f, args.format)
             print(f"Transcription result saved to: {args.output}")
         else:
             print("\nTranscription Result:")
-            print(json.dumps(combined_phrases, indent=2))
+            write_output(result, sys.stdout, args.format)
             
     except ValueError as e:
         print(f"Configuration Error: {e}", file=sys.stderr)
@@ -95,6 +200,11 @@ def main():
     except Exception as e:
         print(f"Error during transcription: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if jsonl_exporter is not None:
+            jsonl_exporter.close()
+        if prom_exporter is not None:
+            prom_exporter.write(args.metrics_prom)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,404 @@
+"""
+Compact, array-backed representation of transcription responses.
+
+A response for a long recording with word timestamps is hundreds of
+thousands of small dicts. Transcript keeps the same data as NumPy columns
+(offsets, durations, confidences, speaker and channel IDs) with all text
+interned in one UTF-8 buffer, and hands out lightweight views on demand.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+# Stored for speaker and channel IDs that the response does not include
+MISSING_ID = -1
+
+
+class _TextBuffer:
+    """Builds one UTF-8 buffer in which every distinct string is stored once."""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._spans: Dict[str, tuple] = {}
+
+    def add(self, text: str) -> tuple:
+        span = self._spans.get(text)
+        if span is None:
+            encoded = text.encode("utf-8")
+            span = (len(self._data), len(self._data) + len(encoded))
+            self._data += encoded
+            self._spans[text] = span
+        return span
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._data)
+
+
+class WordView:
+    """Read-only view of one word in a Transcript."""
+
+    __slots__ = ("_transcript", "index")
+
+    def __init__(self, transcript: "Transcript", index: int):
+        self._transcript = transcript
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        t = self._transcript
+        return t._text(t.word_text_start[self.index], t.word_text_end[self.index])
+
+    @property
+    def offset_ms(self) -> int:
+        return int(self._transcript.word_offset_ms[self.index])
+
+    @property
+    def duration_ms(self) -> int:
+        return int(self._transcript.word_duration_ms[self.index])
+
+    @property
+    def end_ms(self) -> int:
+        return self.offset_ms + self.duration_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the word in the response's dict form."""
+        return {"text": self.text, "offsetMilliseconds": self.offset_ms, "durationMilliseconds": self.duration_ms}
+
+    def __repr__(self) -> str:
+        return f"WordView({self.text!r}, offset_ms={self.offset_ms}, duration_ms={self.duration_ms})"
+
+
+class PhraseView:
+    """Read-only view of one phrase in a Transcript."""
+
+    __slots__ = ("_transcript", "index")
+
+    def __init__(self, transcript: "Transcript", index: int):
+        self._transcript = transcript
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        t = self._transcript
+        return t._text(t.phrase_text_start[self.index], t.phrase_text_end[self.index])
+
+    @property
+    def offset_ms(self) -> int:
+        return int(self._transcript.phrase_offset_ms[self.index])
+
+    @property
+    def duration_ms(self) -> int:
+        return int(self._transcript.phrase_duration_ms[self.index])
+
+    @property
+    def end_ms(self) -> int:
+        return self.offset_ms + self.duration_ms
+
+    @property
+    def confidence(self) -> Optional[float]:
+        value = float(self._transcript.phrase_confidence[self.index])
+        return None if np.isnan(value) else value
+
+    @property
+    def speaker(self) -> Optional[int]:
+        value = int(self._transcript.phrase_speaker[self.index])
+        return None if value == MISSING_ID else value
+
+    @property
+    def channel(self) -> Optional[int]:
+        value = int(self._transcript.phrase_channel[self.index])
+        return None if value == MISSING_ID else value
+
+    @property
+    def locale(self) -> Optional[str]:
+        value = int(self._transcript.phrase_locale[self.index])
+        return None if value == MISSING_ID else self._transcript.locales[value]
+
+    @property
+    def words(self) -> List[WordView]:
+        t = self._transcript
+        start, end = int(t.phrase_word_start[self.index]), int(t.phrase_word_end[self.index])
+        return [WordView(t, index) for index in range(start, end)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the phrase in the response's dict form."""
+        phrase: Dict[str, Any] = {
+            "offsetMilliseconds": self.offset_ms,
+            "durationMilliseconds": self.duration_ms,
+            "text": self.text,
+        }
+        words = self.words
+        if words:
+            phrase["words"] = [word.to_dict() for word in words]
+        for key, value in (("locale", self.locale), ("confidence", self.confidence),
+                           ("speaker", self.speaker), ("channel", self.channel)):
+            if value is not None:
+                phrase[key] = value
+        return phrase
+
+    def __repr__(self) -> str:
+        return f"PhraseView({self.text!r}, offset_ms={self.offset_ms}, duration_ms={self.duration_ms})"
+
+
+class Transcript:
+    """
+    Columnar transcription result.
+
+    Phrases are stored sorted by offset, and each phrase's words occupy a
+    contiguous range of the word columns. Time-range queries use binary
+    search over the offset columns, so they cost O(log n) plus the number
+    of matches.
+    """
+
+    def __init__(
+        self,
+        text: bytes,
+        locales: List[str],
+        phrase_columns: Dict[str, np.ndarray],
+        word_columns: Dict[str, np.ndarray],
+        duration_ms: Optional[int] = None,
+        combined_phrases: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Initialize from prebuilt columns. Use from_result to parse a response.
+
+        Args:
+            text: UTF-8 buffer holding every phrase and word text
+            locales: Distinct locales, indexed by the phrase_locale column
+            phrase_columns: Phrase arrays keyed by attribute name
+            word_columns: Word arrays keyed by attribute name
+            duration_ms: Duration reported by the service
+            combined_phrases: The response's combinedPhrases list
+        """
+        self._buffer = text
+        self.locales = locales
+        self.duration_ms = duration_ms
+        self.combined_phrases = combined_phrases or []
+
+        self.phrase_offset_ms = phrase_columns["offset_ms"]
+        self.phrase_duration_ms = phrase_columns["duration_ms"]
+        self.phrase_confidence = phrase_columns["confidence"]
+        self.phrase_speaker = phrase_columns["speaker"]
+        self.phrase_channel = phrase_columns["channel"]
+        self.phrase_locale = phrase_columns["locale"]
+        self.phrase_text_start = phrase_columns["text_start"]
+        self.phrase_text_end = phrase_columns["text_end"]
+        self.phrase_word_start = phrase_columns["word_start"]
+        self.phrase_word_end = phrase_columns["word_end"]
+
+        self.word_offset_ms = word_columns["offset_ms"]
+        self.word_duration_ms = word_columns["duration_ms"]
+        self.word_text_start = word_columns["text_start"]
+        self.word_text_end = word_columns["text_end"]
+
+        # Longest phrase, which bounds how far back an overlapping phrase can start
+        self._max_phrase_ms = int(self.phrase_duration_ms.max()) if len(self.phrase_duration_ms) else 0
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "Transcript":
+        """
+        Parse a transcription response.
+
+        Args:
+            result: Transcription response
+
+        Returns:
+            Transcript holding the response's phrases and words
+        """
+        phrases = sorted(result.get("phrases", []), key=lambda phrase: phrase.get("offsetMilliseconds", 0))
+        text = _TextBuffer()
+        locales: List[str] = []
+        locale_ids: Dict[str, int] = {}
+
+        phrase_count = len(phrases)
+        word_count = sum(len(phrase.get("words") or []) for phrase in phrases)
+        p = {
+            "offset_ms": np.empty(phrase_count, np.int64),
+            "duration_ms": np.empty(phrase_count, np.int32),
+            "confidence": np.empty(phrase_count, np.float64),
+            "speaker": np.empty(phrase_count, np.int16),
+            "channel": np.empty(phrase_count, np.int16),
+            "locale": np.empty(phrase_count, np.int16),
+            "text_start": np.empty(phrase_count, np.int64),
+            "text_end": np.empty(phrase_count, np.int64),
+            "word_start": np.empty(phrase_count, np.int64),
+            "word_end": np.empty(phrase_count, np.int64),
+        }
+        w = {
+            "offset_ms": np.empty(word_count, np.int64),
+            "duration_ms": np.empty(word_count, np.int32),
+            "text_start": np.empty(word_count, np.int64),
+            "text_end": np.empty(word_count, np.int64),
+        }
+
+        word_index = 0
+        for index, phrase in enumerate(phrases):
+            p["offset_ms"][index] = phrase.get("offsetMilliseconds", 0)
+            p["duration_ms"][index] = phrase.get("durationMilliseconds", 0)
+            confidence = phrase.get("confidence")
+            p["confidence"][index] = np.nan if confidence is None else confidence
+            p["speaker"][index] = phrase.get("speaker", MISSING_ID)
+            p["channel"][index] = phrase.get("channel", MISSING_ID)
+            locale = phrase.get("locale")
+            if locale is None:
+                p["locale"][index] = MISSING_ID
+            else:
+                if locale not in locale_ids:
+                    locale_ids[locale] = len(locales)
+                    locales.append(locale)
+                p["locale"][index] = locale_ids[locale]
+            p["text_start"][index], p["text_end"][index] = text.add(phrase.get("text", ""))
+
+            p["word_start"][index] = word_index
+            for word in phrase.get("words") or []:
+                w["offset_ms"][word_index] = word.get("offsetMilliseconds", 0)
+                w["duration_ms"][word_index] = word.get("durationMilliseconds", 0)
+                w["text_start"][word_index], w["text_end"][word_index] = text.add(word.get("text", ""))
+                word_index += 1
+            p["word_end"][index] = word_index
+
+        return cls(
+            text.to_bytes(),
+            locales,
+            p,
+            w,
+            duration_ms=result.get("durationMilliseconds"),
+            combined_phrases=result.get("combinedPhrases"),
+        )
+
+    def _text(self, start: int, end: int) -> str:
+        return self._buffer[int(start):int(end)].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.phrase_offset_ms)
+
+    def __getitem__(self, index: int) -> PhraseView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("phrase index out of range")
+        return PhraseView(self, index)
+
+    def __iter__(self) -> Iterator[PhraseView]:
+        return (PhraseView(self, index) for index in range(len(self)))
+
+    @property
+    def word_count(self) -> int:
+        """Number of words across all phrases."""
+        return len(self.word_offset_ms)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the text buffer and columns, in bytes."""
+        columns = [value for value in vars(self).values() if isinstance(value, np.ndarray)]
+        return len(self._buffer) + sum(column.nbytes for column in columns)
+
+    def _phrase_range(self, start_ms: int, end_ms: int) -> np.ndarray:
+        """Indices of phrases that overlap [start_ms, end_ms)."""
+        offsets = self.phrase_offset_ms
+        low = np.searchsorted(offsets, start_ms - self._max_phrase_ms, side="left")
+        high = np.searchsorted(offsets, end_ms, side="left")
+        candidates = np.arange(low, high)
+        ends = offsets[low:high] + self.phrase_duration_ms[low:high]
+        # Zero-length phrases count when they fall inside the range
+        return candidates[(ends > start_ms) | ((ends == offsets[low:high]) & (ends >= start_ms))]
+
+    def phrases_between(self, start_ms: int, end_ms: int) -> List[PhraseView]:
+        """
+        Get the phrases that overlap a time range.
+
+        Args:
+            start_ms: Start of the range in milliseconds
+            end_ms: End of the range in milliseconds, exclusive
+
+        Returns:
+            List of PhraseView in offset order
+        """
+        return [PhraseView(self, int(index)) for index in self._phrase_range(start_ms, end_ms)]
+
+    def words_between(self, start_ms: int, end_ms: int) -> List[WordView]:
+        """
+        Get the words that overlap a time range.
+
+        Args:
+            start_ms: Start of the range in milliseconds
+            end_ms: End of the range in milliseconds, exclusive
+
+        Returns:
+            List of WordView in phrase order
+        """
+        words = []
+        for phrase_index in self._phrase_range(start_ms, end_ms):
+            low, high = int(self.phrase_word_start[phrase_index]), int(self.phrase_word_end[phrase_index])
+            offsets = self.word_offset_ms[low:high]
+            ends = offsets + self.word_duration_ms[low:high]
+            for index in np.flatnonzero((offsets < end_ms) & (ends > start_ms)):
+                words.append(WordView(self, low + int(index)))
+        return words
+
+    def slice(self, start_ms: int, end_ms: int) -> "Transcript":
+        """
+        Get the phrases that overlap a time range as a new Transcript.
+
+        The new transcript shares this one's text buffer. Offsets stay
+        relative to the start of the recording, and the duration stays the
+        recording's, so the slice's to_result() describes part of the same
+        recording. combinedPhrases cover the whole recording and are left out.
+
+        Args:
+            start_ms: Start of the range in milliseconds
+            end_ms: End of the range in milliseconds, exclusive
+
+        Returns:
+            Transcript with the overlapping phrases and all of their words
+        """
+        indices = self._phrase_range(start_ms, end_ms)
+        word_starts = self.phrase_word_start[indices]
+        word_ends = self.phrase_word_end[indices]
+        lengths = word_ends - word_starts
+        word_indices = (
+            np.concatenate([np.arange(low, high) for low, high in zip(word_starts, word_ends)])
+            if len(indices) else np.empty(0, np.int64)
+        )
+
+        new_word_end = np.cumsum(lengths)
+        phrase_columns = {
+            "offset_ms": self.phrase_offset_ms[indices],
+            "duration_ms": self.phrase_duration_ms[indices],
+            "confidence": self.phrase_confidence[indices],
+            "speaker": self.phrase_speaker[indices],
+            "channel": self.phrase_channel[indices],
+            "locale": self.phrase_locale[indices],
+            "text_start": self.phrase_text_start[indices],
+            "text_end": self.phrase_text_end[indices],
+            "word_start": new_word_end - lengths,
+            "word_end": new_word_end,
+        }
+        word_columns = {
+            "offset_ms": self.word_offset_ms[word_indices],
+            "duration_ms": self.word_duration_ms[word_indices],
+            "text_start": self.word_text_start[word_indices],
+            "text_end": self.word_text_end[word_indices],
+        }
+        return Transcript(self._buffer, self.locales, phrase_columns, word_columns, duration_ms=self.duration_ms)
+
+    @property
+    def text(self) -> str:
+        """Text of every phrase, separated by spaces."""
+        return " ".join(phrase.text for phrase in self)
+
+    def to_result(self) -> Dict[str, Any]:
+        """
+        Rebuild the response's dict form.
+
+        Returns:
+            Dict shaped like a transcription response
+        """
+        result: Dict[str, Any] = {}
+        if self.duration_ms is not None:
+            result["durationMilliseconds"] = self.duration_ms
+        result["combinedPhrases"] = self.combined_phrases
+        result["phrases"] = [phrase.to_dict() for phrase in self]
+        return result
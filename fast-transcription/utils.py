@@ -2,15 +2,48 @@
 Utility functions for the Azure Speech-to-Text client.
 """
 
+import functools
+import io
+import json
+import mmap
 import os
+import shutil
+import struct
+import subprocess
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import wave
-import contextlib
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple, Union, BinaryIO
 import mutagen
+import numpy as np
 
 
-def validate_audio_file(file_path: str) -> bool:
+# Audio file extensions accepted by the transcription API
+AUDIO_EXTENSIONS = [
+    '.wav',      # WAV, including ALAW and MULAW in WAV containers
+    '.mp3',      # MP3
+    '.opus',     # OPUS
+    '.ogg',      # OGG
+    '.flac',     # FLAC
+    '.wma',      # WMA
+    '.aac',      # AAC
+    '.amr',      # AMR
+    '.webm',     # WebM
+    '.m4a',      # M4A
+    '.spx'       # SPEEX
+]
+
+# Video containers whose audio track is extracted with ffmpeg during the upload
+VIDEO_EXTENSIONS = ['.mp4', '.m4v', '.mov', '.mkv', '.avi', '.wmv', '.flv', '.ts', '.mts', '.m2ts', '.3gp']
+
+# Every file extension accepted as input
+INPUT_EXTENSIONS = AUDIO_EXTENSIONS + VIDEO_EXTENSIONS
+
+
+def is_video_file(file_path: Union[str, Path]) -> bool:
+    """Whether a path names a video container, judged by its extension."""
+    return Path(file_path).suffix.lower() in VIDEO_EXTENSIONS
+
+
+def validate_audio_file(file_path: str, enforce_limits: bool = True) -> bool:
     """
     Validate that the audio file exists and is likely a valid audio file.
     
@@ -18,8 +51,14 @@ def validate_audio_file(file_path: str) -> bool:
     - Are shorter than 2 hours in audio duration
     - Are smaller than 200 MB in size
     
+    Video files are accepted too. Only their audio track is uploaded, so
+    the size limit does not apply to the container.
+    
     Args:
         file_path: Path to the audio file
+        enforce_limits: Whether to apply the per-request size and duration
+            limits. Chunked transcription uploads the file in smaller pieces,
+            so it disables them.
         
     Returns:
         bool: True if file is valid, False otherwise
@@ -34,35 +73,26 @@ def validate_audio_file(file_path: str) -> bool:
     if not path.is_file():
         return False
         
-    # Check supported audio file extensions
-    audio_extensions = [
-        '.wav',      # WAV, including ALAW and MULAW in WAV containers
-        '.mp3',      # MP3
-        '.opus',     # OPUS
-        '.ogg',      # OGG
-        '.flac',     # FLAC
-        '.wma',      # WMA
-        '.aac',      # AAC
-        '.amr',      # AMR
-        '.webm',     # WebM
-        '.m4a',      # M4A
-        '.spx'       # SPEEX
-    ]
-    if path.suffix.lower() not in audio_extensions:
+    # Check supported audio and video file extensions
+    if path.suffix.lower() not in INPUT_EXTENSIONS:
         return False
         
     # Check if file is not empty
-    if path.stat().st_size == 0:
+    size = path.stat().st_size
+    if size == 0:
         return False
     
+    if not enforce_limits:
+        return True
+    
     # Check file size (must be less than 200 MB)
     max_size_bytes = 200 * 1024 * 1024  # 200 MB in bytes
-    if path.stat().st_size > max_size_bytes:
+    if size > max_size_bytes and not is_video_file(path):
         return False
     
     # Check audio duration (must be less than 2 hours)
     try:
-        duration = get_audio_duration(path)
+        duration = probe_audio(path).duration
         max_duration = 2 * 60 * 60  # 2 hours in seconds
         if duration > max_duration:
             return False
@@ -89,6 +119,62 @@ def format_transcription_result(response: Dict[str, Any]) -> Dict[str, Any]:
     return response
 
 
+def merge_transcription_results(
+    results: List[Dict[str, Any]],
+    offsets_ms: List[int],
+    duration_ms: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Stitch the results of consecutive audio chunks into a single result.
+    
+    Phrase and word offsets are moved onto the original timeline and the
+    per-channel combinedPhrases text is concatenated in chunk order.
+    
+    Args:
+        results: Transcription responses, one per chunk, in timeline order
+        offsets_ms: Start of each chunk on the original timeline in milliseconds
+        duration_ms: Duration of the original audio. Defaults to the end of the
+            last chunk as reported by the service.
+        
+    Returns:
+        Dict containing the merged transcription response
+    """
+    phrases = []
+    combined = {}
+    end_ms = 0
+    
+    for result, offset in zip(results, offsets_ms):
+        for phrase in result.get("phrases", []):
+            shifted = dict(phrase)
+            shifted["offsetMilliseconds"] = phrase.get("offsetMilliseconds", 0) + offset
+            if "words" in phrase:
+                shifted["words"] = [
+                    {**word, "offsetMilliseconds": word.get("offsetMilliseconds", 0) + offset}
+                    for word in phrase["words"]
+                ]
+            phrases.append(shifted)
+        
+        for entry in result.get("combinedPhrases", []):
+            text = entry.get("text", "")
+            if text:
+                combined.setdefault(entry.get("channel"), []).append(text)
+        
+        end_ms = max(end_ms, offset + result.get("durationMilliseconds", 0))
+    
+    combined_phrases = []
+    for channel, texts in combined.items():
+        entry = {"text": " ".join(texts)}
+        if channel is not None:
+            entry = {"channel": channel, **entry}
+        combined_phrases.append(entry)
+    
+    return {
+        "durationMilliseconds": duration_ms if duration_ms is not None else end_ms,
+        "combinedPhrases": combined_phrases,
+        "phrases": phrases,
+    }
+
+
 def get_default_audio_path() -> Optional[Path]:
     """
     Get the default audio file path from the environment.
@@ -102,6 +188,188 @@ def get_default_audio_path() -> Optional[Path]:
     return None
 
 
+class AudioInfo(NamedTuple):
+    """Audio metadata read from the container headers."""
+    
+    duration: float
+    sample_rate: Optional[int]
+    channels: Optional[int]
+    codec: str
+    size: int
+
+
+# Codec names for the WAV format tags the API accepts
+WAV_FORMAT_CODECS = {
+    0x0001: "pcm",
+    0x0003: "pcm_float",
+    0x0006: "alaw",
+    0x0007: "mulaw",
+}
+
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def probe_audio(file_path: Union[str, Path]) -> AudioInfo:
+    """
+    Read the metadata of an audio file from its headers.
+    
+    WAV headers are parsed directly; video containers are read with
+    ffprobe, when it is installed; other formats are read with mutagen.
+    Results are cached per path, modification time and size, so the
+    validator, the command-line tools and batch runs share one probe per file.
+    
+    Args:
+        file_path: Path to the audio file
+        
+    Returns:
+        AudioInfo: Duration, sample rate, channels, codec and size
+        
+    Raises:
+        Exception: If the metadata cannot be determined
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    return _probe_audio_cached(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _probe_audio_cached(path: Path, mtime_ns: int, size: int) -> AudioInfo:
+    """Probe a file; the modification time and size only key the cache."""
+    if path.suffix.lower() == '.wav':
+        with open(path, 'rb') as f:
+            return _probe_wav(f, size)
+    
+    if is_video_file(path) and shutil.which('ffprobe'):
+        return _probe_with_ffprobe(path, size)
+    
+    try:
+        audio = mutagen.File(path)
+    except Exception as e:
+        raise Exception(f"Error determining audio duration: {e}")
+    if audio is None or not hasattr(audio, 'info') or not hasattr(audio.info, 'length'):
+        raise Exception("Error determining audio duration: Could not determine audio duration")
+    
+    return AudioInfo(
+        duration=float(audio.info.length),
+        sample_rate=getattr(audio.info, 'sample_rate', None),
+        channels=getattr(audio.info, 'channels', None),
+        codec=type(audio).__name__.lower(),
+        size=size,
+    )
+
+
+def _probe_with_ffprobe(path: Path, size: int) -> AudioInfo:
+    """Build AudioInfo from the container duration and first audio track reported by ffprobe."""
+    command = [
+        shutil.which('ffprobe'), '-v', 'error',
+        '-select_streams', 'a:0',
+        '-show_entries', 'stream=codec_name,sample_rate,channels:format=duration',
+        '-of', 'json',
+        str(path),
+    ]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if completed.returncode != 0:
+        raise Exception(f"Error determining audio duration: {completed.stderr.decode(errors='replace').strip()}")
+    
+    info = json.loads(completed.stdout or b'{}')
+    streams = info.get('streams') or []
+    if not streams:
+        raise Exception("Error determining audio duration: No audio track")
+    stream = streams[0]
+    return AudioInfo(
+        duration=float(info.get('format', {}).get('duration') or 0.0),
+        sample_rate=int(stream['sample_rate']) if stream.get('sample_rate') else None,
+        channels=stream.get('channels'),
+        codec=stream.get('codec_name', 'unknown'),
+        size=size,
+    )
+
+
+def read_wav_header(f: BinaryIO) -> Dict[str, Any]:
+    """
+    Parse the RIFF chunks of a WAV file up to the start of the sample data.
+    
+    Only chunk headers and the fmt chunk are read; the sample data is skipped.
+    
+    Args:
+        f: Binary file positioned at the start of the WAV file
+        
+    Returns:
+        Dict with format_tag, codec, channels, sample_rate, block_align,
+        bits_per_sample, fmt_offset, fmt_size, data_offset and data_size
+        
+    Raises:
+        Exception: If the file is not a WAV file or has no fmt or data chunk
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] not in (b'RIFF', b'RF64') or riff[8:12] != b'WAVE':
+        raise Exception("Error determining audio duration: Not a RIFF/WAVE file")
+    
+    header = {}
+    rf64_data_size = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise Exception("Error determining audio duration: Missing fmt or data chunk")
+        chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        
+        if chunk_id == b'ds64':
+            # RF64 keeps the real 64-bit data size here
+            rf64_data_size = struct.unpack('<Q', f.read(chunk_size)[8:16])[0]
+        elif chunk_id == b'fmt ':
+            fmt_offset = f.tell()
+            fmt = f.read(chunk_size)
+            format_tag, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                # The real format tag is the start of the SubFormat GUID
+                format_tag = struct.unpack('<H', fmt[24:26])[0]
+            header.update(
+                format_tag=format_tag,
+                codec=WAV_FORMAT_CODECS.get(format_tag, f"wav_0x{format_tag:04x}"),
+                channels=channels,
+                sample_rate=sample_rate,
+                block_align=block_align,
+                bits_per_sample=bits,
+                fmt_offset=fmt_offset,
+                fmt_size=chunk_size,
+            )
+        elif chunk_id == b'data':
+            if 'format_tag' not in header:
+                raise Exception("Error determining audio duration: data chunk before fmt chunk")
+            if rf64_data_size is not None and chunk_size == 0xFFFFFFFF:
+                chunk_size = rf64_data_size
+            header.update(data_offset=f.tell(), data_size=chunk_size)
+            return header
+        else:
+            f.seek(chunk_size, os.SEEK_CUR)
+        
+        # Chunks are padded to an even size
+        if chunk_size % 2 and chunk_id != b'data':
+            f.seek(1, os.SEEK_CUR)
+
+
+def _probe_wav(f: BinaryIO, size: int) -> AudioInfo:
+    """Build AudioInfo from a WAV file's headers."""
+    header = read_wav_header(f)
+    
+    # Streamed WAVs often leave the data size unset; use the rest of the file
+    data_size = header['data_size']
+    if data_size in (0, 0xFFFFFFFF) or header['data_offset'] + data_size > size:
+        data_size = size - header['data_offset']
+    
+    if not header['sample_rate'] or not header['block_align']:
+        raise Exception("Error determining audio duration: Invalid fmt chunk")
+    
+    frames = data_size // header['block_align']
+    return AudioInfo(
+        duration=frames / float(header['sample_rate']),
+        sample_rate=header['sample_rate'],
+        channels=header['channels'],
+        codec=header['codec'],
+        size=size,
+    )
+
+
 def get_audio_duration(file_path: Path) -> float:
     """
     Get the duration of an audio file in seconds.
@@ -115,22 +383,292 @@ def get_audio_duration(file_path: Path) -> float:
     Raises:
         Exception: If the duration cannot be determined
     """
-    extension = file_path.suffix.lower()
-    
-    # Handle WAV files
-    if extension == '.wav':
-        with contextlib.closing(wave.open(str(file_path), 'r')) as f:
-            frames = f.getnframes()
-            rate = f.getframerate()
-            duration = frames / float(rate)
-            return duration
-    
-    # Handle other audio formats using mutagen
-    else:
+    return probe_audio(file_path).duration
+
+
+def _g711_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """Build the A-law and mu-law (G.711) code to int16 lookup tables."""
+    codes = np.arange(256, dtype=np.int32)
+
+    alaw = codes ^ 0x55
+    exponent = (alaw >> 4) & 0x07
+    mantissa = alaw & 0x0F
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0)
+    )
+    # A-law sets the sign bit for positive samples
+    alaw_table = np.where(alaw & 0x80, magnitude, -magnitude).astype(np.int16)
+
+    mulaw = ~codes & 0xFF
+    exponent = (mulaw >> 4) & 0x07
+    mantissa = mulaw & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    mulaw_table = np.where(mulaw & 0x80, -magnitude, magnitude).astype(np.int16)
+
+    return alaw_table, mulaw_table
+
+
+_ALAW_TABLE, _MULAW_TABLE = _g711_tables()
+
+
+class MappedWav:
+    """
+    WAV file memory-mapped for zero-copy access to its samples.
+
+    The RIFF chunks are parsed with read_wav_header, so PCM, float,
+    A-law, mu-law, WAVE_FORMAT_EXTENSIBLE and RF64 files are supported.
+    Sample data is never read into Python bytes: frames_view and samples
+    return views of the mapping, and segment builds uploadable WAV files
+    from a new header and a mapped slice. Pages are loaded by the OS as
+    the views are touched, so multi-GB files cost no more memory than the
+    range being processed.
+
+    Views keep the mapping alive after close() until they are released.
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        """
+        Map a WAV file.
+
+        Args:
+            file_path: Path to the WAV file
+
+        Raises:
+            Exception: If the file is not a WAV file or has no fmt or data chunk
+        """
+        self.path = Path(file_path)
+        with open(self.path, 'rb') as f:
+            header = read_wav_header(f)
+            size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if not header['sample_rate'] or not header['block_align']:
+            self._map.close()
+            raise Exception("Error determining audio duration: Invalid fmt chunk")
+
+        self.format_tag = header['format_tag']
+        self.codec = header['codec']
+        self.channels = header['channels']
+        self.sample_rate = header['sample_rate']
+        self.block_align = header['block_align']
+        self.bits_per_sample = header['bits_per_sample']
+        self.data_offset = header['data_offset']
+        self._fmt = (header['fmt_offset'], header['fmt_size'])
+
+        # Streamed WAVs often leave the data size unset; use the rest of the file
+        data_size = header['data_size']
+        if data_size in (0, 0xFFFFFFFF) or self.data_offset + data_size > size:
+            data_size = size - self.data_offset
+        self.frames = data_size // self.block_align
+        self.data_size = self.frames * self.block_align
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return self.frames / float(self.sample_rate)
+
+    def _range(self, start_frame: int, end_frame: Optional[int]) -> Tuple[int, int]:
+        end_frame = self.frames if end_frame is None else min(end_frame, self.frames)
+        start_frame = max(0, min(start_frame, end_frame))
+        return start_frame, end_frame
+
+    def frames_view(self, start_frame: int = 0, end_frame: Optional[int] = None) -> memoryview:
+        """
+        Get the raw bytes of a frame range without copying them.
+
+        Args:
+            start_frame: First frame of the range
+            end_frame: Frame after the last frame of the range, or None for the end
+
+        Returns:
+            memoryview: Read-only view of the mapped sample data
+        """
+        start_frame, end_frame = self._range(start_frame, end_frame)
+        start = self.data_offset + start_frame * self.block_align
+        return memoryview(self._map)[start:start + (end_frame - start_frame) * self.block_align]
+
+    def samples(self, start_frame: int = 0, end_frame: Optional[int] = None) -> np.ndarray:
+        """
+        Get a frame range as a NumPy array without copying it.
+
+        Samples keep their stored type: uint8 for 8-bit PCM and the A-law
+        and mu-law codes, little-endian int16/int32 for PCM, float32/float64
+        for float. 24-bit PCM has no NumPy type and is returned as its raw
+        bytes with a trailing axis of 3.
+
+        Args:
+            start_frame: First frame of the range
+            end_frame: Frame after the last frame of the range, or None for the end
+
+        Returns:
+            np.ndarray: Read-only array shaped (frames, channels)
+
+        Raises:
+            ValueError: If the sample format is not supported
+        """
+        view = self.frames_view(start_frame, end_frame)
+        width = self.block_align // self.channels
+        if self.codec == 'pcm' and width == 3:
+            return np.frombuffer(view, dtype=np.uint8).reshape(-1, self.channels, 3)
+
+        dtype = {
+            ('pcm', 1): np.uint8,
+            ('pcm', 2): '<i2',
+            ('pcm', 4): '<i4',
+            ('pcm_float', 4): '<f4',
+            ('pcm_float', 8): '<f8',
+            ('alaw', 1): np.uint8,
+            ('mulaw', 1): np.uint8,
+        }.get((self.codec, width))
+        if dtype is None:
+            raise ValueError(f"Unsupported WAV sample format: {self.codec} with {width}-byte samples")
+        return np.frombuffer(view, dtype=dtype).reshape(-1, self.channels)
+
+    def to_int16(self, start_frame: int = 0, end_frame: Optional[int] = None) -> np.ndarray:
+        """
+        Get a frame range as 16-bit PCM.
+
+        16-bit PCM is returned as a view of the mapping; other formats are
+        converted, which copies only the requested range.
+
+        Args:
+            start_frame: First frame of the range
+            end_frame: Frame after the last frame of the range, or None for the end
+
+        Returns:
+            np.ndarray: int16 array shaped (frames, channels)
+
+        Raises:
+            ValueError: If the sample format is not supported
+        """
+        samples = self.samples(start_frame, end_frame)
+        if self.codec == 'alaw':
+            return _ALAW_TABLE[samples]
+        if self.codec == 'mulaw':
+            return _MULAW_TABLE[samples]
+        if self.codec == 'pcm_float':
+            return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        if samples.ndim == 3:
+            # Keep the two most significant bytes of each little-endian 24-bit sample
+            return (samples[..., 1].astype(np.uint16) | (samples[..., 2].astype(np.uint16) << 8)).view(np.int16)
+        if samples.dtype == np.uint8:
+            # 8-bit WAV is unsigned
+            return (samples.astype(np.int16) - 128) << 8
+        if samples.dtype.itemsize == 4:
+            return (samples >> 16).astype(np.int16)
+        return samples
+
+    def segment(self, start_frame: int = 0, end_frame: Optional[int] = None) -> "WavSegment":
+        """
+        Get a frame range as a standalone WAV file for upload.
+
+        The segment keeps the original fmt chunk, so its samples are
+        uploaded in their stored encoding.
+
+        Args:
+            start_frame: First frame of the range
+            end_frame: Frame after the last frame of the range, or None for the end
+
+        Returns:
+            WavSegment: Seekable file object reading a new header followed
+            by the mapped samples
+        """
+        fmt_offset, fmt_size = self._fmt
+        fmt = self._map[fmt_offset:fmt_offset + fmt_size]
+        segment = WavSegment(fmt, self.frames_view(start_frame, end_frame))
+        segment.name = f"{self.path.stem}-{start_frame}.wav"
+        return segment
+
+    def close(self) -> None:
+        """Unmap the file, unless views of it are still in use."""
         try:
-            audio = mutagen.File(file_path)
-            if audio is not None and hasattr(audio, 'info') and hasattr(audio.info, 'length'):
-                return float(audio.info.length)
-            raise Exception("Could not determine audio duration")
-        except Exception as e:
-            raise Exception(f"Error determining audio duration: {e}")
+            self._map.close()
+        except BufferError:
+            # Exported views keep the mapping; it is released with the last one
+            pass
+
+    def __enter__(self) -> "MappedWav":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class WavSegment(io.RawIOBase):
+    """Read-only WAV file made of a generated header and a view of sample data."""
+
+    def __init__(self, fmt: bytes, data: memoryview):
+        """
+        Initialize the segment.
+
+        Args:
+            fmt: Body of the fmt chunk to write
+            data: Sample data, not copied
+
+        Raises:
+            ValueError: If the data is too large for a RIFF header
+        """
+        fmt_pad = b'\x00' * (len(fmt) % 2)
+        data_pad = b'\x00' * (len(data) % 2)
+        riff_size = 4 + 8 + len(fmt) + len(fmt_pad) + 8 + len(data) + len(data_pad)
+        if riff_size > 0xFFFFFFFF:
+            raise ValueError("WAV segment is larger than 4 GB")
+
+        header = (
+            b'RIFF' + struct.pack('<I', riff_size) + b'WAVE'
+            + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + fmt_pad
+            + b'data' + struct.pack('<I', len(data))
+        )
+        self._parts = [memoryview(header), data.cast('B'), memoryview(data_pad)]
+        self._size = sum(len(part) for part in self._parts)
+        self._position = 0
+        self.name = "segment.wav"
+
+    def clone(self) -> "WavSegment":
+        """
+        Get a second reader of the same segment, sharing its data.
+
+        Returns:
+            WavSegment: Reader positioned at the start
+        """
+        clone = WavSegment.__new__(WavSegment)
+        io.RawIOBase.__init__(clone)
+        clone._parts = self._parts
+        clone._size = self._size
+        clone._position = 0
+        clone.name = self.name
+        return clone
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        written = 0
+        target = memoryview(buffer).cast('B')
+        base = 0
+        for part in self._parts:
+            end = base + len(part)
+            if self._position < end and written < len(target):
+                start = self._position - base
+                count = min(len(part) - start, len(target) - written)
+                target[written:written + count] = part[start:start + count]
+                written += count
+                self._position += count
+            base = end
+        return written
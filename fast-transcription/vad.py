@@ -0,0 +1,179 @@
+"""
+Energy-based voice activity detection and silence stripping with timestamp remapping.
+"""
+
+import bisect
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio import PCMAudio, frame_energy_db
+
+
+class OffsetMap:
+    """
+    Maps times on a silence-stripped timeline back to the original audio.
+
+    The stripped audio is the kept spans of the original placed back to
+    back; each span is recorded by its start on both timelines and its
+    length, in milliseconds.
+    """
+
+    def __init__(self, spans: List[Tuple[int, int, int]]):
+        """
+        Initialize the map.
+
+        Args:
+            spans: (stripped_start_ms, original_start_ms, length_ms) for each
+                kept span, in timeline order
+        """
+        self.spans = spans
+        self._stripped_starts = [stripped for stripped, _, _ in spans]
+
+    @property
+    def kept_ms(self) -> int:
+        """Total length of the kept audio in milliseconds."""
+        return sum(length for _, _, length in self.spans)
+
+    def to_original(self, ms: int, is_end: bool = False) -> int:
+        """
+        Translate a stripped-timeline time to the original timeline.
+
+        Args:
+            ms: Time on the stripped timeline in milliseconds
+            is_end: Whether the time ends an interval. An end that falls
+                exactly on a span boundary belongs to the earlier span, so
+                durations do not stretch across removed silence.
+
+        Returns:
+            int: Time on the original timeline in milliseconds
+        """
+        if not self.spans:
+            return ms
+        if is_end:
+            index = bisect.bisect_left(self._stripped_starts, ms) - 1
+        else:
+            index = bisect.bisect_right(self._stripped_starts, ms) - 1
+        stripped_start, original_start, _ = self.spans[max(index, 0)]
+        return original_start + (ms - stripped_start)
+
+    def remap_result(self, result: Dict[str, Any], duration_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Move phrase and word timings of a response onto the original timeline.
+
+        Args:
+            result: Transcription response for the stripped audio
+            duration_ms: Duration of the original audio, reported as the
+                response's durationMilliseconds if given
+
+        Returns:
+            Dict containing the remapped transcription response
+        """
+        remapped = dict(result)
+        remapped["phrases"] = [self._remap_item(phrase) for phrase in result.get("phrases", [])]
+        if duration_ms is not None:
+            remapped["durationMilliseconds"] = duration_ms
+        return remapped
+
+    def _remap_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Remap one phrase or word, including any nested words."""
+        remapped = dict(item)
+        offset = item.get("offsetMilliseconds", 0)
+        start = self.to_original(offset)
+        remapped["offsetMilliseconds"] = start
+        if "durationMilliseconds" in item:
+            end = self.to_original(offset + item["durationMilliseconds"], is_end=True)
+            remapped["durationMilliseconds"] = max(0, end - start)
+        if "words" in item:
+            remapped["words"] = [self._remap_item(word) for word in item["words"]]
+        return remapped
+
+
+def detect_speech(
+    audio: PCMAudio,
+    frame_ms: int = 30,
+    threshold_db: Optional[float] = None,
+    min_silence_ms: int = 1000,
+    padding_ms: int = 250
+) -> List[Tuple[int, int]]:
+    """
+    Find the spans of audio that contain speech.
+
+    Frames louder than the threshold count as speech. Pauses shorter than
+    `min_silence_ms` are kept so sentences are not chopped up, and every
+    span is widened by `padding_ms` to keep soft word onsets and endings.
+
+    Args:
+        audio: Decoded audio
+        frame_ms: Analysis frame length in milliseconds
+        threshold_db: Speech threshold in dBFS. Defaults to 12 dB above the
+            noise floor (the 10th percentile of frame energy), but never
+            below -60 dBFS so digital silence does not make hiss count as speech.
+        min_silence_ms: Shortest non-speech run that is removed
+        padding_ms: Audio kept either side of each speech span
+
+    Returns:
+        List of (start_frame, end_frame) sample-frame spans, in order
+    """
+    energy = frame_energy_db(audio.samples, audio.sample_rate, frame_ms)
+    if len(energy) == 0:
+        return [(0, audio.frames)] if audio.frames else []
+
+    if threshold_db is None:
+        threshold_db = max(float(np.percentile(energy, 10)) + 12.0, -60.0)
+
+    speech = energy > threshold_db
+    if not speech.any():
+        return []
+
+    # Run boundaries: starts and ends of consecutive speech frames
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Close gaps that are too short to be worth removing
+    min_gap = min_silence_ms // frame_ms
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] >= min_gap))
+    starts = starts[keep]
+    ends = np.concatenate((ends[np.flatnonzero(keep)[1:] - 1], ends[-1:]))
+
+    frame_length = int(audio.sample_rate * frame_ms / 1000)
+    padding = int(audio.sample_rate * padding_ms / 1000)
+    spans = []
+    for start, end in zip(starts * frame_length - padding, ends * frame_length + padding):
+        start, end = max(0, int(start)), min(audio.frames, int(end))
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def strip_silence(audio: PCMAudio, **kwargs) -> Tuple[PCMAudio, OffsetMap]:
+    """
+    Remove long non-speech spans from audio.
+
+    Args:
+        audio: Decoded audio
+        **kwargs: Options passed to detect_speech
+
+    Returns:
+        Tuple of the stripped audio and the map back to the original timeline
+    """
+    spans = detect_speech(audio, **kwargs)
+    if not spans:
+        spans = [(0, audio.frames)]
+
+    rate = audio.sample_rate
+    offsets = []
+    stripped_frames = 0
+    for start, end in spans:
+        offsets.append((
+            int(round(stripped_frames * 1000 / rate)),
+            int(round(start * 1000 / rate)),
+            int(round((end - start) * 1000 / rate)),
+        ))
+        stripped_frames += end - start
+
+    samples = np.concatenate([audio.samples[start:end] for start, end in spans])
+    return PCMAudio(samples, rate), OffsetMap(offsets)
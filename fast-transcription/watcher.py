@@ -0,0 +1,589 @@
+"""
+Watch-folder ingestion service: transcribes recordings as soon as they land.
+
+Files are detected with inotify on Linux, or by polling elsewhere and on
+network shares where inotify does not see remote writes. A file is queued
+once its size and modification time have stopped changing, so partially
+copied uploads are never sent.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import shutil
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from batch import output_path_for, write_result
+from index import TranscriptIndex, load_result_file
+from config import AzureSpeechConfig
+from sources import FileAudioSource
+from speech_client import AzureSpeechClient
+from utils import INPUT_EXTENSIONS, validate_audio_file
+from writers import WRITERS
+
+
+# inotify event flags from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Transcribed contents remembered for duplicate detection, most recent first
+MAX_KNOWN_DIGESTS = 10000
+
+
+def _iter_audio_files(root: Path, recursive: bool) -> Iterator[Path]:
+    """List audio files under root."""
+    paths = root.rglob("*") if recursive else root.iterdir()
+    for path in paths:
+        if path.suffix.lower() in INPUT_EXTENSIONS and not path.name.startswith("."):
+            yield path
+
+
+class PollingWatcher:
+    """Detects new and changed files by scanning the directory tree."""
+
+    def __init__(self, root: Path, recursive: bool = True, interval: float = 1.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            root: Directory to watch
+            recursive: Whether to watch subdirectories
+            interval: Seconds between scans
+        """
+        self.root = root
+        self.recursive = recursive
+        self.interval = interval
+        self._seen: Dict[Path, Tuple[int, int]] = {}
+        self._next_scan = 0.0
+
+    def poll(self, timeout: float) -> List[Path]:
+        """
+        Wait up to timeout seconds for changes.
+
+        Args:
+            timeout: Maximum wait in seconds
+
+        Returns:
+            List of files that appeared or changed since the previous scan;
+            every file on the first call
+        """
+        delay = self._next_scan - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, timeout))
+            if time.monotonic() < self._next_scan:
+                return []
+        self._next_scan = time.monotonic() + self.interval
+
+        changed = []
+        seen = {}
+        for path in _iter_audio_files(self.root, self.recursive):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            seen[path] = (stat.st_size, stat.st_mtime_ns)
+            if self._seen.get(path) != seen[path]:
+                changed.append(path)
+        self._seen = seen
+        return changed
+
+    def close(self) -> None:
+        """Release resources held by the watcher."""
+
+
+class InotifyWatcher:
+    """Detects new and changed files with Linux inotify, through ctypes."""
+
+    def __init__(self, root: Path, recursive: bool = True):
+        """
+        Start watching.
+
+        Args:
+            root: Directory to watch
+            recursive: Whether to watch subdirectories, including new ones
+
+        Raises:
+            OSError: If inotify is not available
+        """
+        library = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or library is None:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        self.root = root
+        self.recursive = recursive
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._dirs: Dict[int, Path] = {}
+        self._initial: Optional[List[Path]] = None
+        self._add_tree(root)
+        # Files that were already there are reported by the first poll
+        self._initial = list(_iter_audio_files(root, recursive))
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        self._dirs[wd] = directory
+
+    def _add_tree(self, directory: Path) -> None:
+        self._add_watch(directory)
+        if self.recursive:
+            for path in directory.rglob("*"):
+                if path.is_dir():
+                    self._add_watch(path)
+
+    def poll(self, timeout: float) -> List[Path]:
+        """
+        Wait up to timeout seconds for changes.
+
+        Args:
+            timeout: Maximum wait in seconds
+
+        Returns:
+            List of files that were created, written or moved in; every
+            file after the kernel's event queue overflowed
+        """
+        if self._initial is not None:
+            initial, self._initial = self._initial, None
+            return initial
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changed = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; rescan so no file is missed
+                return list(_iter_audio_files(self.root, self.recursive))
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._add_tree(path)
+                    except OSError:
+                        continue
+                    # Files written before the watch was added
+                    changed.extend(_iter_audio_files(path, True))
+                continue
+            if path.suffix.lower() in INPUT_EXTENSIONS and not name.startswith("."):
+                changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        """Stop watching and close the inotify descriptor."""
+        os.close(self._fd)
+
+
+def open_watcher(root: Path, recursive: bool = True, polling: bool = False, poll_interval: float = 1.0):
+    """
+    Create an inotify watcher, or a polling watcher if inotify is unavailable.
+
+    Args:
+        root: Directory to watch
+        recursive: Whether to watch subdirectories
+        polling: Whether to poll even where inotify is available, as needed
+            for network shares written by other hosts
+        poll_interval: Seconds between scans when polling
+
+    Returns:
+        InotifyWatcher or PollingWatcher
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(root, recursive)
+        except OSError:
+            pass
+    return PollingWatcher(root, recursive, poll_interval)
+
+
+class IngestService:
+    """
+    Long-running service that transcribes files dropped into a directory.
+
+    Files go through three stages: the watcher reports them, the debouncer
+    waits until their size and modification time have been stable for
+    `settle_seconds`, and a bounded queue feeds a fixed pool of workers.
+    When the queue is full the service stops taking new files until a
+    worker frees a slot.
+
+    Files with identical content are transcribed once; later copies get a
+    copy of the first file's result. Only the result paths of the last
+    MAX_KNOWN_DIGESTS contents are remembered, so memory stays flat
+    however long the service runs.
+    """
+
+    def __init__(
+        self,
+        client: AzureSpeechClient,
+        root: Path,
+        output_dir: Optional[Path] = None,
+        format: str = "json",
+        locales: List[str] = ["en-US"],
+        workers: int = 4,
+        queue_size: Optional[int] = None,
+        settle_seconds: float = 2.0,
+        recursive: bool = True,
+        polling: bool = False,
+        poll_interval: float = 1.0,
+        index: Optional[TranscriptIndex] = None
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            client: Client used for every request
+            root: Directory to watch
+            output_dir: Directory for the results. Defaults to next to each source file.
+            format: Output format, "json" or one of writers.WRITERS
+            locales: List of language locales for transcription
+            workers: Number of files transcribed at once
+            queue_size: Files waiting for a worker before intake pauses.
+                Defaults to twice the number of workers.
+            settle_seconds: How long a file must be unchanged before it is queued
+            recursive: Whether to watch subdirectories
+            polling: Whether to poll instead of using inotify
+            poll_interval: Seconds between scans when polling
+            index: Search index that receives every result, keyed by the
+                source file's path
+        """
+        self.client = client
+        self.root = root
+        self.output_dir = output_dir
+        self.format = format
+        self.locales = locales
+        self.workers = workers
+        self.settle_seconds = settle_seconds
+        self.index = index
+        self.watcher = open_watcher(root, recursive, polling, poll_interval)
+
+        self.transcribed = 0
+        self.duplicates = 0
+        self.failed = 0
+
+        self._queue: "queue.Queue[Optional[Tuple[Path, float]]]" = queue.Queue(queue_size or 2 * workers)
+        self._pending: Dict[Path, Tuple[int, int, float, float]] = {}
+        self._queued = set()
+        # Files that settled again while queued or being transcribed, and
+        # those handed back to run() once that finished
+        self._dirty = set()
+        self._rewritten = set()
+        # Handed-back files whose existing result predates the rewrite (run() only)
+        self._stale = set()
+        # Contents being transcribed, and the results of ones that were
+        self._in_flight: Dict[str, Future] = {}
+        self._known: "OrderedDict[str, Path]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def output_path(self, audio_path: Path) -> Path:
+        """Get the result location for a source file."""
+        if self.output_dir is None:
+            return output_path_for(audio_path, audio_path.parent, self.format)
+        return output_path_for(audio_path, self.output_dir, self.format, self.root)
+
+    def _is_done(self, audio_path: Path) -> bool:
+        """Whether the file already has a result newer than itself."""
+        output_path = self.output_path(audio_path)
+        try:
+            return output_path.stat().st_mtime >= audio_path.stat().st_mtime
+        except OSError:
+            return False
+
+    def _track(self, paths: List[Path]) -> None:
+        """Start or restart the settle timer of reported files."""
+        now = time.monotonic()
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                self._pending.pop(path, None)
+                self._stale.discard(path)
+                continue
+            landed = self._pending[path][3] if path in self._pending else now
+            self._pending[path] = (stat.st_size, stat.st_mtime_ns, now, landed)
+
+    def _settled(self) -> List[Tuple[Path, float]]:
+        """Get files that have been unchanged for settle_seconds, and stop tracking them."""
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, since, landed) in list(self._pending.items()):
+            try:
+                stat = path.stat()
+            except OSError:
+                del self._pending[path]
+                self._stale.discard(path)
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (stat.st_size, stat.st_mtime_ns, now, landed)
+            elif now - since >= self.settle_seconds:
+                del self._pending[path]
+                ready.append((path, landed))
+        return ready
+
+    def _take_rewritten(self) -> List[Path]:
+        """Get files rewritten while they were transcribed, to settle and queue again."""
+        with self._lock:
+            paths, self._rewritten = list(self._rewritten), set()
+        # Their result was written after the rewrite, so it looks up to date
+        self._stale.update(paths)
+        return paths
+
+    def run(self) -> None:
+        """Watch and transcribe until stop() is called."""
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self._stop.is_set():
+                timeout = min(self.settle_seconds, 1.0) if self._pending else 1.0
+                self._track(self.watcher.poll(timeout) + self._take_rewritten())
+                for path, landed in self._settled():
+                    with self._lock:
+                        if path in self._queued:
+                            # Changed since it was queued; queued again once the worker is done
+                            self._dirty.add(path)
+                            continue
+                    if path not in self._stale and self._is_done(path):
+                        continue
+                    self._stale.discard(path)
+                    with self._lock:
+                        self._queued.add(path)
+                    # Blocks while every worker is busy and the queue is full
+                    while not self._stop.is_set():
+                        try:
+                            self._queue.put((path, landed), timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+        finally:
+            for _ in threads:
+                self._queue.put(None)
+            for thread in threads:
+                thread.join()
+            self.watcher.close()
+
+    def stop(self) -> None:
+        """Ask run() to return once in-flight files finish."""
+        self._stop.set()
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, landed = item
+            try:
+                self._process(path, landed)
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+                    if path in self._dirty:
+                        self._dirty.discard(path)
+                        self._rewritten.add(path)
+
+    def _process(self, path: Path, landed: float) -> None:
+        if not validate_audio_file(path):
+            print(f"Skipping invalid audio file: {path}", file=sys.stderr)
+            return
+
+        output_path = self.output_path(path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with FileAudioSource(path) as source:
+                digest = source.digest()
+                future = self._claim(digest, path, output_path)
+                if future is None:
+                    with self._lock:
+                        self.duplicates += 1
+                    print(f"{path}: duplicate, copied result to {output_path}")
+                    return
+
+                try:
+                    result = self.client.transcribe(source, self.locales)
+                    write_result(result, output_path, self.format)
+                except Exception as e:
+                    # Let a later copy of the same content try again
+                    with self._lock:
+                        del self._in_flight[digest]
+                    future.set_exception(e)
+                    raise
+                with self._lock:
+                    del self._in_flight[digest]
+                    self._known[digest] = output_path
+                    while len(self._known) > MAX_KNOWN_DIGESTS:
+                        self._known.popitem(last=False)
+                future.set_result((output_path, result))
+                if self.index is not None:
+                    self.index.add_result(str(path), result)
+
+            with self._lock:
+                self.transcribed += 1
+            print(f"{path}: transcribed in {time.monotonic() - landed:.1f}s after landing -> {output_path}")
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"{path}: failed: {e}", file=sys.stderr)
+
+    def _claim(self, digest: str, path: Path, output_path: Path) -> Optional[Future]:
+        """
+        Reuse an earlier result for the same content, or claim the content.
+
+        Returns:
+            Future to complete with (output path, result) once this file is
+            transcribed, or None if an earlier result was copied instead
+        """
+        while True:
+            result = None
+            with self._lock:
+                first = self._in_flight.get(digest)
+                earlier = self._known.get(digest)
+                if earlier is not None:
+                    self._known.move_to_end(digest)
+                elif first is None:
+                    future = self._in_flight[digest] = Future()
+                    return future
+
+            if earlier is None:
+                try:
+                    earlier, result = first.result()
+                except Exception:
+                    # The first copy failed and gave up its claim
+                    continue
+
+            if self._copy_result(earlier, result, path, output_path):
+                return None
+            # The earlier result was moved or deleted; transcribe this copy
+            with self._lock:
+                if self._known.get(digest) == earlier:
+                    del self._known[digest]
+
+    def _copy_result(self, earlier: Path, result: Optional[dict], path: Path, output_path: Path) -> bool:
+        """Copy an earlier result file for a duplicate, and index it. False if the copy is impossible."""
+        if result is None and self.index is not None:
+            # Subtitle and text results cannot be read back for the index
+            try:
+                result = load_result_file(earlier)
+            except (OSError, ValueError):
+                return False
+        try:
+            if earlier == output_path:
+                # Rewritten with the same content; the result stands
+                os.utime(output_path)
+            else:
+                shutil.copyfile(earlier, output_path)
+        except OSError:
+            return False
+        if self.index is not None:
+            self.index.add_result(str(path), result)
+        return True
+
+
+def main():
+    """Main entry point for the watch-folder service."""
+    parser = argparse.ArgumentParser(description="Transcribe audio files as they are dropped into a directory")
+    parser.add_argument("directory", help="Directory to watch")
+    parser.add_argument("--output-dir", "-o", help="Directory for the results (default: next to each audio file)")
+    parser.add_argument("--format", "-f", choices=["json", *WRITERS], default="json",
+                        help="Format of the result files (default: json)")
+    parser.add_argument("--workers", "-w", type=int, default=4,
+                        help="Number of files transcribed at once (default: 4)")
+    parser.add_argument("--queue-size", type=int,
+                        help="Files waiting for a worker before intake pauses (default: twice --workers)")
+    parser.add_argument("--settle-seconds", type=float, default=2.0,
+                        help="How long a file must be unchanged before it is transcribed (default: 2)")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not watch subdirectories")
+    parser.add_argument("--polling", action="store_true",
+                        help="Scan the directory instead of using inotify (for network shares)")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds between scans when polling (default: 1)")
+    parser.add_argument("--index", help="Add every result to this search index database (see index.py)")
+    parser.add_argument("--locale", "-l", default="en-US", help="Locale for transcription (default: en-US)")
+    parser.add_argument("--region", "-r", help="Azure region (overrides .env setting)")
+    parser.add_argument("--api-key", "-k", help="API key (overrides .env setting)")
+    args = parser.parse_args()
+
+    root = Path(args.directory)
+    if not root.is_dir():
+        print(f"Error: Not a directory: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        config = AzureSpeechConfig(
+            region=args.region,
+            api_key=args.api_key
+        )
+    except ValueError as e:
+        print(f"Configuration Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    index = TranscriptIndex(args.index) if args.index else None
+    with AzureSpeechClient(config, pool_size=args.workers) as client:
+        service = IngestService(
+            client,
+            root,
+            output_dir=Path(args.output_dir) if args.output_dir else None,
+            format=args.format,
+            locales=[args.locale],
+            workers=args.workers,
+            queue_size=args.queue_size,
+            settle_seconds=args.settle_seconds,
+            recursive=not args.no_recursive,
+            polling=args.polling,
+            poll_interval=args.poll_interval,
+            index=index
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: service.stop())
+
+        kind = "polling" if isinstance(service.watcher, PollingWatcher) else "inotify"
+        print(f"Watching {root} ({kind}) with {args.workers} worker(s)")
+        service.run()
+        print(f"Stopped: {service.transcribed} transcribed, {service.duplicates} duplicate(s), "
+              f"{service.failed} failed")
+    if index is not None:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
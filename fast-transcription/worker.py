@@ -0,0 +1,314 @@
+"""
+Resident transcription worker listening on a Unix socket.
+
+A one-off `transcribe.py` run pays for interpreter start-up, module
+imports, loading the .env file, building the client and a TLS handshake
+before any audio is sent, which for a short voice note takes longer than
+the transcription itself. The worker pays all of that once and keeps its
+connections to the service warm; worker_client.py submits files to it.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import requests
+
+from cache import TranscriptionCache
+from config import AzureSpeechConfig
+from locales import LocaleCache
+from speech_client import AzureSpeechClient
+from utils import validate_audio_file
+from worker_client import MODES, default_socket_path
+
+
+class TranscriptionWorker:
+    """
+    Long-running worker that transcribes files named by local clients.
+
+    Each connection carries newline-delimited JSON requests and gets one
+    JSON line back per request. The socket is created readable and
+    writable by the owner only, since the worker opens any path it is sent
+    with the owner's permissions. Use as a context manager to run it on a
+    background thread:
+
+        with TranscriptionWorker(AzureSpeechClient(config), "/tmp/ft.sock"):
+            ...
+    """
+
+    def __init__(
+        self,
+        client: AzureSpeechClient,
+        socket_path: Optional[Union[str, Path]] = None,
+        max_concurrency: int = 8,
+        keepalive_seconds: Optional[float] = 60.0
+    ):
+        """
+        Initialize the worker and bind its socket.
+
+        Args:
+            client: Client for the service; its pool size should be at
+                least max_concurrency
+            socket_path: Socket to listen on. Defaults to default_socket_path().
+            max_concurrency: Transcriptions in flight at once, across all clients
+            keepalive_seconds: After this long without a request, send a
+                locales request so the pooled connection is not closed for
+                idleness. None disables it.
+
+        Raises:
+            OSError: If another worker is already listening on the socket
+        """
+        self.client = client
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.keepalive_seconds = keepalive_seconds
+        self.locale_cache = LocaleCache(client)
+
+        self.requests = 0
+        self.errors = 0
+        self.keepalives = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        self._stopped = threading.Event()
+        self._threads = []
+
+        self._remove_stale_socket()
+        # Create the socket without group or other access
+        old_umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), self._handler_class())
+        finally:
+            os.umask(old_umask)
+        self.server.daemon_threads = True
+
+    def _remove_stale_socket(self) -> None:
+        """Delete a socket file left behind by a worker that is no longer running."""
+        if not self.socket_path.exists():
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except OSError:
+            self.socket_path.unlink()
+        else:
+            raise OSError(f"A worker is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    def warm_up(self) -> None:
+        """
+        Fetch the supported locales, opening a connection to the service.
+
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        self.locale_cache.refresh()
+
+    def start(self) -> "TranscriptionWorker":
+        """Serve requests, and send keep-alives, on background threads."""
+        self._threads.append(threading.Thread(target=self.server.serve_forever, daemon=True))
+        if self.keepalive_seconds:
+            self._threads.append(threading.Thread(target=self._keep_alive, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and remove the socket."""
+        self._stopped.set()
+        self.server.shutdown()
+        self.close()
+        for thread in self._threads:
+            thread.join()
+
+    def close(self) -> None:
+        """Close the listening socket and remove the socket file."""
+        self._stopped.set()
+        self.server.server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "TranscriptionWorker":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _keep_alive(self) -> None:
+        while not self._stopped.wait(self.keepalive_seconds):
+            if time.monotonic() - self._last_used < self.keepalive_seconds:
+                continue
+            try:
+                self.client.get_supported_locales()
+                self.keepalives += 1
+            except Exception:
+                # The next transcription reconnects if the connection was lost
+                pass
+            self._last_used = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the worker's counters."""
+        return {
+            "pid": os.getpid(),
+            "requests": self.requests,
+            "errors": self.errors,
+            "keepalives": self.keepalives,
+        }
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one request.
+
+        Args:
+            request: Request object with "audio" (absolute path), "locales",
+                "mode" (one of MODES), "check_locales" and "options", or
+                {"ping": true} for the counters
+
+        Returns:
+            Dict with the transcription response under "result", or an
+            "error" message and, for upstream failures, its "status"
+        """
+        if request.get("ping"):
+            return {"result": self.stats()}
+
+        with self._lock:
+            self.requests += 1
+        try:
+            return {"result": self._transcribe(request)}
+        except requests.HTTPError as e:
+            with self._lock:
+                self.errors += 1
+            return {"error": str(e), "status": e.response.status_code}
+        except ValueError as e:
+            with self._lock:
+                self.errors += 1
+            return {"error": str(e)}
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def _transcribe(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        mode = request.get("mode", "transcribe")
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        audio_path = Path(request["audio"])
+        locales = request.get("locales") or ["en-US"]
+        options = request.get("options") or {}
+
+        if not validate_audio_file(audio_path, enforce_limits=mode != "chunked"):
+            raise ValueError(f"Invalid or non-existent audio file: {audio_path}")
+        if request.get("check_locales", True):
+            try:
+                locales = self.locale_cache.validate(locales)
+            except requests.RequestException:
+                # Let the service judge the locale if the list cannot be fetched
+                pass
+
+        with self._slots:
+            self._last_used = time.monotonic()
+            try:
+                if mode == "chunked":
+                    return self.client.transcribe_chunked(audio_path, locales, **options)
+                if mode == "speech_only":
+                    return self.client.transcribe_speech_only(audio_path, locales, **options)
+                return self.client.transcribe(audio_path, locales, **options)
+            finally:
+                self._last_used = time.monotonic()
+
+    def _handler_class(self):
+        worker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError("Request must be a JSON object")
+                    except ValueError as e:
+                        response = {"error": f"Invalid request: {e}"}
+                    else:
+                        response = worker.handle(request)
+                    try:
+                        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                        self.wfile.flush()
+                    except OSError:
+                        # The client went away before its answer was ready
+                        return
+
+        return Handler
+
+
+def main():
+    """Run the worker in the foreground."""
+    parser = argparse.ArgumentParser(description="Resident worker for the Azure fast transcription endpoint")
+    parser.add_argument("--socket", help=f"Socket to listen on (default: {default_socket_path()})")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Transcriptions in flight at once, across all clients (default: 8)")
+    parser.add_argument("--keepalive-seconds", type=float, default=60.0,
+                        help="Idle time after which a keep-alive request is sent, 0 to disable (default: 60)")
+    parser.add_argument("--cache-dir", help="Directory for cached transcription results")
+    parser.add_argument("--cache-max-mb", type=float,
+                        help="Evict least recently used cache entries beyond this size in MB")
+    parser.add_argument("--region", "-r", help="Azure region (overrides .env setting)")
+    parser.add_argument("--api-key", "-k", help="API key (overrides .env setting)")
+    args = parser.parse_args()
+
+    try:
+        config = AzureSpeechConfig(
+            region=args.region,
+            api_key=args.api_key
+        )
+    except ValueError as e:
+        print(f"Configuration Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    cache = None
+    if args.cache_dir:
+        max_bytes = int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None
+        cache = TranscriptionCache(args.cache_dir, max_bytes=max_bytes)
+    client = AzureSpeechClient(config, pool_size=args.workers, cache=cache)
+
+    try:
+        worker = TranscriptionWorker(
+            client,
+            socket_path=args.socket,
+            max_concurrency=args.workers,
+            keepalive_seconds=args.keepalive_seconds or None
+        )
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        worker.warm_up()
+    except requests.RequestException as e:
+        print(f"Warning: Could not reach the service yet: {e}", file=sys.stderr)
+
+    # Remove the socket on `kill` as well as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if worker.keepalive_seconds:
+        threading.Thread(target=worker._keep_alive, daemon=True).start()
+    print(f"Transcription worker listening on {worker.socket_path}, forwarding to {config.base_url}")
+    try:
+        worker.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Thin client for a resident transcription worker (see worker.py).
+
+Imports only the standard library and the output writers, so submitting
+a file costs interpreter start-up and one local socket round trip. The
+worker already holds the loaded modules, the configuration and warm
+connections to the service.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from writers import WRITERS, write_transcript
+
+
+# Transcription modes the worker accepts
+MODES = ("transcribe", "chunked", "speech_only")
+
+
+def default_socket_path() -> Path:
+    """Get the per-user worker socket ($XDG_RUNTIME_DIR/fast-transcription.sock)."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "fast-transcription.sock"
+    return Path("/tmp") / f"fast-transcription-{os.getuid()}.sock"
+
+
+class WorkerError(Exception):
+    """Failure reported by the worker, with the upstream status if there was one."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class WorkerClient:
+    """
+    Connection to a resident worker over its Unix socket.
+
+    Requests and responses are single JSON lines, so one connection can
+    carry any number of requests:
+
+        with WorkerClient() as worker:
+            result = worker.transcribe("note.wav", ["en-US"])
+    """
+
+    def __init__(self, socket_path: Optional[Union[str, Path]] = None, timeout: Optional[float] = None):
+        """
+        Connect to the worker.
+
+        Args:
+            socket_path: Worker socket. Defaults to default_socket_path().
+            timeout: Seconds to wait for a response, or None to wait indefinitely
+
+        Raises:
+            OSError: If no worker is listening on the socket
+        """
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(str(self.socket_path))
+        except OSError:
+            self.sock.close()
+            raise
+        self._reader = self.sock.makefile("rb")
+
+    def __enter__(self) -> "WorkerClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._reader.close()
+        self.sock.close()
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send one request and wait for its response.
+
+        Args:
+            payload: Request object
+
+        Returns:
+            Dict containing the response object
+
+        Raises:
+            WorkerError: If the worker closes the connection without answering
+        """
+        self.sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        line = self._reader.readline()
+        if not line:
+            raise WorkerError("Worker closed the connection")
+        return json.loads(line)
+
+    def transcribe(
+        self,
+        audio_file: Union[str, Path],
+        locales: List[str] = ["en-US"],
+        mode: str = "transcribe",
+        check_locales: bool = True,
+        **options
+    ) -> Dict[str, Any]:
+        """
+        Transcribe an audio file through the worker.
+
+        The worker reads the file itself, so it must be able to open the path.
+
+        Args:
+            audio_file: Path to the audio file
+            locales: List of language locales for transcription
+            mode: "transcribe", "chunked" or "speech_only", as in AzureSpeechClient
+            check_locales: Whether the worker validates the locales first
+            **options: Additional parameters for the transcription method
+
+        Returns:
+            Dict containing the transcription response
+
+        Raises:
+            WorkerError: If the worker rejects the request or the transcription fails
+        """
+        response = self.request({
+            "audio": str(Path(audio_file).resolve()),
+            "locales": list(locales),
+            "mode": mode,
+            "check_locales": check_locales,
+            "options": options,
+        })
+        if "error" in response:
+            raise WorkerError(response["error"], response.get("status"))
+        return response["result"]
+
+    def ping(self) -> Dict[str, Any]:
+        """
+        Get the worker's counters without transcribing anything.
+
+        Returns:
+            Dict with the worker's request, error and keep-alive counts
+        """
+        return self.request({"ping": True})["result"]
+
+
+def write_output(result: Dict[str, Any], stream, format: str) -> None:
+    """Write the result in the chosen --format, as transcribe.py does."""
+    if format == "json":
+        json.dump(result.get("combinedPhrases", []), stream, indent=2)
+        stream.write("\n")
+    else:
+        write_transcript(result, stream, format)
+
+
+def main():
+    """Submit one file to a running worker and print the result."""
+    parser = argparse.ArgumentParser(description="Transcribe audio through a resident transcription worker")
+    parser.add_argument("audio_file", help="Path to the audio file to transcribe")
+    parser.add_argument("--locale", "-l", default="en-US", help="Locale for transcription (default: en-US)")
+    parser.add_argument("--skip-locale-check", action="store_true",
+                        help="Do not check the locale against the worker's list of supported locales")
+    parser.add_argument("--socket", help=f"Worker socket (default: {default_socket_path()})")
+    parser.add_argument("--output", "-o", help="Output file for the transcription result")
+    parser.add_argument("--format", "-f", choices=["json", *WRITERS], default="json",
+                        help="Output format: combinedPhrases JSON, JSON lines per phrase, "
+                             "SRT or WebVTT subtitles, or plain text (default: json)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Split the audio at silences and transcribe the chunks concurrently")
+    parser.add_argument("--chunk-seconds", type=float, default=300.0,
+                        help="Nominal chunk length in seconds for --chunked (default: 300)")
+    parser.add_argument("--strip-silence", action="store_true",
+                        help="Remove long silences before upload and map timestamps back")
+    parser.add_argument("--timing", action="store_true", help="Print the round-trip time to stderr")
+    args = parser.parse_args()
+    if args.chunked and args.strip_silence:
+        parser.error("--strip-silence cannot be combined with --chunked")
+
+    mode, options = "transcribe", {}
+    if args.chunked:
+        mode, options = "chunked", {"chunk_seconds": args.chunk_seconds}
+    elif args.strip_silence:
+        mode = "speech_only"
+
+    start_time = time.perf_counter()
+    try:
+        with WorkerClient(args.socket) as worker:
+            result = worker.transcribe(
+                args.audio_file,
+                [args.locale],
+                mode=mode,
+                check_locales=not args.skip_locale_check,
+                **options
+            )
+    except OSError as e:
+        print(f"Error: Could not reach the worker: {e} (start one with: python worker.py)", file=sys.stderr)
+        sys.exit(1)
+    except WorkerError as e:
+        print(f"Error during transcription: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.timing:
+        print(f"Took {(time.perf_counter() - start_time) * 1000:.1f} ms through the worker", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            write_output(result, f, args.format)
+        print(f"Transcription result saved to: {args.output}")
+    else:
+        write_output(result, sys.stdout, args.format)
+
+
+if __name__ == "__main__":
+    main()
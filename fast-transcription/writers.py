@@ -0,0 +1,287 @@
+"""
+Streaming writers for subtitle, JSON-lines and plain-text transcripts.
+
+Writers emit one phrase at a time straight to the output stream, so the
+output never exists as a single string in memory.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+
+
+# Caption limits: two lines of 42 characters, at most 7 seconds on screen
+MAX_CUE_CHARS = 84
+MAX_CUE_MS = 7000
+
+
+def format_timestamp(ms: int, separator: str = ".") -> str:
+    """
+    Format milliseconds as HH:MM:SS.mmm.
+
+    Args:
+        ms: Time in milliseconds
+        separator: Separator before the milliseconds ("," for SRT)
+
+    Returns:
+        str: Formatted timestamp
+    """
+    ms = max(0, int(ms))
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{millis:03d}"
+
+
+def phrase_words(phrase: Dict[str, Any]) -> List[Tuple[str, int, int]]:
+    """
+    Get the timed words of a phrase with their display text.
+
+    The service's word entries may lack the punctuation and capitalization
+    of the phrase text. When the phrase text splits into as many tokens as
+    there are words, those tokens are used instead.
+
+    Args:
+        phrase: Phrase from a transcription response
+
+    Returns:
+        List of (text, offset_ms, duration_ms), empty if the phrase has no
+        word timings
+    """
+    words = phrase.get("words") or []
+    tokens = phrase.get("text", "").split()
+    use_tokens = len(tokens) == len(words)
+    return [
+        (tokens[index] if use_tokens else word.get("text", ""),
+         word.get("offsetMilliseconds", 0),
+         word.get("durationMilliseconds", 0))
+        for index, word in enumerate(words)
+    ]
+
+
+def split_cues(
+    phrase: Dict[str, Any],
+    max_chars: int = MAX_CUE_CHARS,
+    max_ms: int = MAX_CUE_MS
+) -> Iterator[Tuple[int, int, List[Tuple[str, int, int]]]]:
+    """
+    Split a phrase into caption cues at word boundaries.
+
+    Args:
+        phrase: Phrase from a transcription response
+        max_chars: Longest cue text in characters
+        max_ms: Longest cue duration in milliseconds
+
+    Yields:
+        (start_ms, end_ms, words) for each cue. A phrase without word
+        timings yields one cue whose only word is the phrase text.
+    """
+    start = phrase.get("offsetMilliseconds", 0)
+    end = start + phrase.get("durationMilliseconds", 0)
+    words = phrase_words(phrase)
+    if not words:
+        yield start, end, [(phrase.get("text", ""), start, end - start)]
+        return
+
+    cue: List[Tuple[str, int, int]] = []
+    length = 0
+    for word in words:
+        text, offset, duration = word
+        if cue and (length + 1 + len(text) > max_chars or offset + duration - cue[0][1] > max_ms):
+            yield cue[0][1], cue[-1][1] + cue[-1][2], cue
+            cue, length = [], 0
+        length += len(text) + (1 if cue else 0)
+        cue.append(word)
+    yield cue[0][1], cue[-1][1] + cue[-1][2], cue
+
+
+class TranscriptWriter:
+    """
+    Base class for writers that stream a transcript phrase by phrase.
+
+    Subclasses override begin, write_phrase and end.
+    """
+
+    extension = ".txt"
+
+    def __init__(self, stream: TextIO):
+        """
+        Initialize the writer.
+
+        Args:
+            stream: Text stream that receives the output
+        """
+        self.stream = stream
+
+    def begin(self) -> None:
+        """Write anything that precedes the first phrase."""
+
+    def write_phrase(self, phrase: Dict[str, Any]) -> None:
+        """
+        Write one phrase.
+
+        Args:
+            phrase: Phrase from a transcription response
+        """
+        raise NotImplementedError
+
+    def end(self) -> None:
+        """Write anything that follows the last phrase."""
+
+    def write_result(self, result: Dict[str, Any]) -> None:
+        """
+        Write every phrase of a transcription response.
+
+        Args:
+            result: Transcription response
+        """
+        self.begin()
+        for phrase in result.get("phrases", []):
+            self.write_phrase(phrase)
+        self.end()
+
+
+class SrtWriter(TranscriptWriter):
+    """SubRip subtitles, with long phrases split into cues by word timing."""
+
+    extension = ".srt"
+
+    def __init__(self, stream: TextIO, max_chars: int = MAX_CUE_CHARS, max_ms: int = MAX_CUE_MS):
+        """
+        Initialize the writer.
+
+        Args:
+            stream: Text stream that receives the output
+            max_chars: Longest cue text in characters
+            max_ms: Longest cue duration in milliseconds
+        """
+        super().__init__(stream)
+        self.max_chars = max_chars
+        self.max_ms = max_ms
+        self._index = 0
+
+    def write_phrase(self, phrase: Dict[str, Any]) -> None:
+        for start, end, words in split_cues(phrase, self.max_chars, self.max_ms):
+            self._index += 1
+            text = " ".join(text for text, _, _ in words)
+            self.stream.write(
+                f"{self._index}\n"
+                f"{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n"
+                f"{text}\n\n"
+            )
+
+
+class VttWriter(TranscriptWriter):
+    """
+    WebVTT subtitles.
+
+    With word timings present, each word after the first in a cue carries
+    an inline timestamp tag, which players use for karaoke-style highlighting.
+    """
+
+    extension = ".vtt"
+
+    def __init__(
+        self,
+        stream: TextIO,
+        max_chars: int = MAX_CUE_CHARS,
+        max_ms: int = MAX_CUE_MS,
+        word_timestamps: bool = True
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            stream: Text stream that receives the output
+            max_chars: Longest cue text in characters
+            max_ms: Longest cue duration in milliseconds
+            word_timestamps: Whether to add inline word timestamp tags
+        """
+        super().__init__(stream)
+        self.max_chars = max_chars
+        self.max_ms = max_ms
+        self.word_timestamps = word_timestamps
+
+    def begin(self) -> None:
+        self.stream.write("WEBVTT\n\n")
+
+    def write_phrase(self, phrase: Dict[str, Any]) -> None:
+        voice = f"<v Speaker {phrase['speaker']}>" if "speaker" in phrase else ""
+        for start, end, words in split_cues(phrase, self.max_chars, self.max_ms):
+            parts = []
+            for index, (text, offset, _) in enumerate(words):
+                if index and self.word_timestamps and len(words) > 1:
+                    parts.append(f"<{format_timestamp(offset)}>{_escape_vtt(text)}")
+                else:
+                    parts.append(_escape_vtt(text))
+            self.stream.write(
+                f"{format_timestamp(start)} --> {format_timestamp(end)}\n"
+                f"{voice}{' '.join(parts)}\n\n"
+            )
+
+
+def _escape_vtt(text: str) -> str:
+    """Escape characters that WebVTT cue text treats as markup."""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class JsonLinesWriter(TranscriptWriter):
+    """One JSON object per phrase, including its word timings."""
+
+    extension = ".jsonl"
+
+    def write_phrase(self, phrase: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(phrase, ensure_ascii=False))
+        self.stream.write("\n")
+
+
+class TextWriter(TranscriptWriter):
+    """Plain text, one phrase per line, prefixed with the speaker if known."""
+
+    extension = ".txt"
+
+    def write_phrase(self, phrase: Dict[str, Any]) -> None:
+        prefix = f"Speaker {phrase['speaker']}: " if "speaker" in phrase else ""
+        self.stream.write(f"{prefix}{phrase.get('text', '')}\n")
+
+
+WRITERS = {
+    "srt": SrtWriter,
+    "vtt": VttWriter,
+    "jsonl": JsonLinesWriter,
+    "txt": TextWriter,
+}
+
+
+def get_writer(format: str, stream: TextIO, **kwargs) -> TranscriptWriter:
+    """
+    Create a writer for an output format.
+
+    Args:
+        format: One of the keys of WRITERS
+        stream: Text stream that receives the output
+        **kwargs: Options passed to the writer
+
+    Returns:
+        TranscriptWriter for the format
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    try:
+        writer_class = WRITERS[format]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {format} (expected one of {', '.join(WRITERS)})")
+    return writer_class(stream, **kwargs)
+
+
+def write_transcript(result: Dict[str, Any], stream: TextIO, format: str, **kwargs) -> None:
+    """
+    Write a transcription response in an output format.
+
+    Args:
+        result: Transcription response
+        stream: Text stream that receives the output
+        format: One of the keys of WRITERS
+        **kwargs: Options passed to the writer
+    """
+    get_writer(format, stream, **kwargs).write_result(result)